@@ -6,6 +6,8 @@ from __future__ import annotations
 import re
 from typing import Any, Dict, List
 
+from engine.hashtags import hashtag_line
+
 # -----------------------------
 # Blacklist (Window Sticker)
 # -----------------------------
@@ -30,29 +32,7 @@ def is_blacklisted_line(s: str) -> bool:
 # Hashtags / Marques
 # -----------------------------
 def choose_hashtags(title: str) -> str:
-    base = [
-        "#VehiculeOccasion", "#AutoUsagée", "#Quebec", "#Beauce",
-        "#SaintGeorges", "#KennebecDodge", "#DanielGiroux"
-    ]
-    low = (title or "").lower()
-    if "ram" in low:
-        base.insert(0, "#RAM")
-    if "jeep" in low:
-        base.insert(0, "#Jeep")
-    if "dodge" in low:
-        base.insert(0, "#Dodge")
-    if "chrysler" in low:
-        base.insert(0, "#Chrysler")
-
-    out: List[str] = []
-    seen = set()
-    for t in base:
-        k = t.lower()
-        if k in seen:
-            continue
-        seen.add(k)
-        out.append(t)
-    return " ".join(out)
+    return hashtag_line(title, style="ad")
 
 
 def is_allowed_stellantis_brand(txt: str) -> bool:
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_bulk_render.py
+- Snapshot synthétique (JSONL, --n véhicules) rendu par render_snapshot (flux, par paquets)
+  vs boucle par véhicule build_facebook_dg + build_marketplace_dg
+- Vérifie que les textes sont identiques
+
+Usage:
+  python -m bench.bench_bulk_render --n 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from bench.bench_dg_text import make_vehicles
+from engine.bulk_render import iter_snapshot, render_snapshot
+from engine.dg_text import build_facebook_dg, build_marketplace_dg
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=10000)
+    ap.add_argument("--chunk", type=int, default=1000)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snap = Path(tmp) / "snapshot.jsonl"
+        with snap.open("w", encoding="utf-8") as fh:
+            for v in make_vehicles(args.n):
+                fh.write(json.dumps(v, ensure_ascii=False) + "\n")
+
+        t0 = time.perf_counter()
+        loop = [(build_facebook_dg(v), build_marketplace_dg(v)) for v in iter_snapshot(snap)]
+        t_loop = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        bulk = list(render_snapshot(snap, chunk_size=args.chunk))
+        t_bulk = time.perf_counter() - t0
+
+    assert len(loop) == len(bulk)
+    assert all(fb == r["facebook"] and mp == r["marketplace"] for (fb, mp), r in zip(loop, bulk))
+
+    print(f"véhicules: {args.n}  (paquets de {args.chunk})")
+    print(f"boucle build_*_dg  : {args.n / t_loop:10.0f} lignes/s")
+    print(f"render_snapshot    : {args.n / t_bulk:10.0f} lignes/s  (x{t_loop / t_bulk:.2f})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_classifier.py
+- Débit de classification sur une longue liste de titres (inventaire réaliste: titres répétés)
+- Ancien classify (balayage de sous-chaînes, recopié ici) vs classify (automate + cache)
+  vs classify_many (lot, dédoublonné)
+- Affiche les titres dont la catégorie change (correspondance sur mots entiers)
+
+Usage:
+  python -m bench.bench_classifier --n 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+from engine.classifier import _classify_text, classify, classify_many
+
+MAKES = {
+    "RAM": ("1500 Big Horn", "2500 Laramie", "ProMaster 2500"),
+    "Jeep": ("Wrangler Sahara", "Grand Cherokee 4xe", "Compass North", "Gladiator Rubicon"),
+    "Dodge": ("Charger R/T", "Challenger SRT Hellcat", "Durango GT", "Hornet"),
+    "Chrysler": ("Pacifica Hybride", "Grand Caravan SXT", "300 Touring"),
+    "Ford": ("F-150 XLT", "Escape SE", "Mustang GT"),
+    "Chevrolet": ("Silverado 1500", "Bolt EV", "Malibu LT"),
+    "Toyota": ("RAV4 LE", "Tacoma TRD", "Corolla"),
+    "Porsche": ("911 Turbo", "Cayenne"),
+    "Bentley": ("Bentayga",),
+}
+
+
+def make_vehicles(n: int, seed: int = 1) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    makes = list(MAKES)
+    out = []
+    for _ in range(n):
+        make = rng.choice(makes)
+        out.append({"title": f"{rng.randint(2015, 2025)} {make} {rng.choice(MAKES[make])}"})
+    return out
+
+
+def classify_substring(vehicle: dict) -> str:
+    """Ancienne version (sous-chaînes), pour comparaison."""
+    title = (vehicle.get("title") or "").lower()
+    brand = (vehicle.get("brand") or "").lower()
+    model = (vehicle.get("model") or "").lower()
+    full_text = f"{brand} {model} {title}".strip()
+    if any(b in full_text for b in ("ferrari", "lamborghini", "mclaren", "porsche", "aston martin", "bentley", "rolls royce")):
+        return "exotic"
+    if any(b in brand for b in ("ram", "ford", "chevrolet", "gmc", "toyota", "nissan")) and any(
+        w in full_text for w in ("1500", "2500", "3500", "f-150", "f150", "silverado", "sierra", "tacoma", "tundra", "pickup", "camion")
+    ):
+        return "truck"
+    if any(w in full_text for w in ("suv", "cuv", "vus", "rogue", "cherokee", "grand cherokee", "durango", "explorer", "rav4", "cr-v", "highlander", "pilot", "pathfinder")):
+        return "suv"
+    if any(w in full_text for w in ("minivan", "caravan", "grand caravan", "pacifica", "odyssey", "sienna", "town & country")):
+        return "minivan"
+    if any(w in full_text for w in ("sedan", "berline", "accord", "camry", "civic", "corolla", "malibu", "altima", "sentra")):
+        return "sedan"
+    if any(w in full_text for w in ("coupe", "charger", "challenger", "mustang", "camaro", "370z", "supra")):
+        return "coupe"
+    if any(w in full_text for w in ("ev", "électrique", "hybrid", "hybride", "plug-in", "bolt", "leaf", "model 3", "ioniq", "prius")):
+        return "ev"
+    return "default"
+
+
+def _rate(n: int, fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return n / (time.perf_counter() - t0)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200000)
+    args = ap.parse_args()
+
+    vehicles = make_vehicles(args.n)
+
+    r_old = _rate(args.n, lambda: [classify_substring(v) for v in vehicles])
+    _classify_text.cache_clear()
+    r_one = _rate(args.n, lambda: [classify(v) for v in vehicles])
+    _classify_text.cache_clear()
+    r_many = _rate(args.n, lambda: classify_many(vehicles))
+
+    print(f"titres: {args.n}")
+    print(f"ancien (sous-chaînes)     : {r_old:12.0f} classifications/s")
+    print(f"classify (automate+cache) : {r_one:12.0f} classifications/s  (x{r_one / r_old:.1f})")
+    print(f"classify_many             : {r_many:12.0f} classifications/s  (x{r_many / r_old:.1f})")
+
+    changed = Counter()
+    for v in vehicles:
+        a, b = classify_substring(v), classify(v)
+        if a != b:
+            changed[(v["title"].split(" ", 1)[1], a, b)] += 1
+    if changed:
+        print("\ncatégories changées (mots entiers / marque dans le titre):")
+        for (title, a, b), _ in sorted(changed.items()):
+            print(f"  {title:32} {a:8} -> {b}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
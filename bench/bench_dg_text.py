@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_dg_text.py
+- Débit: build_facebook_dg + build_marketplace_dg (2 normalisations) vs render_dg (1 seule)
+- Vérifie que les textes sont identiques
+
+Usage:
+  python -m bench.bench_dg_text --n 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Any, Dict, List
+
+from engine.dg_text import build_facebook_dg, build_marketplace_dg, render_dg
+
+TITLES = (
+    "RAM 1500 Big Horn 2022", "Jeep Wrangler Sahara 2021", "Dodge Charger R/T 2020",
+    "Chrysler Pacifica Hybride 2023", "Ford F-150 XLT 2019", "Toyota RAV4 LE 2020",
+)
+
+
+def make_vehicles(n: int, seed: int = 1) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        out.append({
+            "title": rng.choice(TITLES),
+            "price": f"{rng.randint(15, 80)} 995 $",
+            "mileage": f"{rng.randint(5, 180)} 000 km",
+            "stock": f"{i:05d}",
+            "vin": "1C6SRFFT5NN" + f"{i:06d}",
+            "url": f"https://www.kennebecdodge.ca/fr/inventaire/{i}",
+            "headline_features": "V8 • 4x4 • Cabine d'équipe",
+            "year": "2022",
+            "transmission": "Automatique",
+            "drivetrain": "4x4",
+            "comfort": ["Sièges chauffants", "Volant chauffant", "Démarreur à distance", "sièges chauffants"],
+        })
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=20000)
+    args = ap.parse_args()
+
+    vehicles = make_vehicles(args.n)
+
+    t0 = time.perf_counter()
+    pair = [(build_facebook_dg(v), build_marketplace_dg(v)) for v in vehicles]
+    t_pair = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    single = [render_dg(v) for v in vehicles]
+    t_single = time.perf_counter() - t0
+
+    assert all(fb == r["facebook"] and mp == r["marketplace"] for (fb, mp), r in zip(pair, single))
+
+    print(f"véhicules: {args.n}")
+    print(f"build_facebook_dg + build_marketplace_dg: {args.n / t_pair:10.0f} véhicules/s")
+    print(f"render_dg (facebook + marketplace)      : {args.n / t_single:10.0f} véhicules/s  (x{t_pair / t_single:.2f})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_llm.py
+- Intros AI sur un lot de véhicules contre le faux serveur OpenAI local (aucun appel payant)
+- Séquentiel (generate_ad_text, un par un) vs generate_many (asyncio, concurrence bornée)
+- Le faux serveur renvoie des 429 au-delà de --max-inflight: mesure aussi les réessais
+- Cache disque LLM (engine.llm_cache) désactivé: sinon generate_many resservirait l'échantillon
+  séquentiel (et les runs précédents) sans appel, et le bench mesurerait le cache
+
+Usage:
+  python -m bench.bench_llm --n 600 --latency 0.2 --concurrency 16 --seq-sample 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+from bench.bench_dg_text import make_vehicles
+from bench.fake_openai_server import start_in_thread
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=600)
+    ap.add_argument("--latency", type=float, default=0.2)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--max-inflight", type=int, default=12, help="429 côté faux serveur au-delà (0 = jamais)")
+    ap.add_argument("--seq-sample", type=int, default=20, help="Véhicules mesurés en séquentiel (extrapolé à --n)")
+    args = ap.parse_args()
+
+    srv = start_in_thread(latency=args.latency, max_inflight=args.max_inflight)
+    os.environ["OPENAI_BASE_URL"] = srv.base_url
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+    from engine import llm, llm_cache
+
+    llm_cache.ENABLED = False
+
+    vehicles = make_vehicles(args.n)
+
+    sample = vehicles[: max(1, min(args.seq_sample, args.n))]
+    t0 = time.perf_counter()
+    seq = [llm.generate_ad_text(v) for v in sample]
+    t_seq = (time.perf_counter() - t0) / len(sample) * args.n
+
+    srv.requests = srv.rejected = srv.peak_inflight = 0
+    t0 = time.perf_counter()
+    out = llm.generate_many(vehicles, concurrency=args.concurrency)
+    t_par = time.perf_counter() - t0
+    srv.shutdown()
+
+    ok = sum(1 for t in out if t)
+    assert all(seq), "séquentiel: intro vide"
+    print(f"véhicules: {args.n}  latence simulée: {args.latency:.2f}s  concurrence: {args.concurrency}")
+    print(f"séquentiel (extrapolé)  : {t_seq:8.1f} s")
+    print(f"generate_many           : {t_par:8.1f} s  (x{t_seq / t_par:.1f})  réussis: {ok}/{args.n}")
+    print(f"requêtes serveur: {srv.requests}  429: {srv.rejected}  pic simultané: {srv.peak_inflight}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_spans.py
+- Compare filtres "boucle Python sur Span" vs SpanTable.select (masques numpy si dispo)
+- Spans synthétiques type sticker multi-pages (n spans), mesure temps + mémoire
+
+Usage:
+  python -m bench.bench_spans --n 20000 --repeat 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+import tracemalloc
+from typing import List
+
+from engine import sticker_to_ad as st
+
+
+def make_spans(n: int, seed: int = 1) -> List[st.Span]:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        x0 = rng.uniform(20, 580)
+        y0 = rng.uniform(20, 770)
+        out.append(st.Span(text=f"LIGNE {i}", x0=x0, y0=y0, x1=x0 + 80, y1=y0 + 8, bold_ratio=rng.random()))
+    return out
+
+
+def loop_filter(spans: List[st.Span], anchor_y: float, lo: float, hi: float, price_x: float):
+    col = [sp for sp in spans if sp.y0 <= anchor_y and lo <= sp.x0 <= hi]
+    prices = [sp for sp in spans if sp.y0 <= anchor_y and sp.x0 >= price_x]
+    return len(col), len(prices)
+
+
+def table_filter(table: st.SpanTable, anchor_y: float, lo: float, hi: float, price_x: float):
+    col = table.select(y0_max=anchor_y, x0_min=lo, x0_max=hi)
+    prices = table.select(y0_max=anchor_y, x0_min=price_x)
+    return len(col), len(prices)
+
+
+def _mem(fn) -> float:
+    tracemalloc.start()
+    obj = fn()
+    cur, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return cur / 1024.0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=20000, help="Nombre de spans")
+    ap.add_argument("--repeat", type=int, default=50)
+    args = ap.parse_args()
+
+    spans = make_spans(args.n)
+    table = st.SpanTable(spans)
+    lay = st.DEFAULT_LAYOUT
+    params = (600.0, lay.right_text_min_x, lay.right_text_max_x, lay.price_min_x)
+
+    assert loop_filter(spans, *params) == table_filter(table, *params)
+
+    t0 = time.perf_counter()
+    for _ in range(args.repeat):
+        loop_filter(spans, *params)
+    t_loop = (time.perf_counter() - t0) / args.repeat
+
+    t0 = time.perf_counter()
+    for _ in range(args.repeat):
+        table_filter(table, *params)
+    t_table = (time.perf_counter() - t0) / args.repeat
+
+    mem_list = _mem(lambda: make_spans(args.n))
+    mem_table = _mem(lambda: st.SpanTable(spans))
+
+    print(f"spans: {args.n}  backend: {'numpy' if st.numpy_backend() is not None else 'array'}")
+    print(f"filtre boucle   : {t_loop * 1000:8.3f} ms")
+    print(f"filtre SpanTable: {t_table * 1000:8.3f} ms  (x{t_loop / t_table:.1f})" if t_table else "")
+    print(f"mémoire List[Span]: {mem_list:10.1f} KiB")
+    print(f"mémoire SpanTable : {mem_table:10.1f} KiB (textes partagés)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
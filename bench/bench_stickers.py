@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_stickers.py
+- Benchmark du parseur de window stickers sur un corpus synthétique (make_sticker_corpus)
+- Mesure:
+  - débit bout-en-bout (process_sticker): stickers/s + latence par étape (moyenne / p95)
+  - par tier (spans, text, ocr): latence + exactitude vs vérité terrain
+    (rappel des options, prix des options, VIN)
+
+Usage:
+  python -m bench.make_sticker_corpus --out bench/corpus --n 10
+  python -m bench.bench_stickers --corpus bench/corpus [--ocr] [--json report.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from pdfminer.high_level import extract_text as pdfminer_extract_text
+
+from engine import sticker_to_ad as st
+
+
+def _norm(s: str) -> str:
+    return re.sub(r"\s+", " ", (s or "").lower()).strip()
+
+
+def _digits(s: Any) -> str:
+    return re.sub(r"[^\d]", "", str(s or ""))
+
+
+def _p95(xs: List[float]) -> float:
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(0.95 * (len(xs) - 1))))]
+
+
+def _mean(xs: List[float]) -> float:
+    return sum(xs) / len(xs) if xs else 0.0
+
+
+def score(found: List[Dict[str, Any]], truth: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Une option attendue est trouvée si son titre apparaît dans un titre extrait
+    (le tier texte renvoie "LABEL (prix)"). Prix comparés en chiffres seulement.
+    """
+    hits = price_hits = price_total = 0
+    for g in truth:
+        want = _norm(g["title"])
+        match = next((f for f in found if want and want in _norm(f.get("title") or "")), None)
+        if match is None:
+            continue
+        hits += 1
+        if match.get("price"):
+            price_total += 1
+            if _digits(match["price"]).startswith(_digits(g["price"])):
+                price_hits += 1
+    return {
+        "hits": hits,
+        "total": len(truth),
+        "extra": max(0, len(found) - hits),
+        "price_hits": price_hits,
+        "price_total": price_total,
+    }
+
+
+def run_tiers(pdf: Path, truth: Dict[str, Any], ocr: bool) -> Dict[str, Dict[str, Any]]:
+    out: Dict[str, Dict[str, Any]] = {}
+    unlocked = st.maybe_decrypt_pdf(pdf)
+
+    t0 = time.perf_counter()
+    meta: Dict[str, Any] = {}
+    spans = st.extract_spans_pdfminer(unlocked, max_pages=2, meta=meta)
+    groups, _ = st.extract_option_groups_auto(spans, meta)
+    title = st.extract_big_title(spans) or ""
+    out["spans"] = {
+        "s": time.perf_counter() - t0,
+        "title_ok": _norm(title) == _norm(truth["title"]),
+        "vin_ok": None,
+        **score(groups, truth["groups"]),
+    }
+
+    t0 = time.perf_counter()
+    txt = pdfminer_extract_text(str(unlocked), maxpages=2) or ""
+    flat = st.extract_paid_options_from_text(txt)
+    vin = st.extract_vin_from_text(txt)
+    out["text"] = {
+        "s": time.perf_counter() - t0,
+        "title_ok": None,
+        "vin_ok": vin == truth["vin"],
+        **score([{"title": x} for x in flat], truth["groups"]),
+    }
+
+    if ocr:
+        t0 = time.perf_counter()
+        otxt = st.ocr_extract_text(unlocked)
+        ogroups = st.extract_option_groups_from_ocr(otxt) if otxt else []
+        out["ocr"] = {
+            "s": time.perf_counter() - t0,
+            "title_ok": None,
+            "vin_ok": st.extract_vin_from_text(otxt) == truth["vin"],
+            **score(ogroups, truth["groups"]),
+        }
+
+    return out
+
+
+def bench(corpus: Path, ocr: bool = False, limit: int = 0) -> Dict[str, Any]:
+    manifest = Path(corpus) / "manifest.jsonl"
+    jobs = [j for j in st.iter_batch_jobs(manifest) if not j.get("error")]
+    if limit:
+        jobs = jobs[:limit]
+
+    # 1) bout-en-bout
+    stage_times: Dict[str, List[float]] = defaultdict(list)
+    sources: Dict[str, int] = defaultdict(int)
+    t0 = time.perf_counter()
+    for job in jobs:
+        fields = {k: v for k, v in job.items() if k in ("title", "price", "mileage", "stock")}
+        res = st.process_sticker(Path(job["pdf"]), fields)
+        sources[res["source"]] += 1
+        for k, v in res["timings"].items():
+            stage_times[k].append(v)
+    wall = time.perf_counter() - t0
+
+    # 2) par tier / variante
+    tiers: Dict[str, Dict[str, List[Dict[str, Any]]]] = defaultdict(lambda: defaultdict(list))
+    for job in jobs:
+        for tier, r in run_tiers(Path(job["pdf"]), job["truth"], ocr).items():
+            tiers[tier][job.get("variant", "?")].append(r)
+
+    def summarize(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        total = sum(r["total"] for r in rows)
+        ptotal = sum(r["price_total"] for r in rows)
+        vins = [r["vin_ok"] for r in rows if r["vin_ok"] is not None]
+        titles = [r["title_ok"] for r in rows if r["title_ok"] is not None]
+        return {
+            "n": len(rows),
+            "mean_ms": round(_mean([r["s"] for r in rows]) * 1000, 2),
+            "p95_ms": round(_p95([r["s"] for r in rows]) * 1000, 2),
+            "recall": round(sum(r["hits"] for r in rows) / total, 3) if total else None,
+            "extra": sum(r["extra"] for r in rows),
+            "price_acc": round(sum(r["price_hits"] for r in rows) / ptotal, 3) if ptotal else None,
+            "vin_acc": round(sum(vins) / len(vins), 3) if vins else None,
+            "title_acc": round(sum(titles) / len(titles), 3) if titles else None,
+        }
+
+    return {
+        "stickers": len(jobs),
+        "wall_s": round(wall, 3),
+        "stickers_per_s": round(len(jobs) / wall, 2) if wall else None,
+        "sources": dict(sources),
+        "stages": {
+            k: {"mean_ms": round(_mean(v) * 1000, 2), "p95_ms": round(_p95(v) * 1000, 2)}
+            for k, v in stage_times.items()
+        },
+        "tiers": {
+            tier: {variant: summarize(rows) for variant, rows in by_variant.items()}
+            for tier, by_variant in tiers.items()
+        },
+    }
+
+
+def print_report(rep: Dict[str, Any]) -> None:
+    print(f"stickers: {rep['stickers']}  wall: {rep['wall_s']} s  débit: {rep['stickers_per_s']} stickers/s")
+    print(f"sources: {rep['sources']}")
+    print("")
+    print(f"{'étape':<34} {'mean_ms':>9} {'p95_ms':>9}")
+    for k, v in rep["stages"].items():
+        print(f"{k:<34} {v['mean_ms']:>9.2f} {v['p95_ms']:>9.2f}")
+    print("")
+    print(f"{'tier':<6} {'variante':<10} {'n':>4} {'mean_ms':>9} {'p95_ms':>9} {'recall':>7} {'extra':>6} {'prix':>6} {'vin':>6} {'titre':>6}")
+
+    def f(x: Optional[float]) -> str:
+        return "-" if x is None else f"{x:.3f}"
+
+    for tier, by_variant in rep["tiers"].items():
+        for variant, s in by_variant.items():
+            print(
+                f"{tier:<6} {variant:<10} {s['n']:>4} {s['mean_ms']:>9.2f} {s['p95_ms']:>9.2f} "
+                f"{f(s['recall']):>7} {s['extra']:>6} {f(s['price_acc']):>6} {f(s['vin_acc']):>6} {f(s['title_acc']):>6}"
+            )
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--corpus", default="bench/corpus", help="Dossier contenant manifest.jsonl")
+    ap.add_argument("--ocr", action="store_true", help="Mesure aussi le tier OCR (pdftoppm + tesseract requis)")
+    ap.add_argument("--limit", type=int, default=0, help="Nombre max de stickers")
+    ap.add_argument("--json", default="", help="Écrit aussi le rapport JSON ici")
+    args = ap.parse_args()
+
+    if not (Path(args.corpus) / "manifest.jsonl").exists():
+        print(f"manifest.jsonl introuvable dans {args.corpus} (python -m bench.make_sticker_corpus)", file=sys.stderr)
+        return 2
+
+    rep = bench(Path(args.corpus), ocr=args.ocr, limit=args.limit)
+    print_report(rep)
+    if args.json:
+        Path(args.json).write_text(json.dumps(rep, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
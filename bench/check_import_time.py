@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+check_import_time.py
+- Test de régression du temps d'import de chaque point d'entrée (python -X importtime)
+- Budget en ms par point d'entrée (meilleur de N runs, processus neuf à chaque fois)
+- Modules interdits au chargement: les dépendances lourdes doivent rester importées au premier usage
+  (un import remonté en tête de module fait échouer le test même sur une machine rapide)
+- Code de sortie 1 si un budget est dépassé ou un module interdit est chargé
+
+Usage:
+  python -m bench.check_import_time
+  python -m bench.check_import_time --runs 5 --scale 2.0   (CI lente: budgets x2)
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# point d'entrée -> (budget ms, modules qui ne doivent pas être chargés à l'import)
+ENTRY_POINTS: Dict[str, Tuple[float, Tuple[str, ...]]] = {
+    "cli": (40.0, ("dotenv", "engine.classifier", "profiles", "engine.llm", "openai")),
+    # fastapi + pydantic (~300 ms) restent au démarrage: ce sont eux qui servent les requêtes
+    "main": (600.0, ("supabase", "engine.dg_text", "engine.llm", "openai")),
+    "engine.sticker_to_ad": (120.0, ("pdfminer", "pikepdf", "pytesseract", "PIL", "numpy")),
+    "engine.text_pipeline": (50.0, ("pdfminer",)),
+}
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\| ( *)(\S+)")
+
+
+def import_profile(module: str) -> Tuple[float, List[str]]:
+    """(ms cumulées de `import module` dans un process neuf, hors démarrage de l'interpréteur; modules chargés)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(ROOT),
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} a échoué:\n{proc.stderr[-2000:]}")
+
+    cum_us = 0
+    loaded: List[str] = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        loaded.append(m.group(4))
+        if not m.group(3) and m.group(4) == module:
+            cum_us = int(m.group(2))
+    return cum_us / 1000.0, loaded
+
+
+def _forbidden(loaded: List[str], banned: Tuple[str, ...]) -> List[str]:
+    """Modules interdits chargés (racine seulement: "numpy", pas ses 80 sous-modules)."""
+    return [b for b in banned if any(name == b or name.startswith(b + ".") for name in loaded)]
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=3, help="runs par point d'entrée (on garde le meilleur)")
+    ap.add_argument("--scale", type=float, default=1.0, help="multiplicateur des budgets (machine lente)")
+    ap.add_argument("--only", default="", help="un seul point d'entrée (ex: main)")
+    args = ap.parse_args()
+
+    failed = 0
+    for module, (budget, banned) in ENTRY_POINTS.items():
+        if args.only and module != args.only:
+            continue
+        best = float("inf")
+        loaded: List[str] = []
+        for _ in range(max(1, args.runs)):
+            ms, loaded = import_profile(module)
+            best = min(best, ms)
+        limit = budget * args.scale
+        bad = _forbidden(loaded, banned)
+        ok = best <= limit and not bad
+        failed += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {module:<24} {best:7.1f} ms  (budget {limit:.0f} ms)")
+        if bad:
+            print(f"     chargés à l'import (doivent rester paresseux): {', '.join(bad)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+fake_openai_server.py
+- Faux serveur OpenAI local (stdlib) pour bancs d'essai / tests manuels du chemin LLM
+- POST .../chat/completions: latence simulée, 429 au-delà de --max-inflight requêtes simultanées
+  (ou au hasard, --rate-429), champ usage renseigné
+- Réponse: accroche fixe qui se termine par le CTA téléphone
+  (response_format json_object: {clé: accroche} pour chaque clé de l'exemple JSON du prompt;
+   stream=true: SSE mot par mot, --token-delay entre les morceaux)
+
+Usage:
+  python -m bench.fake_openai_server --port 8765 --latency 0.2 --max-inflight 16
+  OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake python cli.py --in v.json --out out --ai
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+REPLY = "Ce véhicule est prêt pour l'hiver en Beauce, viens l'essayer cette semaine! Écris-moi: Daniel Giroux 418-222-3939"
+
+
+class FakeOpenAI(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        addr: Tuple[str, int],
+        latency: float = 0.2,
+        token_delay: float = 0.02,
+        max_inflight: int = 0,
+        rate_429: float = 0.0,
+        retry_after: Optional[float] = None,
+        reply: str = REPLY,
+    ) -> None:
+        super().__init__(addr, _Handler)
+        self.latency = latency
+        self.token_delay = token_delay
+        self.max_inflight = max_inflight
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.reply = reply
+        self.inflight = 0
+        self.peak_inflight = 0
+        self.requests = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def enter(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            if (self.max_inflight and self.inflight >= self.max_inflight) or random.random() < self.rate_429:
+                self.rejected += 1
+                return False
+            self.inflight += 1
+            self.peak_inflight = max(self.peak_inflight, self.inflight)
+            return True
+
+    def leave(self) -> None:
+        with self._lock:
+            self.inflight -= 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeOpenAI
+
+    def log_message(self, fmt: str, *args: Any) -> None:
+        pass
+
+    def _send_json(self, code: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        req = json.loads(self.rfile.read(length) or b"{}")
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"route inconnue: {self.path}", "type": "invalid_request_error"}})
+            return
+
+        srv = self.server
+        if not srv.enter():
+            headers = {"Retry-After": str(srv.retry_after)} if srv.retry_after is not None else {}
+            self._send_json(429, {"error": {"message": "Rate limit reached (fake)", "type": "rate_limit_error"}}, headers)
+            return
+        try:
+            time.sleep(srv.latency)
+            prompt = "\n".join(m.get("content") or "" for m in req.get("messages") or [])
+            prompt_chars = len(prompt)
+            content = srv.reply
+            if req.get("stream"):
+                self._stream(req, content, prompt_chars)
+                return
+            if (req.get("response_format") or {}).get("type") == "json_object":
+                # clés demandées dans l'exemple du prompt: {"facebook": "...", ...}
+                keys = re.findall(r'"(\w+)": "\.\.\."', prompt) or ["text"]
+                content = json.dumps({k: srv.reply for k in keys}, ensure_ascii=False)
+            self._send_json(200, {
+                "id": f"chatcmpl-fake-{srv.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": req.get("model") or "fake",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_chars // 4,
+                    "completion_tokens": len(content) // 4,
+                    "total_tokens": prompt_chars // 4 + len(content) // 4,
+                },
+            })
+        finally:
+            srv.leave()
+
+
+    def _stream(self, req: Dict[str, Any], content: str, prompt_chars: int) -> None:
+        """SSE façon OpenAI: un morceau par mot, --token-delay entre chaque; connexion fermée à la fin."""
+        srv = self.server
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        base = {
+            "id": f"chatcmpl-fake-{srv.requests}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": req.get("model") or "fake",
+        }
+
+        def send(payload: Any) -> None:
+            data = payload if isinstance(payload, str) else json.dumps({**base, **payload}, ensure_ascii=False)
+            self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        words = re.findall(r"\S+\s*", content)
+        try:
+            send({"choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]})
+            for w in words:
+                time.sleep(srv.token_delay)
+                send({"choices": [{"index": 0, "delta": {"content": w}, "finish_reason": None}]})
+            send({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            if (req.get("stream_options") or {}).get("include_usage"):
+                send({"choices": [], "usage": {
+                    "prompt_tokens": prompt_chars // 4,
+                    "completion_tokens": len(content) // 4,
+                    "total_tokens": prompt_chars // 4 + len(content) // 4,
+                }})
+            send("[DONE]")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client parti tôt (CTA reçu / budget écoulé)
+        self.close_connection = True
+
+
+def start_in_thread(**kwargs: Any) -> FakeOpenAI:
+    """Démarre le serveur sur un port libre (127.0.0.1) dans un thread; .shutdown() pour arrêter."""
+    srv = FakeOpenAI(("127.0.0.1", kwargs.pop("port", 0)), **kwargs)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", type=float, default=0.2, help="Secondes par complétion (avant le 1er token en streaming)")
+    ap.add_argument("--token-delay", type=float, default=0.02, help="Secondes entre deux morceaux (stream=true)")
+    ap.add_argument("--max-inflight", type=int, default=0, help="429 au-delà de N requêtes simultanées (0 = illimité)")
+    ap.add_argument("--rate-429", type=float, default=0.0, help="Probabilité de 429 aléatoire")
+    ap.add_argument("--retry-after", type=float, default=None, help="En-tête Retry-After (secondes) sur 429")
+    args = ap.parse_args()
+
+    srv = FakeOpenAI(
+        (args.host, args.port),
+        latency=args.latency,
+        token_delay=args.token_delay,
+        max_inflight=args.max_inflight,
+        rate_429=args.rate_429,
+        retry_after=args.retry_after,
+    )
+    print(f"fake OpenAI: OPENAI_BASE_URL={srv.base_url}")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+make_sticker_corpus.py
+- Génère des window stickers PDF synthétiques (hors-ligne, sans reportlab)
+- Variantes: fr, en, bilingual, encrypted (pikepdf), image (PIL, pour le tier OCR)
+- Écrit manifest.jsonl: pdf + champs véhicule + vérité terrain ("truth": vin, titre, groupes)
+  (le manifeste est directement utilisable par sticker_to_ad --batch)
+
+Usage:
+  python -m bench.make_sticker_corpus --out bench/corpus --n 10 --seed 1
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# ---------- Optional: chiffrement (variante encrypted) ----------
+try:
+    import pikepdf  # type: ignore
+except Exception:
+    pikepdf = None
+
+# ---------- Optional: rendu image (variante image-only / OCR) ----------
+try:
+    from PIL import Image, ImageDraw, ImageFont  # type: ignore
+except Exception:
+    Image = ImageDraw = ImageFont = None
+
+
+PAGE_W, PAGE_H = 612, 792
+VARIANTS = ("fr", "en", "bilingual", "encrypted", "image")
+
+# Colonnes = gabarit Stellantis (voir sticker_to_ad.DEFAULT_LAYOUT)
+ANCHOR_X = 252
+TITLE_X = 256
+DETAIL_X = 322
+PRICE_X = 470
+
+VIN_ALPHABET = "ABCDEFGHJKLMNPRSTUVWXYZ0123456789"
+
+MODELS = (
+    ("RAM", "1500 BIG HORN CREW CAB 4X4"),
+    ("RAM", "2500 TRADESMAN CREW CAB"),
+    ("JEEP", "GRAND CHEROKEE LIMITED 4X4"),
+    ("JEEP", "WRANGLER RUBICON 4 PORTES"),
+    ("DODGE", "DURANGO GT AWD"),
+    ("CHRYSLER", "PACIFICA HYBRIDE LIMITED"),
+)
+
+# (FR, EN, détails FR, détails EN, prix)
+OPTIONS = (
+    ("ENSEMBLE REMORQUAGE", "TRAILER TOW GROUP",
+     ["Attelage de remorque classe IV", "Commande de freins de remorque"],
+     ["Class IV receiver hitch", "Trailer brake control"], 1295),
+    ("ENSEMBLE NIVEAU 2", "LEVEL 2 EQUIPMENT GROUP",
+     ["Sièges avant chauffants", "Volant chauffant", "Démarreur à distance"],
+     ["Heated front seats", "Heated steering wheel", "Remote start"], 2395),
+    ("TAPIS TOUT TEMPS MOPAR", "MOPAR ALL-WEATHER MATS", [], [], 195),
+    ("ESSIEU ARRIÈRE 3,92", "3.92 REAR AXLE RATIO", [], [], 95),
+    ("ENSEMBLE SÉCURITÉ AVANCÉE", "ADVANCED SAFETY GROUP",
+     ["Régulateur de vitesse adaptatif", "Freinage d'urgence avancé"],
+     ["Adaptive cruise control", "Advanced brake assist"], 1195),
+    ("PNEUS TOUT TERRAIN 275/65R18", "275/65R18 ALL-TERRAIN TIRES", [], [], 395),
+    ("TOIT OUVRANT À COMMANDE ÉLECTRIQUE", "POWER SUNROOF", [], [], 1595),
+    ("ENSEMBLE ALLURE SPORT", "SPORT APPEARANCE PACKAGE",
+     ["Roues de 20 po noires", "Calandre noire"],
+     ["20-inch black wheels", "Black grille"], 1795),
+)
+
+LEFT_NOISE = (
+    "ÉQUIPEMENT DE SÉRIE / STANDARD EQUIPMENT",
+    "Moteur V6 Pentastar 3,6 L",
+    "Transmission automatique 8 vitesses",
+    "Climatisation bizone",
+    "Caméra de recul ParkView",
+    "Écran tactile 8,4 po Uconnect",
+    "Phares à DEL",
+    "Régulateur de vitesse",
+)
+
+
+# ------------------------------
+# Contenu du sticker (items positionnés)
+# ------------------------------
+
+Item = Tuple[float, float, float, bool, str]  # x, y, taille, gras, texte
+
+
+def _vin(rng: random.Random) -> str:
+    return "".join(rng.choice(VIN_ALPHABET) for _ in range(17))
+
+
+def _fmt_price(n: int, lang: str) -> str:
+    if lang == "en":
+        return f"${n:,}"
+    return f"{n:,}".replace(",", " ") + " $"
+
+
+def build_sticker(rng: random.Random, variant: str, idx: int) -> Tuple[List[Item], Dict[str, Any]]:
+    lang = "en" if variant == "en" else "fr"
+    bilingual = variant == "bilingual"
+
+    make, model = rng.choice(MODELS)
+    year = rng.choice((2023, 2024, 2025))
+    title = f"{year} {make} {model}"
+    vin = _vin(rng)
+    stock = f"{idx:05d}"
+
+    picks = rng.sample(OPTIONS, k=rng.randint(2, 5))
+
+    items: List[Item] = []
+    items.append((40, 750, 16, True, title))
+    items.append((40, 730, 9, False, f"VIN : {vin[:3]}—{vin[3:11]}—{vin[11:]}" if lang == "fr" else f"VIN: {vin}"))
+
+    y = 690
+    for line in LEFT_NOISE:
+        items.append((40, y, 7, line.isupper(), line))
+        y -= 12
+
+    if bilingual:
+        anchor = "ACCESSOIRES OPTIONNELS / OPTIONAL EQUIPMENT"
+    else:
+        anchor = "ACCESSOIRES OPTIONNELS" if lang == "fr" else "OPTIONAL EQUIPMENT"
+    items.append((ANCHOR_X, 700, 9, True, anchor))
+
+    base_price = rng.randint(45, 75) * 1000 + 995
+    items.append((ANCHOR_X, 686, 8, False, "PRIX DE BASE" if lang == "fr" else "BASE PRICE"))
+    items.append((PRICE_X, 686, 8, False, _fmt_price(base_price, lang)))
+
+    groups: List[Dict[str, Any]] = []
+    y = 668
+    for fr, en, det_fr, det_en, price in picks:
+        if bilingual:
+            # FR sur la ligne du prix, EN en dessous (trop long pour une seule ligne)
+            name = fr
+            details = [en] + det_fr
+        else:
+            name = fr if lang == "fr" else en
+            details = det_fr if lang == "fr" else det_en
+        price_txt = _fmt_price(price, lang)
+        items.append((TITLE_X, y, 8, True, name))
+        items.append((PRICE_X, y, 8, False, price_txt))
+        y -= 11
+        for d in details:
+            items.append((DETAIL_X, y, 7, False, d))
+            y -= 10
+        y -= 4
+        groups.append({"title": name, "price": price, "details": list(details)})
+
+    total = base_price + sum(g["price"] for g in groups)
+    items.append((ANCHOR_X, y - 6, 8, True, "PRIX TOTAL" if lang == "fr" else "TOTAL PRICE"))
+    items.append((PRICE_X, y - 6, 8, True, _fmt_price(total, lang)))
+    items.append((ANCHOR_X, y - 30, 7, False,
+                  "Le concessionnaire peut vendre moins cher." if lang == "fr" else "The dealer may sell for less."))
+    items.append((ANCHOR_X, y - 42, 7, False, "Expédié à : KENNEBEC DODGE CHRYSLER"))
+
+    record = {
+        "title": title,
+        "price": f"{base_price:,} $".replace(",", " "),
+        "mileage": "10 km",
+        "stock": stock,
+        "truth": {"vin": vin, "title": title, "groups": groups},
+    }
+    return items, record
+
+
+# ------------------------------
+# PDF minimal (Type1 Helvetica + WinAnsi), sans dépendance
+# ------------------------------
+
+def _pdf_str(s: str) -> bytes:
+    b = s.encode("cp1252", "replace")
+    return b.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _text_stream(items: List[Item]) -> bytes:
+    out = []
+    for x, y, size, bold, text in items:
+        font = b"/F2" if bold else b"/F1"
+        out.append(b"BT " + font + b" %g Tf %g %g Td (" % (size, x, y) + _pdf_str(text) + b") Tj ET")
+    return b"\n".join(out)
+
+
+def _write_pdf(path: Path, content: bytes, image: Optional[Tuple[int, int, bytes]] = None) -> None:
+    objs: List[bytes] = []
+    objs.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objs.append(b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>")
+    xobj = b" /XObject << /Im1 7 0 R >>" if image else b""
+    objs.append(
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+        b"/Resources << /Font << /F1 4 0 R /F2 5 0 R >>%s >> /Contents 6 0 R >>" % (PAGE_W, PAGE_H, xobj)
+    )
+    objs.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    objs.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+    data = zlib.compress(content)
+    objs.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(data) + data + b"\nendstream")
+    if image:
+        w, h, raw = image
+        img = zlib.compress(raw)
+        objs.append(
+            b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray "
+            b"/BitsPerComponent 8 /Filter /FlateDecode /Length %d >>\nstream\n" % (w, h, len(img))
+            + img + b"\nendstream"
+        )
+
+    buf = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for i, body in enumerate(objs, start=1):
+        offsets.append(len(buf))
+        buf += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(buf)
+    buf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    for off in offsets:
+        buf += b"%010d 00000 n \n" % off
+    buf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    path.write_bytes(bytes(buf))
+
+
+def _render_image(items: List[Item], dpi: int = 150) -> Tuple[int, int, bytes]:
+    scale = dpi / 72.0
+    w, h = int(PAGE_W * scale), int(PAGE_H * scale)
+    im = Image.new("L", (w, h), 255)
+    draw = ImageDraw.Draw(im)
+    fonts: Dict[Tuple[int, bool], Any] = {}
+    for x, y, size, bold, text in items:
+        px = int(round(size * scale))
+        key = (px, bold)
+        if key not in fonts:
+            try:
+                fonts[key] = ImageFont.truetype("DejaVuSans-Bold.ttf" if bold else "DejaVuSans.ttf", px)
+            except Exception:
+                fonts[key] = ImageFont.load_default()
+        draw.text((x * scale, (PAGE_H - y - size) * scale), text, fill=0, font=fonts[key])
+    return w, h, im.tobytes()
+
+
+def write_sticker(path: Path, items: List[Item], variant: str) -> bool:
+    if variant == "image":
+        if Image is None:
+            return False
+        _write_pdf(path, b"q %d 0 0 %d 0 0 cm /Im1 Do Q" % (PAGE_W, PAGE_H), image=_render_image(items))
+        return True
+
+    if variant == "encrypted":
+        if pikepdf is None:
+            return False
+        plain = path.with_name(path.stem + "_plain.pdf")
+        _write_pdf(plain, _text_stream(items))
+        with pikepdf.open(str(plain)) as pdf:
+            pdf.save(str(path), encryption=pikepdf.Encryption(owner="kennebec", user="", R=4))
+        plain.unlink()
+        return True
+
+    _write_pdf(path, _text_stream(items))
+    return True
+
+
+# ------------------------------
+# Main
+# ------------------------------
+
+def make_corpus(out_dir: Path, n: int = 10, seed: int = 1, variants=VARIANTS) -> Path:
+    """
+    n stickers par variante; retourne le chemin du manifest.jsonl.
+    Variantes dont la dépendance optionnelle manque: ignorées (message stderr).
+    """
+    import sys
+
+    rng = random.Random(seed)
+    out_dir = Path(out_dir).expanduser()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = out_dir / "manifest.jsonl"
+
+    idx = 0
+    with manifest.open("w", encoding="utf-8") as fh:
+        for variant in variants:
+            skipped = False
+            for _ in range(n):
+                idx += 1
+                items, rec = build_sticker(rng, variant, idx)
+                pdf = out_dir / variant / f"{rec['stock']}.pdf"
+                pdf.parent.mkdir(parents=True, exist_ok=True)
+                if not write_sticker(pdf, items, variant):
+                    skipped = True
+                    continue
+                rec = {"pdf": f"{variant}/{pdf.name}", "variant": variant, **rec}
+                fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            if skipped:
+                dep = "PIL" if variant == "image" else "pikepdf"
+                print(f"⚠️ variante {variant} ignorée ({dep} absent)", file=sys.stderr)
+
+    return manifest
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", default="bench/corpus", help="Dossier du corpus")
+    ap.add_argument("--n", type=int, default=10, help="Stickers par variante")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--variants", default=",".join(VARIANTS), help="Liste: " + ",".join(VARIANTS))
+    args = ap.parse_args()
+
+    variants = [v.strip() for v in args.variants.split(",") if v.strip() in VARIANTS]
+    manifest = make_corpus(Path(args.out), n=args.n, seed=args.seed, variants=variants)
+    print(f"Écrit: {manifest}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
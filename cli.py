@@ -1,12 +1,15 @@
 # cli.py
 import argparse
+import hashlib
 import json
 import os
+import re
+import sys
+import time
+from itertools import islice
 from pathlib import Path
-from dotenv import load_dotenv
-load_dotenv()
 
-from engine.classifier import classify
+# Imports lourds (dotenv, classifier, profiles, llm) faits à l'usage: --help et le mode lot démarrent vite
 
 def build_fallback(vehicle: dict, kind: str) -> tuple[str, str]:
     from profiles import exotic, truck, suv, default
@@ -18,15 +21,181 @@ def build_fallback(vehicle: dict, kind: str) -> tuple[str, str]:
         return suv.build(vehicle)
     return default.build(vehicle)
 
+
+# ✅ Mode lot: dossier de *.json ou inventaire .jsonl / .csv
+_UNSAFE_KEY = re.compile(r"[^A-Z0-9_-]")
+
+
+def _row_hash(v) -> str:
+    raw = json.dumps(v, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12].upper()
+
+
+def safe_key(key: str) -> str:
+    """Clé -> [A-Z0-9_-] (nom de dossier sous --out, jamais de ../ ni de /); suffixe de hash si modifiée."""
+    key = str(key).strip().upper()
+    safe = _UNSAFE_KEY.sub("_", key)
+    if safe != key or not safe:
+        safe = f"{safe}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:6].upper()}".lstrip("-")
+    return safe
+
+
+def iter_inventory(src: Path):
+    """
+    (clé, véhicule) en flux; clé = stock, sinon VIN, sinon nom de fichier / hash de la ligne
+    (stable si l'ordre des lignes change: la reprise reste valable). Clé assainie (safe_key).
+    *.json / ligne .jsonl illisible -> (clé, ValueError): build_chunk en fait une ligne d'erreur, le lot continue.
+    """
+    from engine.bulk_render import SnapshotLineError, iter_snapshot_rows
+
+    if src.is_dir():
+        for p in sorted(src.glob("*.json")):
+            try:
+                v = json.loads(p.read_text(encoding="utf-8"))
+                if not isinstance(v, dict):
+                    raise ValueError("objet JSON attendu")
+            except (OSError, ValueError) as e:
+                yield safe_key(p.stem), ValueError(f"{p.name}: {e}")
+                continue
+            yield safe_key(v.get("stock") or v.get("vin") or p.stem), v
+        return
+
+    for n, v in iter_snapshot_rows(src):
+        if isinstance(v, SnapshotLineError):
+            yield safe_key(f"{src.stem}-L{n}"), ValueError(f"{src.name}: {v}")
+            continue
+        yield safe_key(v.get("stock") or v.get("vin") or f"ROW-{_row_hash(v)}"), v
+
+
+def build_chunk(items: list) -> list:
+    """Worker (process pool): classe + construit un paquet de véhicules."""
+    from engine.classifier import classify
+
+    out = []
+    for key, vehicle in items:
+        try:
+            if isinstance(vehicle, Exception):
+                raise vehicle
+            kind = classify(vehicle)
+            fb, mp = build_fallback(vehicle, kind)
+            out.append({"key": key, "profile": kind, "facebook": fb, "marketplace": mp})
+        except Exception as e:
+            out.append({"key": key, "error": f"{type(e).__name__}: {e}"})
+    return out
+
+
+def _shard_dir(out: Path, key: str) -> Path:
+    key = safe_key(key)
+    return out / hashlib.sha1(key.encode("utf-8")).hexdigest()[:2] / key
+
+
+def _done_keys(log: Path) -> set:
+    done = set()
+    if not log.exists():
+        return done
+    with log.open("r", encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # ligne tronquée (run interrompu) -> refaite
+            if not rec.get("error"):
+                done.add(rec.get("key"))  # erreurs: retentées au prochain run
+    return done
+
+
+def run_bulk(src: Path, out: Path, jobs: int = 0, chunk: int = 256) -> int:
+    """
+    Tout l'inventaire dans un pool de process (lecture en flux, paquets de `chunk` véhicules).
+    --out *.jsonl: une ligne par véhicule; sinon dossier shardé out/<xx>/<CLÉ>/{facebook_dg,marketplace}.txt
+    + journal out/_progress.jsonl. Relancer reprend là où ça s'est arrêté.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    as_jsonl = out.suffix.lower() == ".jsonl"
+    if as_jsonl:
+        out.parent.mkdir(parents=True, exist_ok=True)
+        log = out
+    else:
+        out.mkdir(parents=True, exist_ok=True)
+        log = out / "_progress.jsonl"
+
+    done = _done_keys(log)
+    workers = jobs or os.cpu_count() or 1
+    todo = ((k, v) for k, v in iter_inventory(src) if k not in done)
+
+    n_ok = n_err = 0
+    t0 = last = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as ex, log.open("a", encoding="utf-8") as fh:
+        pending = set()
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < workers * 2:
+                items = list(islice(todo, chunk))
+                if not items:
+                    exhausted = True
+                    break
+                pending.add(ex.submit(build_chunk, items))
+            if not pending:
+                break
+
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                for rec in fut.result():
+                    if rec.get("error"):
+                        n_err += 1
+                    else:
+                        n_ok += 1
+                        if not as_jsonl:
+                            d = _shard_dir(out, rec["key"])
+                            d.mkdir(parents=True, exist_ok=True)
+                            (d / "facebook_dg.txt").write_text(rec["facebook"], encoding="utf-8")
+                            (d / "marketplace.txt").write_text(rec["marketplace"], encoding="utf-8")
+                            rec = {"key": rec["key"], "profile": rec["profile"]}
+                    fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                fh.flush()
+
+            now = time.perf_counter()
+            if now - last >= 1.0 or not pending:
+                last = now
+                rate = (n_ok + n_err) / max(now - t0, 1e-9)
+                print(f"\r⏳ {n_ok} ok, {n_err} erreurs, {len(done)} déjà faits — {rate:.0f} véhicules/s",
+                      end="", file=sys.stderr, flush=True)
+
+    print(file=sys.stderr)
+    print(f"✅ Bulk: {n_ok} ok, {n_err} erreurs, {len(done)} déjà faits -> {out}")
+    return 0 if n_err == 0 else 1
+
+
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--in", dest="inp", required=True)
-    ap.add_argument("--out", dest="outdir", required=True)
+    ap.add_argument("--in", dest="inp", required=True,
+                    help="Vehicle .json, or for bulk mode a directory of *.json / a .jsonl or .csv inventory")
+    ap.add_argument("--out", dest="outdir", required=True,
+                    help="Output directory (sharded in bulk mode), or a .jsonl file in bulk mode")
+    ap.add_argument("--jobs", type=int, default=0, help="Bulk mode: worker processes (default: all cores)")
+    ap.add_argument("--chunk", type=int, default=256, help="Bulk mode: vehicles per worker task")
 
     # ✅ NOUVEAU: IA uniquement si demandé
     ap.add_argument("--ai", action="store_true", help="Generate optional AI versions (requires OPENAI_API_KEY)")
+    ap.add_argument("--ai-force", action="store_true", help="Ignore the LLM disk cache and regenerate AI intros")
+    ap.add_argument("--no-llm-cache", action="store_true", help="Disable the LLM disk cache (no read, no write)")
+    ap.add_argument("--ai-deadline", type=float, default=None,
+                    help="Stream AI intros with a hard time budget in seconds (best valid prefix on timeout)")
+    ap.add_argument("--llm-metrics", action="store_true", help="Print LLM call metrics (latency, tokens, cost) for this run")
     args = ap.parse_args()
 
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    src = Path(args.inp)
+    if src.is_dir() or src.suffix.lower() in (".jsonl", ".csv"):
+        if args.ai:
+            raise SystemExit("--ai is single-vehicle only (bulk AI: engine.llm.generate_many).")
+        raise SystemExit(run_bulk(src, Path(args.outdir), jobs=args.jobs, chunk=max(1, args.chunk)))
+
+    from engine.classifier import classify
+
     vehicle = json.loads(Path(args.inp).read_text(encoding="utf-8"))
     kind = classify(vehicle)
 
@@ -42,9 +211,18 @@ def main():
     if args.ai:
         if not os.getenv("OPENAI_API_KEY"):
             raise SystemExit("OPENAI_API_KEY missing but --ai was requested.")
-        from engine.llm import generate_ad_text
-        fb_ai = generate_ad_text(vehicle, kind)
-        mp_ai = generate_ad_text(vehicle, kind, max_chars=800)
+        from engine import llm_cache
+        from engine.llm import generate_ad_variants, stream_ad_variants
+        if args.no_llm_cache:
+            llm_cache.ENABLED = False
+        if args.ai_deadline is not None:
+            # streaming: les 2 intros en parallèle, latence bornée par --ai-deadline
+            ai = stream_ad_variants(vehicle, kind, deadline=args.ai_deadline, force=args.ai_force)
+        else:
+            # un seul appel: facebook (220) + marketplace (800)
+            ai = generate_ad_variants(vehicle, kind, force=args.ai_force)
+        fb_ai = ai["facebook"]
+        mp_ai = ai["marketplace"]
         (out / "facebook_ai.txt").write_text(fb_ai, encoding="utf-8")
         (out / "marketplace_ai.txt").write_text(mp_ai, encoding="utf-8")
 
@@ -54,6 +232,9 @@ def main():
     if args.ai:
         print("✅ Wrote:", out / "facebook_ai.txt")
         print("✅ Wrote:", out / "marketplace_ai.txt")
+    if args.llm_metrics:
+        from engine import llm_metrics
+        print("📊 LLM:", json.dumps(llm_metrics.summary(), ensure_ascii=False))
 
 if __name__ == "__main__":
     main()
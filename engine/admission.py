@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+admission.py
+- Contrôle d'admission pour l'API: slots bornés par type de travail
+    "cpu" : parsing sticker_to_ad (subprocess / daemon, ~1 cœur chacun)
+    "io"  : requêtes /generate (Storage, rendu DG, écritures des sorties)
+- File d'attente bornée + attente max: au-delà -> Overloaded (l'API répond 429 + Retry-After)
+  au lieu d'empiler des jobs qui finiraient tous en timeout
+- stats(): occupés, en attente, admis / rejetés, attente p50/p95 par pool
+
+Config (env):
+  ADMISSION=0                désactive (slots illimités)
+  ADMIT_CPU_SLOTS            défaut: nb de cœurs
+  ADMIT_CPU_QUEUE            attente max en file (défaut: 2 x slots)
+  ADMIT_CPU_WAIT             secondes max en file (défaut: 10)
+  ADMIT_IO_SLOTS / ADMIT_IO_QUEUE / ADMIT_IO_WAIT   (défauts: 16 / 16 / 5)
+  (io: slots + file restent sous les 40 threads du threadpool FastAPI -> /health répond toujours)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Optional
+
+ENABLED = os.getenv("ADMISSION", "1").strip() != "0"
+
+# durées gardées pour les percentiles / l'estimation du Retry-After
+WINDOW = 500
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, "").strip() or default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(name, "").strip() or default))
+    except ValueError:
+        return default
+
+
+class Overloaded(RuntimeError):
+    """Pool saturé: file pleine ou attente trop longue. retry_after en secondes (entier >= 1)."""
+
+    def __init__(self, pool: str, reason: str, retry_after: int) -> None:
+        super().__init__(f"{pool} saturé ({reason}), réessayer dans {retry_after}s")
+        self.pool = pool
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Pool:
+    def __init__(self, name: str, slots: int, queue: int, max_wait: float) -> None:
+        self.name = name
+        self.slots = slots
+        self.queue = queue
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self.busy = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.waits: Deque[float] = deque(maxlen=WINDOW)
+        self.service: Deque[float] = deque(maxlen=WINDOW)
+
+    def retry_after(self) -> int:
+        """Estimation: temps de service moyen x (file + 1) / slots, borné à [1, 60] s."""
+        avg = sum(self.service) / len(self.service) if self.service else 1.0
+        est = avg * (self.waiting + 1) / self.slots
+        return int(min(60.0, max(1.0, est + 0.5)))
+
+    def _reject(self, reason: str) -> Overloaded:
+        self.rejected += 1
+        return Overloaded(self.name, reason, self.retry_after())
+
+    def acquire(self, timeout: Optional[float] = None) -> float:
+        """Prend un slot (attente bornée). Retourne le temps d'attente; lève Overloaded sinon."""
+        limit = self.max_wait if timeout is None else timeout
+        t0 = time.monotonic()
+        with self._cond:
+            if self.busy >= self.slots:
+                if self.waiting >= self.queue:
+                    raise self._reject("file pleine")
+                self.waiting += 1
+                try:
+                    while self.busy >= self.slots:
+                        left = limit - (time.monotonic() - t0)
+                        if left <= 0:
+                            raise self._reject("attente max")
+                        self._cond.wait(left)
+                finally:
+                    self.waiting -= 1
+            self.busy += 1
+            self.admitted += 1
+            waited = time.monotonic() - t0
+            self.waits.append(waited)
+            return waited
+
+    def release(self, service_s: Optional[float] = None) -> None:
+        with self._cond:
+            self.busy -= 1
+            if service_s is not None:
+                self.service.append(service_s)
+            # notify_all: un waiter réveillé qui sort en timeout ne doit pas "avaler" le slot libéré
+            self._cond.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            waits = sorted(self.waits)
+            service = sorted(self.service)
+
+        def pct(xs, q: float) -> Optional[float]:
+            return round(xs[min(len(xs) - 1, int(q * len(xs)))], 4) if xs else None
+
+        return {
+            "slots": self.slots,
+            "busy": self.busy,
+            "queue_depth": self.waiting,
+            "queue_max": self.queue,
+            "max_wait_s": self.max_wait,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_s": {"p50": pct(waits, 0.50), "p95": pct(waits, 0.95), "max": round(waits[-1], 4) if waits else None},
+            "service_s": {"p50": pct(service, 0.50), "p95": pct(service, 0.95)},
+            "retry_after_s": self.retry_after(),
+        }
+
+
+_CPU_SLOTS = _env_int("ADMIT_CPU_SLOTS", os.cpu_count() or 1)
+_IO_SLOTS = _env_int("ADMIT_IO_SLOTS", 16)
+
+POOLS: Dict[str, Pool] = {
+    "cpu": Pool(
+        "cpu",
+        _CPU_SLOTS,
+        _env_int("ADMIT_CPU_QUEUE", 2 * _CPU_SLOTS),
+        _env_float("ADMIT_CPU_WAIT", 10.0),
+    ),
+    "io": Pool(
+        "io",
+        _IO_SLOTS,
+        _env_int("ADMIT_IO_QUEUE", _IO_SLOTS),
+        _env_float("ADMIT_IO_WAIT", 5.0),
+    ),
+}
+
+
+@contextmanager
+def slot(pool: str, timeout: Optional[float] = None) -> Iterator[float]:
+    """with slot("cpu") as waited: ...  -> Overloaded si le pool est saturé."""
+    if not ENABLED:
+        yield 0.0
+        return
+    p = POOLS[pool]
+    waited = p.acquire(timeout)
+    t0 = time.monotonic()
+    try:
+        yield waited
+    finally:
+        p.release(time.monotonic() - t0)
+
+
+def stats() -> Dict[str, Any]:
+    return {"enabled": ENABLED, **{name: p.snapshot() for name, p in POOLS.items()}}
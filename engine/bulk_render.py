@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+bulk_render.py
+- Rendu en lot d'un snapshot d'inventaire (JSONL / CSV / liste de dicts)
+- Lecture en flux, normalisation prix/km par colonne (par paquets, valeurs uniques une seule fois)
+- Tous les formats demandés par véhicule depuis une seule VehicleView (dg_text.render_*)
+  + format "profile" (classifier + profiles/*.build)
+- Générateur: les résultats sortent au fil de l'eau (pas tout l'inventaire en mémoire)
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import re
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from engine.ad_builder import normalize_km
+from engine.dg_text import RENDERERS, vehicle_view
+
+Snapshot = Union[str, Path, Iterable[Dict[str, Any]]]
+
+DG_FORMATS = tuple(RENDERERS)
+ALL_FORMATS = DG_FORMATS + ("profile",)
+
+
+# --------------------------
+# Lecture snapshot (flux)
+# --------------------------
+
+class SnapshotLineError(ValueError):
+    """Ligne de snapshot illisible (JSON invalide / pas un objet); le message porte le no de ligne."""
+
+
+def iter_snapshot_rows(source: Snapshot) -> Iterator[Tuple[int, Union[Dict[str, Any], SnapshotLineError]]]:
+    """
+    (no de ligne, véhicule) en flux; ligne illisible -> (no, SnapshotLineError) sans interrompre
+    la lecture (à l'appelant de l'ignorer, la rapporter ou lever).
+    .jsonl: no de ligne du fichier; .csv: ligne du lecteur CSV; itérable: rang (1..n).
+    """
+    if isinstance(source, (str, Path)):
+        path = Path(source).expanduser()
+        with path.open("r", encoding="utf-8", newline="") as fh:
+            if path.suffix.lower() == ".csv":
+                reader = csv.DictReader(fh)
+                for row in reader:
+                    yield reader.line_num, {k: v for k, v in row.items() if k}
+            else:
+                for n, line in enumerate(fh, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        row = json.loads(line)
+                    except ValueError as e:
+                        yield n, SnapshotLineError(f"ligne {n}: JSON invalide ({e})")
+                        continue
+                    if isinstance(row, dict):
+                        yield n, row
+                    else:
+                        yield n, SnapshotLineError(f"ligne {n}: objet JSON attendu")
+        return
+
+    for n, row in enumerate(source, 1):
+        yield n, row if isinstance(row, dict) else SnapshotLineError(f"ligne {n}: objet attendu")
+
+
+def iter_snapshot(source: Snapshot) -> Iterator[Dict[str, Any]]:
+    """
+    .jsonl: un véhicule par ligne; .csv: en-têtes = champs; sinon itérable de dicts.
+    Ligne illisible -> SnapshotLineError (un snapshot complet partiel fausserait les retraits).
+    """
+    for _, row in iter_snapshot_rows(source):
+        if isinstance(row, SnapshotLineError):
+            raise row
+        yield row
+
+
+# --------------------------
+# Normalisation par colonne
+# --------------------------
+
+_CENTS_RE = re.compile(r"[.,]\d{2}(?=\s*\$?\s*$)")
+_NON_DIGIT_RE = re.compile(r"[^\d]")
+
+
+def _fmt_int(n: int) -> str:
+    return f"{n:,}".replace(",", " ")
+
+
+@lru_cache(maxsize=65536)
+def _price_from_str(raw: str) -> Tuple[Optional[int], str]:
+    digits = _NON_DIGIT_RE.sub("", _CENTS_RE.sub("", raw))
+    if not digits:
+        return None, raw.strip()
+    n = int(digits)
+    if n < 1000 or n > 500000:
+        return None, raw.strip()
+    return n, f"{_fmt_int(n)} $"
+
+
+@lru_cache(maxsize=65536)
+def _km_from_str(raw: str) -> Tuple[Optional[int], str]:
+    disp = normalize_km(raw)
+    if not disp:
+        return None, raw.strip()
+    return int(_NON_DIGIT_RE.sub("", disp)), disp
+
+
+def normalize_price_column(values: Sequence[Any]) -> Tuple[List[Optional[int]], List[str]]:
+    """
+    Colonne prix -> (entiers, affichage "33 995 $"). Nombres: arrondi direct;
+    textes: normalisés une seule fois par valeur distincte (cache).
+    Valeur non reconnue: entier None, affichage = texte d'origine.
+    """
+    ints: List[Optional[int]] = []
+    disp: List[str] = []
+    for v in values:
+        if v is None or v == "":
+            ints.append(None)
+            disp.append("")
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            n = int(round(v))
+            ints.append(n)
+            disp.append(f"{_fmt_int(n)} $")
+        else:
+            n, d = _price_from_str(str(v))
+            ints.append(n)
+            disp.append(d)
+    return ints, disp
+
+
+def normalize_km_column(values: Sequence[Any]) -> Tuple[List[Optional[int]], List[str]]:
+    """Colonne km -> (entiers, affichage "56 000 km"); miles convertis (voir normalize_km)."""
+    ints: List[Optional[int]] = []
+    disp: List[str] = []
+    for v in values:
+        if v is None or v == "":
+            ints.append(None)
+            disp.append("")
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            n = int(round(v))
+            ints.append(n)
+            disp.append(f"{_fmt_int(n)} km")
+        else:
+            n, d = _km_from_str(str(v))
+            ints.append(n)
+            disp.append(d)
+    return ints, disp
+
+
+def normalize_chunk(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Ajoute price_int/km_int et remplace price/mileage par l'affichage normalisé (en place).
+    """
+    p_int, p_disp = normalize_price_column([r.get("price") for r in rows])
+    k_int, k_disp = normalize_km_column([r.get("mileage") or r.get("km") for r in rows])
+    for r, pi, pd, ki, kd in zip(rows, p_int, p_disp, k_int, k_disp):
+        r["price_int"] = pi
+        r["price"] = pd
+        r["km_int"] = ki
+        r["mileage"] = kd
+    return rows
+
+
+# --------------------------
+# Rendu
+# --------------------------
+
+_profile_builders: Optional[Dict[str, Any]] = None
+
+
+def _profile_build(kind: str):
+    global _profile_builders
+    if _profile_builders is None:
+        from profiles import default, exotic, suv, truck
+        _profile_builders = {
+            "exotic": exotic.build,
+            "truck": truck.build,
+            "suv": suv.build,
+            "default": default.build,
+        }
+    return _profile_builders.get(kind, _profile_builders["default"])
+
+
+def _render_profile(row: Dict[str, Any]) -> Tuple[str, str]:
+    from engine.classifier import classify
+
+    # profiles/* ajoutent eux-mêmes " $" / " km": on leur passe les valeurs brutes
+    v = dict(row)
+    v["price"] = row["price_int"] if row.get("price_int") is not None else row.get("price", "")
+    v["km"] = row["km_int"] if row.get("km_int") is not None else row.get("km", "")
+    return _profile_build(classify(v))(v)
+
+
+def render_snapshot(
+    source: Snapshot,
+    formats: Iterable[str] = ("facebook", "marketplace"),
+    chunk_size: int = 1000,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Générateur: {"stock": ..., "<format>": texte, ...} par véhicule, dans l'ordre du snapshot.
+    formats: facebook, marketplace, sticker (dg_text) et/ou profile
+    (-> profile_facebook + profile_marketplace).
+    """
+    formats = tuple(formats)
+    unknown = [f for f in formats if f not in ALL_FORMATS]
+    if unknown:
+        raise ValueError(f"formats inconnus: {unknown} (choix: {', '.join(ALL_FORMATS)})")
+
+    dg = [(f, RENDERERS[f]) for f in formats if f in RENDERERS]
+    want_profile = "profile" in formats
+
+    # dicts fournis par l'appelant: copiés (la normalisation écrit dans la ligne)
+    owned = isinstance(source, (str, Path))
+    rows = iter_snapshot(source)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not owned:
+            chunk = [dict(r) for r in chunk]
+        if not chunk:
+            return
+        for row in normalize_chunk(chunk):
+            out: Dict[str, Any] = {"stock": str(row.get("stock") or "").strip().upper()}
+            if dg:
+                view = vehicle_view(row, row.get("sticker_lines"))
+                for fmt, render in dg:
+                    out[fmt] = render(view)
+            if want_profile:
+                out["profile_facebook"], out["profile_marketplace"] = _render_profile(row)
+            yield out
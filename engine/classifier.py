@@ -1,49 +1,200 @@
 # classifier.py – version intelligente 2026 pour personnaliser AI/hashtags/tone
-def classify(vehicle: dict) -> str:
-    """
-    Détecte le type de véhicule pour adapter l'AI intro, hashtags et ton vendeur.
-    Priorité : brand > title > mots-clés.
-    """
-    title = (vehicle.get("title") or "").lower()
-    brand = (vehicle.get("brand") or "").lower()
-    model = (vehicle.get("model") or "").lower()
-    full_text = f"{brand} {model} {title}".strip()
+# - Un seul classifieur pour tout le moteur (profiles/*, marketplace_smart)
+# - Mots-clés compilés une fois en un automate regex, correspondance sur mots entiers
+#   ("rt" ne matche plus dans "sport", "ev" plus dans "chevrolet")
+# - Cache par texte normalisé + classify_many() pour les lots
+from __future__ import annotations
 
-    # Exotic / haut de gamme (très recherchés, ton premium)
-    exotic_brands = ("ferrari", "lamborghini", "mclaren", "porsche", "aston martin", "bentley", "rolls royce")
-    if any(b in full_text for b in exotic_brands):
-        return "exotic"
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
 
-    # Truck / Pickup (robuste, travail, towing)
-    truck_brands = ("ram", "ford", "chevrolet", "gmc", "toyota", "nissan")
-    truck_words = ("1500", "2500", "3500", "f-150", "f150", "silverado", "sierra", "tacoma", "tundra", "pickup", "camion")
-    if any(b in brand for b in truck_brands) and any(w in full_text for w in truck_words):
-        return "truck"
 
-    # SUV / CUV / VUS (familial, polyvalent, hiver Beauce)
-    suv_words = ("suv", "cuv", "vus", "rogue", "cherokee", "grand cherokee", "durango", "explorer", "rav4", "cr-v", "highlander", "pilot", "pathfinder")
-    if any(w in full_text for w in suv_words):
-        return "suv"
+# --------------------------
+# Tables (mot-clé -> étiquette)
+# --------------------------
 
-    # Minivan / Familial (famille, sièges, espace)
-    minivan_words = ("minivan", "caravan", "grand caravan", "pacifica", "odyssey", "sienna", "town & country")
-    if any(w in full_text for w in minivan_words):
-        return "minivan"
+# Marques, par priorité (la première de la liste gagne si plusieurs matchent)
+BRANDS: Tuple[str, ...] = (
+    "ferrari", "lamborghini", "mclaren", "porsche", "aston martin", "maserati", "bentley", "rolls",
+    "mercedes", "bmw", "audi", "lexus", "cadillac", "tesla",
+    "ram", "dodge", "jeep", "chrysler", "ford", "chevrolet", "gmc", "toyota", "honda", "hyundai",
+    "kia", "mazda", "subaru", "nissan", "volkswagen", "volvo",
+    "alfa romeo", "fiat",
+)
 
-    # Sedan / Berline (économique, ville)
-    sedan_words = ("sedan", "berline", "accord", "camry", "civic", "corolla", "malibu", "altima", "sentra")
-    if any(w in full_text for w in sedan_words):
-        return "sedan"
+EXOTIC_BRANDS = ("ferrari", "lamborghini", "mclaren", "porsche")
+LUXURY_BRANDS = ("bentley", "rolls", "aston martin", "maserati")
+TRUCK_BRANDS = ("ram", "ford", "chevrolet", "gmc", "toyota", "nissan")
 
+KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    # Exotic / haut de gamme (modèles)
+    "exotic": ("huracan", "aventador", "720s", "gt3", "gt2", "911 turbo", "f8", "roma"),
+    # Truck / Pickup (robuste, travail, towing)
+    "truck": (
+        "f-150", "f150", "silverado", "sierra", "tacoma", "tundra", "super duty",
+        "titan", "frontier", "ranger", "colorado", "canyon", "gladiator", "pickup", "pick-up", "camion",
+    ),
+    # Cote de charge: seulement avec une marque de pickup
+    "truck_rating": ("1500", "2500", "3500"),
+    # Fourgons: jamais "truck" par la marque / la cote ("RAM ProMaster 2500" n'est pas un pickup)
+    "van": ("promaster", "promaster city", "cargo van", "transit", "sprinter"),
+    # SUV / CUV / VUS (familial, polyvalent, hiver Beauce)
+    "suv": (
+        "suv", "cuv", "vus", "rogue", "cherokee", "grand cherokee", "durango", "explorer", "rav4",
+        "cr-v", "highlander", "pilot", "pathfinder", "wrangler", "4runner", "tiguan", "q5", "x5",
+        "compass", "renegade", "wagoneer",
+    ),
+    # Minivan / Familial (famille, sièges, espace)
+    "minivan": ("minivan", "caravan", "grand caravan", "pacifica", "odyssey", "sienna", "town & country"),
+    # Sedan / Berline (économique, ville)
+    "sedan": ("sedan", "berline", "accord", "camry", "civic", "corolla", "malibu", "altima", "sentra"),
     # Coupe / Sport (performance, jeune)
-    coupe_words = ("coupe", "charger", "challenger", "mustang", "camaro", "370z", "supra")
-    if any(w in full_text for w in coupe_words):
-        return "coupe"
-
+    "sport": (
+        "coupe", "charger", "challenger", "mustang", "camaro", "corvette", "370z", "supra",
+        "type r", "sti", "gti", "srt", "rt", "r/t", "scat pack", "hellcat",
+    ),
     # EV / Hybride / Électrique (éco, futur, économie essence)
-    ev_words = ("ev", "électrique", "hybrid", "hybride", "plug-in", "bolt", "leaf", "model 3", "ioniq", "prius")
-    if any(w in full_text for w in ev_words):
-        return "ev"
+    "ev": (
+        "ev", "électrique", "electrique", "hybrid", "hybride", "plug-in", "phev", "4xe",
+        "bolt", "leaf", "model 3", "ioniq", "prius",
+    ),
+}
+
+LUXURY_PRICE = 120000
+
+
+def _build_automaton() -> Tuple["re.Pattern[str]", Dict[str, Tuple[str, ...]]]:
+    labels: Dict[str, List[str]] = {}
+    for b in BRANDS:
+        labels.setdefault(b, []).append("brand")
+    for tag, words in KEYWORDS.items():
+        for w in words:
+            labels.setdefault(w, []).append(tag)
+    # plus long d'abord: "grand cherokee" avant "cherokee"
+    alts = "|".join(re.escape(k) for k in sorted(labels, key=len, reverse=True))
+    pattern = re.compile(rf"(?<!\w)(?:{alts})(?!\w)")
+    return pattern, {k: tuple(v) for k, v in labels.items()}
+
+
+_AUTOMATON, _LABELS = _build_automaton()
+_BRAND_RANK = {b: i for i, b in enumerate(BRANDS)}
+
+
+# --------------------------
+# Résultat
+# --------------------------
+
+@dataclass(frozen=True, slots=True)
+class Classification:
+    brand: str                 # marque détectée (minuscules), "" si aucune
+    kind: str                  # profiles/*: exotic, truck, suv, minivan, sedan, coupe, ev, default
+    category: str              # marketplace_smart (sans prix): exotic, luxury, truck, suv, sport, daily
+    tags: FrozenSet[str]
+
+
+def normalize_text(s: str) -> str:
+    s = (s or "").strip().lower()
+    s = s.replace("’", "'").replace("−", "-").replace("–", "-").replace("\u00a0", " ")
+    return " ".join(s.split())
+
+
+def _decide(brand: str, tags: FrozenSet[str]) -> Tuple[str, str]:
+    is_exotic = brand in EXOTIC_BRANDS or "exotic" in tags
+    is_truck = "truck" in tags or (
+        "van" not in tags
+        and (brand == "ram" or ("truck_rating" in tags and brand in TRUCK_BRANDS))
+    )
+
+    if is_exotic:
+        category = "exotic"
+    elif brand in LUXURY_BRANDS:
+        category = "luxury"
+    elif is_truck:
+        category = "truck"
+    elif "suv" in tags:
+        category = "suv"
+    elif "sport" in tags:
+        category = "sport"
+    else:
+        category = "daily"
+
+    # profiles/*: pas de profil "luxe" -> ton premium (exotic)
+    if category in ("exotic", "luxury"):
+        kind = "exotic"
+    elif category in ("truck", "suv"):
+        kind = category
+    elif "minivan" in tags:
+        kind = "minivan"
+    elif "sedan" in tags:
+        kind = "sedan"
+    elif "sport" in tags:
+        kind = "coupe"
+    elif "ev" in tags:
+        kind = "ev"
+    else:
+        kind = "default"
+    return kind, category
+
+
+@lru_cache(maxsize=8192)
+def _classify_text(text: str) -> Classification:
+    brands: List[str] = []
+    tags = set()
+    for m in _AUTOMATON.finditer(text):
+        for label in _LABELS[m.group(0)]:
+            if label == "brand":
+                brands.append(m.group(0))
+            else:
+                tags.add(label)
+    brand = min(brands, key=_BRAND_RANK.__getitem__) if brands else ""
+    frozen = frozenset(tags)
+    kind, category = _decide(brand, frozen)
+    return Classification(brand=brand, kind=kind, category=category, tags=frozen)
+
+
+def _vehicle_text(vehicle: Dict[str, Any]) -> str:
+    brand = vehicle.get("brand") or vehicle.get("make") or ""
+    return normalize_text(f"{brand} {vehicle.get('model') or ''} {vehicle.get('title') or ''}")
+
+
+# --------------------------
+# API
+# --------------------------
+
+def classify_title(title: str) -> Classification:
+    return _classify_text(normalize_text(title))
+
+
+def classification(vehicle: Dict[str, Any]) -> Classification:
+    return _classify_text(_vehicle_text(vehicle))
+
+
+def classify(vehicle: dict) -> str:
+    """
+    Détecte le type de véhicule pour adapter l'AI intro, hashtags et ton vendeur.
+    Texte analysé: brand/make + model + title (mots entiers).
+    """
+    return classification(vehicle).kind
+
+
+def classify_many(vehicles: Iterable[Dict[str, Any]]) -> List[str]:
+    """classify() sur un lot; chaque texte distinct n'est analysé qu'une fois."""
+    seen: Dict[str, str] = {}
+    out: List[str] = []
+    for v in vehicles:
+        text = _vehicle_text(v)
+        kind = seen.get(text)
+        if kind is None:
+            kind = seen[text] = _classify_text(text).kind
+        out.append(kind)
+    return out
+
 
-    # Default (catch-all)
-    return "default"
+def marketplace_category(title: str, price: Optional[float] = None) -> str:
+    """Catégorie marketplace_smart; un prix >= LUXURY_PRICE passe en "luxury" (sauf exotic)."""
+    c = classify_title(title)
+    if c.category != "exotic" and price is not None and price >= LUXURY_PRICE:
+        return "luxury"
+    return c.category
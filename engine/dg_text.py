@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from engine.hashtags import hashtag_line
 
 def is_allowed_stellantis_brand(txt: str) -> bool:
     low = (txt or "").lower()
@@ -101,40 +104,8 @@ def _format_specs_lines(specs: Dict[str, str]) -> List[str]:
 
 
 def _hashtags_for_vehicle(v: Dict[str, Any]) -> str:
-    make = _s(v.get("make")).lower()
-    title = _s(v.get("title")).lower()
-
-    base = [
-        "#VehiculeOccasion", "#AutoUsagée", "#Quebec", "#Beauce",
-        "#SaintGeorges", "#KennebecDodge", "#DanielGiroux"
-    ]
-
-    # détecte par make ou titre si make vide
-    key = make or title
-
-    if "jeep" in key:
-        tags = ["#Jeep", "#Wrangler", "#4x4"] + base
-    elif "ram" in key:
-        tags = ["#RAM", "#Truck", "#Pickup"] + base
-    elif "dodge" in key:
-        tags = ["#Dodge"] + base
-    elif "chrysler" in key:
-        tags = ["#Chrysler"] + base
-    elif "fiat" in key:
-        tags = ["#Fiat"] + base
-    elif make:
-        tags = [f"#{make.capitalize()}"] + base
-    else:
-        tags = base
-
-    # dedupe
-    seen = set()
-    out: List[str] = []
-    for t in tags:
-        if t not in seen:
-            seen.add(t)
-            out.append(t)
-    return " ".join(out)
+    # détecte par make ou titre si make vide (tables + cache: engine/hashtags.py)
+    return hashtag_line(_s(v.get("title")), _s(v.get("make")), style="dg")
 
 
 def _choose_equipment_lines(vehicle: Dict[str, Any], sticker_lines: Optional[List[str]]) -> tuple[List[str], str]:
@@ -165,6 +136,53 @@ def _choose_equipment_lines(vehicle: Dict[str, Any], sticker_lines: Optional[Lis
     return [], ""
 
 
+# --------------------------
+# Vue normalisée (1 seule normalisation pour tous les formats)
+# --------------------------
+
+@dataclass(frozen=True, slots=True)
+class VehicleView:
+    title: str
+    price: str
+    mileage: str
+    stock: str
+    url: str
+    vin: str  # vide si hors Stellantis
+    headline: str
+    year: str
+    transmission: str
+    fuel: str
+    drivetrain: str
+    body: str
+    stellantis: bool
+    equipment: Tuple[str, ...]
+    source_label: str  # "Window Sticker" | "Kennebec" | ""
+    hashtags: str
+
+
+def vehicle_view(vehicle: Dict[str, Any], sticker_lines: Optional[List[str]] = None) -> VehicleView:
+    stellantis = _is_stellantis(vehicle)
+    equipment_lines, source_label = _choose_equipment_lines(vehicle, sticker_lines)
+    return VehicleView(
+        title=_s(vehicle.get("title")),
+        price=_s(vehicle.get("price")),
+        mileage=_s(vehicle.get("mileage") or vehicle.get("km")),
+        stock=_s(vehicle.get("stock")).upper(),
+        url=_s(vehicle.get("url")),
+        vin=_s(vehicle.get("vin")).upper() if stellantis else "",
+        headline=_s(vehicle.get("headline_features")),
+        year=_s(vehicle.get("year")),
+        transmission=_s(vehicle.get("transmission")),
+        fuel=_s(vehicle.get("fuel")),
+        drivetrain=_s(vehicle.get("drivetrain")),
+        body=_s(vehicle.get("body")),
+        stellantis=stellantis,
+        equipment=tuple(equipment_lines),
+        source_label=source_label,
+        hashtags=_hashtags_for_vehicle(vehicle),
+    )
+
+
 # --------------------------
 # Text builders (DG long vendeur)
 # --------------------------
@@ -173,63 +191,54 @@ def build_facebook_dg(vehicle: Dict[str, Any], sticker_lines: Optional[List[str]
     """
     Facebook = VERSION LONGUE DG (vendeur).
     """
-    title = _s(vehicle.get("title"))
-    price = _s(vehicle.get("price"))
-    mileage = _s(vehicle.get("mileage") or vehicle.get("km"))
-    stock = _s(vehicle.get("stock")).upper()
-    url = _s(vehicle.get("url"))
-    vin = _s(vehicle.get("vin")).upper()
+    return render_facebook(vehicle_view(vehicle, sticker_lines))
 
-    headline = _s(vehicle.get("headline_features"))
-    specs = vehicle.get("specs") or {}
 
-    year = _s(vehicle.get("year"))
-    transmission = _s(vehicle.get("transmission"))
-    fuel = _s(vehicle.get("fuel"))
-    drivetrain = _s(vehicle.get("drivetrain"))
-    body = _s(vehicle.get("body"))
+def build_marketplace_dg(vehicle: Dict[str, Any], sticker_lines: Optional[List[str]] = None) -> str:
+    """
+    Marketplace = VERSION COMPACTE (pas 40 lignes de blabla).
+    """
+    return render_marketplace(vehicle_view(vehicle, sticker_lines))
 
-    stellantis = _is_stellantis(vehicle)
-    if not stellantis:
-        vin = ""
 
+def render_facebook(view: VehicleView) -> str:
     lines: List[str] = []
-    lines.append(f"🔥 {title} 🔥")
+    lines.append(f"🔥 {view.title} 🔥")
     lines.append("")
 
-    hl = _format_headline(headline)
+    hl = _format_headline(view.headline)
     if hl:
         lines.append(hl)
         lines.append("")
 
-    if price:
-        lines.append(f"💥 {price} 💥")
-    if mileage:
-        lines.append(f"📊 Kilométrage : {mileage}")
+    if view.price:
+        lines.append(f"💥 {view.price} 💥")
+    if view.mileage:
+        lines.append(f"📊 Kilométrage : {view.mileage}")
     lines.append("📍 Kennebec Dodge Chrysler — Saint-Georges (Beauce)")
     lines.append("")
 
     lines.append("🚗 DÉTAILS")
-    if stock:
-        lines.append(f"✅ Inventaire : {stock}")
-    if year:
-        lines.append(f"✅ Année : {year}")
-    if vin:
-        lines.append(f"✅ VIN : {vin}")
-    if transmission:
-        lines.append(f"✅ Transmission : {transmission}")
-    if drivetrain:
-        lines.append(f"✅ Entraînement : {drivetrain}")
-    if fuel:
-        lines.append(f"✅ Carburant : {fuel}")
-    if body:
-        lines.append(f"✅ Carrosserie : {body}")
+    if view.stock:
+        lines.append(f"✅ Inventaire : {view.stock}")
+    if view.year:
+        lines.append(f"✅ Année : {view.year}")
+    if view.vin:
+        lines.append(f"✅ VIN : {view.vin}")
+    if view.transmission:
+        lines.append(f"✅ Transmission : {view.transmission}")
+    if view.drivetrain:
+        lines.append(f"✅ Entraînement : {view.drivetrain}")
+    if view.fuel:
+        lines.append(f"✅ Carburant : {view.fuel}")
+    if view.body:
+        lines.append(f"✅ Carrosserie : {view.body}")
 
     lines.append("📄 Vente commerciale — 2 taxes applicables")
     lines.append("✅ Inspection complète — véhicule propre & prêt à partir.")
     lines.append("")
 
-    equipment_lines, source_label = _choose_equipment_lines(vehicle, sticker_lines)
+    equipment_lines, source_label = view.equipment, view.source_label
 
     if equipment_lines:
         if source_label == "Window Sticker":
@@ -251,14 +260,14 @@ def build_facebook_dg(vehicle: Dict[str, Any], sticker_lines: Optional[List[str]
 
         lines.append("")
 
-    if url:
+    if view.url:
         lines.append("🔗 Fiche complète :")
-        lines.append(url)
+        lines.append(view.url)
         lines.append("")
 
-    if vin and stellantis:
+    if view.vin and view.stellantis:
         lines.append("🧾 Window Sticker :")
-        lines.append(f"https://www.chrysler.com/hostd/windowsticker/getWindowStickerPdf.do?vin={vin}")
+        lines.append(f"https://www.chrysler.com/hostd/windowsticker/getWindowStickerPdf.do?vin={view.vin}")
         lines.append("")
 
     # Footer DG long
@@ -273,39 +282,25 @@ def build_facebook_dg(vehicle: Dict[str, Any], sticker_lines: Optional[List[str]
     lines.append("📩 Écris-moi en privé — ou texte direct")
     lines.append("📞 Daniel Giroux — 418-222-3939")
     lines.append("")
-    lines.append(_hashtags_for_vehicle(vehicle))
+    lines.append(view.hashtags)
 
     return "\n".join(lines).strip() + "\n"
 
 
-def build_marketplace_dg(vehicle: Dict[str, Any], sticker_lines: Optional[List[str]] = None) -> str:
-    """
-    Marketplace = VERSION COMPACTE (pas 40 lignes de blabla).
-    """
-    title = _s(vehicle.get("title"))
-    price = _s(vehicle.get("price"))
-    mileage = _s(vehicle.get("mileage") or vehicle.get("km"))
-    stock = _s(vehicle.get("stock")).upper()
-    url = _s(vehicle.get("url"))
-    vin = _s(vehicle.get("vin")).upper()
-
-    stellantis = _is_stellantis(vehicle)
-    if not stellantis:
-        vin = ""
-
+def render_marketplace(view: VehicleView) -> str:
     lines: List[str] = []
-    lines.append(f"🔥 {title} 🔥")
-    if price:
-        lines.append(f"💥 {price} 💥")
-    if mileage:
-        lines.append(f"📊 {mileage}")
-    if stock:
-        lines.append(f"📦 Inventaire : {stock}")
+    lines.append(f"🔥 {view.title} 🔥")
+    if view.price:
+        lines.append(f"💥 {view.price} 💥")
+    if view.mileage:
+        lines.append(f"📊 {view.mileage}")
+    if view.stock:
+        lines.append(f"📦 Inventaire : {view.stock}")
     lines.append("📄 Vente commerciale — 2 taxes applicables")
     lines.append("✅ Inspection complète — prêt à partir")
     lines.append("")
 
-    equipment_lines, source_label = _choose_equipment_lines(vehicle, sticker_lines)
+    equipment_lines, source_label = view.equipment, view.source_label
     if equipment_lines:
         lines.append("✨ Options (Window Sticker) :" if source_label == "Window Sticker" else "✨ Options & confort :")
         # compact: 10 max
@@ -324,15 +319,71 @@ def build_marketplace_dg(vehicle: Dict[str, Any], sticker_lines: Optional[List[s
     lines.append("📍 Kennebec Dodge Chrysler — Saint-Georges (Beauce)")
     lines.append("")
 
-    if url:
+    if view.url:
         lines.append("🔗 Fiche complète :")
-        lines.append(url)
+        lines.append(view.url)
         lines.append("")
 
-    if vin and stellantis:
+    if view.vin and view.stellantis:
         lines.append("🧾 Window Sticker :")
-        lines.append(f"https://www.chrysler.com/hostd/windowsticker/getWindowStickerPdf.do?vin={vin}")
+        lines.append(f"https://www.chrysler.com/hostd/windowsticker/getWindowStickerPdf.do?vin={view.vin}")
         lines.append("")
 
     lines.append("📞 Daniel Giroux — 418-222-3939")
     return "\n".join(lines).strip() + "\n"
+
+
+def _equipment_to_options(lines: Iterable[str]) -> List[Dict[str, Any]]:
+    # lignes sticker_to_ad (✅ titre / ▫️ détail) ou simples puces -> options build_ad
+    out: List[Dict[str, Any]] = []
+    for raw in lines:
+        s = normalize_whitespace(raw)
+        if not s:
+            continue
+        if "▫️" in s and out:
+            d = s.replace("▫️", "").strip()
+            if d:
+                out[-1]["details"].append(d)
+            continue
+        t = _clean_bullet_line(s.lstrip("✅").strip())
+        if t:
+            out.append({"title": t, "price": "", "details": []})
+    return out
+
+
+def render_sticker(view: VehicleView) -> str:
+    """
+    Variante "sticker" = format build_ad (ad_builder) utilisé pour les WITH.
+    """
+    from engine.ad_builder import build_ad
+
+    options = _equipment_to_options(view.equipment) if view.source_label == "Window Sticker" else []
+    return build_ad(
+        title=view.title,
+        price=view.price,
+        mileage=view.mileage,
+        stock=view.stock,
+        vin=view.vin,
+        options=options,
+        vehicle_url=view.url,
+    )
+
+
+RENDERERS: Dict[str, Callable[[VehicleView], str]] = {
+    "facebook": render_facebook,
+    "marketplace": render_marketplace,
+    "sticker": render_sticker,
+}
+
+
+def render_dg(
+    vehicle: Dict[str, Any],
+    sticker_lines: Optional[List[str]] = None,
+    formats: Iterable[str] = ("facebook", "marketplace"),
+) -> Dict[str, str]:
+    """
+    Normalise le véhicule UNE fois (VehicleView) puis produit chaque format demandé.
+    formats: "facebook" (long DG), "marketplace" (compact), "sticker" (format build_ad).
+    """
+    view = vehicle_view(vehicle, sticker_lines)
+    return {fmt: RENDERERS[fmt](view) for fmt in formats}
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+hashtags.py
+- Moteur de hashtags unique pour tous les générateurs (sticker_to_ad, ad_builder,
+  dg_text, marketplace_smart)
+- Tables mots-clés -> hashtags construites une seule fois à l'import (_Matcher)
+- Résultat mémorisé (LRU) par (titre normalisé, marque, style)
+
+Styles:
+  "sticker" : sticker_to_ad (marque + modèles + variantes, max 18)
+  "ad"      : ad_builder (marques Stellantis devant la base)
+  "dg"      : dg_text (détection par marque, sinon titre)
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+Tags = Tuple[str, ...]
+
+
+class _Matcher:
+    """
+    Table ordonnée (mot-clé -> tags) + regex compilée de toutes les clés:
+    un titre sans aucune clé est rejeté en une seule recherche.
+    Sémantique "sous-chaîne" (comme les anciens `if key in title`), ordre de la table conservé.
+    """
+
+    __slots__ = ("table", "_any")
+
+    def __init__(self, table: Dict[str, Sequence[str]]) -> None:
+        self.table: Tuple[Tuple[str, Tags], ...] = tuple((k, tuple(v)) for k, v in table.items())
+        self._any = re.compile("|".join(re.escape(k) for k, _ in self.table))
+
+    def first(self, text: str) -> Optional[Tags]:
+        if not self._any.search(text):
+            return None
+        for key, tags in self.table:
+            if key in text:
+                return tags
+        return None
+
+    def all(self, text: str) -> List[str]:
+        out: List[str] = []
+        if not self._any.search(text):
+            return out
+        for key, tags in self.table:
+            if key in text:
+                out.extend(tags)
+        return out
+
+
+def _dedupe(tags: Sequence[str], fold_case: bool = True) -> List[str]:
+    out: List[str] = []
+    seen = set()
+    for t in tags:
+        k = t.lower() if fold_case else t
+        if k not in seen:
+            seen.add(k)
+            out.append(t)
+    return out
+
+
+# --------------------------
+# Tables (construites une fois)
+# --------------------------
+
+DEALER_BASE: Tags = (
+    "#VehiculeOccasion", "#AutoUsagée", "#Quebec", "#Beauce",
+    "#SaintGeorges", "#KennebecDodge", "#DanielGiroux",
+)
+
+# sticker_to_ad
+STICKER_BASE: Tags = (
+    "#Beauce", "#SaintGeorges", "#Quebec",
+    "#AutoUsagée", "#VehiculeOccasion",
+    "#DanielGiroux",
+)
+
+# Marque -> intention (première qui match)
+STICKER_BRANDS = _Matcher({
+    "ram": ["#RAM", "#Truck", "#Pickup"],
+    "jeep": ["#Jeep", "#4x4", "#SUV"],
+    "dodge": ["#Dodge", "#Performance"],
+    "chrysler": ["#Chrysler", "#Familiale"],
+    "alfa": ["#AlfaRomeo", "#Performance"],
+})
+
+# Modèle -> précision marketing (peut en matcher plusieurs)
+STICKER_MODELS = _Matcher({
+    # Dodge
+    "hornet": ["#Hornet", "#SUV", "#Performance"],
+    "challenger": ["#Challenger", "#MuscleCar"],
+    "charger": ["#Charger", "#MuscleCar"],
+    "durango": ["#Durango", "#SUV"],
+
+    # RAM
+    "promaster": ["#ProMaster", "#Cargo", "#Van"],
+    "1500": ["#RAM1500", "#Pickup"],
+    "2500": ["#RAM2500", "#HeavyDuty"],
+
+    # Jeep
+    "wagoneer": ["#Wagoneer", "#SUV", "#4x4"],
+    "wrangler": ["#Wrangler", "#OffRoad", "#4x4"],
+    "grand cherokee": ["#GrandCherokee", "#LuxurySUV", "#4x4"],
+    "gladiator": ["#Gladiator", "#Pickup4x4"],
+})
+
+# Variantes / mots-clés
+STICKER_VARIANTS = _Matcher({
+    "r/t": ["#RT"],
+    " rt ": ["#RT"],  # aide quand "RT" est séparé
+    "plus": ["#Plus"],
+    "hybrid": ["#Hybride"],
+    "plug-in": ["#HybrideRechargeable"],
+    "phev": ["#HybrideRechargeable"],
+    "awd": ["#AWD"],
+    "4x4": ["#4x4"],
+    "4wd": ["#4x4"],
+    "v8": ["#V8"],
+})
+
+STICKER_LIMIT = 18
+
+# ad_builder: chaque marque trouvée est insérée en tête (la dernière testée finit première)
+AD_BRANDS = _Matcher({
+    "ram": ["#RAM"],
+    "jeep": ["#Jeep"],
+    "dodge": ["#Dodge"],
+    "chrysler": ["#Chrysler"],
+})
+
+# dg_text: première marque trouvée (make, sinon titre)
+DG_BRANDS = _Matcher({
+    "jeep": ["#Jeep", "#Wrangler", "#4x4"],
+    "ram": ["#RAM", "#Truck", "#Pickup"],
+    "dodge": ["#Dodge"],
+    "chrysler": ["#Chrysler"],
+    "fiat": ["#Fiat"],
+})
+
+# marketplace_smart: tags par catégorie de Profile ({brand} = marque détectée)
+PROFILE_BASE: Tags = ("#DanielGiroux", "#Beauce", "#SaintGeorges", "#Quebec")
+PROFILE_TAGS: Dict[str, Tags] = {
+    "exotic": ("#{brand}", "#Exotique", "#Supercar", "#AutoDePrestige"),
+    "truck": ("#Truck", "#Pickup", "#Camion"),
+    "luxury": ("#Luxe", "#Premium", "#AutoDeLuxe"),
+    "sport": ("#Sport", "#Performance", "#PassionAuto"),
+}
+PROFILE_DEFAULT: Tags = ("#Auto", "#VehiculeOccasion")
+
+
+# --------------------------
+# Construction par style
+# --------------------------
+
+def _sticker(title: str, make: str) -> List[str]:
+    tags = list(STICKER_BRANDS.first(title) or ())
+    tags += STICKER_MODELS.all(title)
+    tags += STICKER_VARIANTS.all(title)
+    tags += STICKER_BASE
+    return _dedupe(tags)[:STICKER_LIMIT]
+
+
+def _ad(title: str, make: str) -> List[str]:
+    tags = AD_BRANDS.all(title)
+    tags.reverse()
+    return _dedupe(tags + list(DEALER_BASE))
+
+
+def _dg(title: str, make: str) -> List[str]:
+    key = make or title
+    brand = DG_BRANDS.first(key)
+    if brand is not None:
+        tags = list(brand) + list(DEALER_BASE)
+    elif make:
+        tags = [f"#{make.capitalize()}"] + list(DEALER_BASE)
+    else:
+        tags = list(DEALER_BASE)
+    return _dedupe(tags, fold_case=False)
+
+
+_STYLES = {
+    "sticker": _sticker,
+    "ad": _ad,
+    "dg": _dg,
+}
+
+STYLES = tuple(_STYLES)
+
+
+@lru_cache(maxsize=4096)
+def _hashtags_cached(title: str, make: str, style: str) -> Tags:
+    return tuple(_STYLES[style](title, make))
+
+
+def hashtags(title: str, make: str = "", style: str = "sticker") -> Tags:
+    """
+    Hashtags (tuple) pour un titre / une marque selon le style du générateur appelant.
+    Clé du cache: titre en minuscules (espaces conservés: " rt "), marque strip + minuscules.
+    """
+    if style not in _STYLES:
+        raise ValueError(f"style hashtags inconnu: {style} (choix: {', '.join(STYLES)})")
+    return _hashtags_cached((title or "").lower(), (make or "").strip().lower(), style)
+
+
+def hashtag_line(title: str, make: str = "", style: str = "sticker") -> str:
+    return " ".join(hashtags(title, make, style))
+
+
+@lru_cache(maxsize=256)
+def profile_hashtags(category: str, brand: str = "") -> Tags:
+    """Hashtags d'un Profile marketplace_smart (catégorie + marque détectée)."""
+    head = PROFILE_TAGS.get(category, PROFILE_DEFAULT)
+    return tuple(t.format(brand=brand) for t in head) + PROFILE_BASE
+
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+inventory_diff.py
+- Diff d'un snapshot d'inventaire complet contre le dernier snapshot traité (état JSON local)
+- Empreinte par véhicule = un hash par groupe de champs normalisés (prix, km, vin, détails)
+  + hash du sticker (ETag Storage) -> on sait QUOI a changé, pas seulement SI
+- Sortie: seulement les stocks ajoutés / modifiés / retirés (+ type de changement)
+- L'état n'avance que pour les stocks réellement traités (commit(..., done=...)):
+  un échec de génération est retenté au prochain snapshot
+
+Usage:
+  python -m engine.inventory_diff inventaire.jsonl [--state etat.json] [--commit [--force]]
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from engine.bulk_render import Snapshot, iter_snapshot, normalize_km_column, normalize_price_column
+
+STATE_PATH = Path(
+    os.getenv("INVENTORY_STATE_PATH", "").strip()
+    or (Path(tempfile.gettempdir()) / "inventory_state.json")
+)
+
+# champs sans effet sur les textes (horodatages de la synchro, etc.)
+IGNORED_FIELDS = frozenset(
+    f.strip().lower()
+    for f in os.getenv("INVENTORY_IGNORED_FIELDS", "updated_at,synced_at,scraped_at,last_seen,fetched_at").split(",")
+    if f.strip()
+)
+
+# garde-fou: un snapshot vide / tronqué ne doit pas retirer tout l'inventaire
+# (refusé si retirés > max(MIN, PCT % de l'état précédent), sauf force)
+MAX_REMOVED_MIN = int(os.getenv("INVENTORY_MAX_REMOVED_MIN", "5"))
+MAX_REMOVED_PCT = float(os.getenv("INVENTORY_MAX_REMOVED_PCT", "20"))
+
+# groupes d'empreinte (ordre = ordre des types de changement rapportés)
+GROUPS = ("price", "mileage", "vin", "details", "sticker")
+
+Fingerprint = Dict[str, str]
+State = Dict[str, Fingerprint]
+
+_WS_RE = re.compile(r"\s+")
+
+
+# --------------------------
+# Empreintes
+# --------------------------
+
+def stock_key(vehicle: Mapping[str, Any]) -> str:
+    """Clé d'inventaire: stock, sinon VIN (comme cli.py en mode lot)."""
+    return str(vehicle.get("stock") or vehicle.get("vin") or "").strip().upper()
+
+
+def _h(value: Any) -> str:
+    raw = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _norm_value(v: Any) -> Any:
+    if isinstance(v, str):
+        return _WS_RE.sub(" ", v).strip().lower()
+    if isinstance(v, dict):
+        return {str(k).lower(): _norm_value(x) for k, x in v.items() if str(k).lower() not in IGNORED_FIELDS}
+    if isinstance(v, (list, tuple)):
+        return [_norm_value(x) for x in v]
+    if isinstance(v, float) and v.is_integer():
+        return int(v)
+    return v
+
+
+def fingerprint(vehicle: Mapping[str, Any], sticker_hash: str = "") -> Fingerprint:
+    """
+    Un hash court par groupe. Prix / km normalisés comme au rendu
+    ("33995", 33995.0 et "33 995 $" -> même empreinte).
+    """
+    _, price = normalize_price_column([vehicle.get("price")])
+    _, km = normalize_km_column([vehicle.get("mileage")])
+    details = {
+        str(k).lower(): _norm_value(v)
+        for k, v in vehicle.items()
+        if str(k).lower() not in IGNORED_FIELDS and k not in ("price", "mileage", "vin", "stock")
+    }
+    return {
+        "price": _h(price[0]),
+        "mileage": _h(km[0]),
+        "vin": _h(str(vehicle.get("vin") or "").strip().upper()),
+        "details": _h(details),
+        "sticker": sticker_hash or "",
+    }
+
+
+# --------------------------
+# Diff
+# --------------------------
+
+@dataclass(frozen=True, slots=True)
+class Change:
+    stock: str
+    status: str                              # added | changed | removed
+    kinds: Tuple[str, ...]                   # groupes modifiés (GROUPS); vide si added / removed
+    vehicle: Optional[Dict[str, Any]] = None  # None si removed
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"stock": self.stock, "status": self.status, "kinds": list(self.kinds)}
+
+
+@dataclass(frozen=True, slots=True)
+class InventoryDiff:
+    changes: Tuple[Change, ...]
+    fingerprints: State  # empreintes du snapshot courant (pour commit)
+    unchanged: int
+    skipped: int         # lignes sans stock ni VIN
+
+    def by_status(self, status: str) -> List[Change]:
+        return [c for c in self.changes if c.status == status]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "added": len(self.by_status("added")),
+            "changed": len(self.by_status("changed")),
+            "removed": len(self.by_status("removed")),
+            "unchanged": self.unchanged,
+            "skipped": self.skipped,
+        }
+
+
+def diff(
+    snapshot: Snapshot,
+    previous: State,
+    sticker_hashes: Optional[Mapping[str, str]] = None,
+) -> InventoryDiff:
+    """
+    snapshot: inventaire COMPLET (un stock absent = retiré).
+    sticker_hashes: VIN -> hash/ETag du sticker (un sticker apparu ou remplacé = "sticker");
+    None = inconnu (listing Storage indisponible): l'empreinte sticker précédente est conservée.
+    Stock en double dans le snapshot: la dernière ligne gagne.
+    """
+    current: Dict[str, Dict[str, Any]] = {}
+    skipped = 0
+    for v in iter_snapshot(snapshot):
+        key = stock_key(v)
+        if not key:
+            skipped += 1
+            continue
+        current[key] = v
+
+    fingerprints: State = {}
+    changes: List[Change] = []
+    unchanged = 0
+    for key, v in current.items():
+        old = previous.get(key)
+        if sticker_hashes is None:
+            sticker = (old or {}).get("sticker", "")
+        else:
+            sticker = sticker_hashes.get(str(v.get("vin") or "").strip().upper(), "")
+        fp = fingerprints[key] = fingerprint(v, sticker)
+        if old is None:
+            changes.append(Change(key, "added", (), v))
+            continue
+        kinds = tuple(g for g in GROUPS if old.get(g, "") != fp[g])
+        if kinds:
+            changes.append(Change(key, "changed", kinds, v))
+        else:
+            unchanged += 1
+
+    for key in previous:
+        if key not in current:
+            changes.append(Change(key, "removed", ()))
+
+    return InventoryDiff(tuple(changes), fingerprints, unchanged, skipped)
+
+
+def removal_guard(result: InventoryDiff, previous: State) -> Optional[str]:
+    """Message d'erreur si le diff retire trop de stocks d'un coup (snapshot suspect), sinon None."""
+    removed = len(result.by_status("removed"))
+    limit = max(MAX_REMOVED_MIN, int(len(previous) * MAX_REMOVED_PCT / 100))
+    if removed > limit:
+        return (
+            f"snapshot suspect: {removed} stocks retirés sur {len(previous)} "
+            f"(max {limit}); relancer avec force pour confirmer"
+        )
+    return None
+
+
+# --------------------------
+# État local (dernier snapshot traité)
+# --------------------------
+
+def load_state(path: Optional[Path] = None) -> State:
+    p = Path(path or STATE_PATH)
+    try:
+        data = json.loads(p.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data.get("vehicles") or {}
+
+
+def save_state(state: State, path: Optional[Path] = None) -> None:
+    p = Path(path or STATE_PATH)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_name(f".{p.name}.{os.getpid()}.tmp")
+    tmp.write_text(
+        json.dumps({"updated": time.time(), "vehicles": state}, ensure_ascii=False, sort_keys=True),
+        encoding="utf-8",
+    )
+    tmp.replace(p)
+
+
+def commit(
+    previous: State,
+    result: InventoryDiff,
+    done: Optional[Iterable[str]] = None,
+    path: Optional[Path] = None,
+) -> State:
+    """
+    Avance l'état: stocks traités -> nouvelle empreinte, retirés traités -> oubliés.
+    done=None: tout le diff est considéré traité. Retourne le nouvel état (sauvegardé).
+    """
+    ok = None if done is None else set(done)
+    state = dict(previous)
+    for c in result.changes:
+        if ok is not None and c.stock not in ok:
+            continue
+        if c.status == "removed":
+            state.pop(c.stock, None)
+        else:
+            state[c.stock] = result.fingerprints[c.stock]
+    save_state(state, path)
+    return state
+
+
+def diff_snapshot(
+    snapshot: Snapshot,
+    sticker_hashes: Optional[Mapping[str, str]] = None,
+    path: Optional[Path] = None,
+) -> Tuple[InventoryDiff, State]:
+    """diff() contre l'état local; retourne aussi l'état lu (à passer à commit())."""
+    previous = load_state(path)
+    return diff(snapshot, previous, sticker_hashes), previous
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("snapshot", help="Inventaire complet (.jsonl / .csv)")
+    ap.add_argument("--state", default="", help=f"État local (défaut: {STATE_PATH})")
+    ap.add_argument("--commit", action="store_true", help="Enregistrer le snapshot comme traité")
+    ap.add_argument("--force", action="store_true", help="Commit même si le snapshot retire beaucoup de stocks")
+    args = ap.parse_args()
+
+    state_path = Path(args.state) if args.state else None
+    res, prev = diff_snapshot(Path(args.snapshot), path=state_path)
+    for c in res.changes:
+        print(json.dumps(c.as_dict(), ensure_ascii=False))
+    print(json.dumps(res.summary(), ensure_ascii=False), file=sys.stderr)
+    if args.commit:
+        guard = None if args.force else removal_guard(res, prev)
+        if guard:
+            print(guard, file=sys.stderr)
+            sys.exit(2)
+        commit(prev, res, path=state_path)
@@ -1,14 +1,42 @@
 # llm.py – Intro AI centrée sur Daniel Giroux
+import asyncio
+import json
 import os
-from typing import Dict, Any, Optional
+import random
+import time
+from contextlib import nullcontext
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from engine import llm_cache, llm_metrics
 
 try:
-    from openai import OpenAI
+    from openai import OpenAI, AsyncOpenAI
+    from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+    # 429 / surcharge / réseau: on réessaie (backoff avec jitter)
+    _RETRYABLE: tuple = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
 except ImportError:
     OpenAI = None
+    AsyncOpenAI = None
+    _RETRYABLE = ()
 
 DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
+# Paramètres d'échantillonnage (partagés sync / async)
+SAMPLING: Dict[str, Any] = {"max_tokens": 90, "temperature": 0.8, "top_p": 0.9}
+
+# Lots (agenerate_many): requêtes simultanées max + réessais sur 429
+LLM_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "5"))
+LLM_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 20.0
+
+# Streaming: budget de temps total par intro (secondes)
+LLM_STREAM_DEADLINE = float(os.getenv("OPENAI_STREAM_DEADLINE", "8"))
+
+# Fin attendue de chaque intro (appel direct)
+CTA_PHONE = "418-222-3939"
+
 _client: Optional[OpenAI] = None
 
 
@@ -65,7 +93,7 @@ def _safe_trim(text: str, max_chars: int) -> str:
     if len(txt) <= max_chars:
         return txt
 
-    phone = "418-222-3939"
+    phone = CTA_PHONE
     if phone in txt:
         idx = txt.find(phone) + len(phone)
         if idx <= max_chars:
@@ -75,17 +103,8 @@ def _safe_trim(text: str, max_chars: int) -> str:
     return cut + "..."
 
 
-def generate_ad_text(vehicle: Dict[str, Any], kind: str = "default", max_chars: int = 220) -> str:
-    """
-    Génère une courte intro AI Facebook, centrée sur Daniel Giroux.
-    kind:
-      - default
-      - price_changed
-    """
-    client = get_client()
-    if not client:
-        return ""
-
+def _prompt_header(vehicle: Dict[str, Any], kind: str) -> Tuple[str, str, str]:
+    """(titre, persona + données disponibles, angle selon kind) — communs à tous les prompts."""
     v = vehicle or {}
     title = (v.get("title") or "Véhicule").strip()
     price = _vehicle_price(v)
@@ -107,7 +126,7 @@ def generate_ad_text(vehicle: Dict[str, Any], kind: str = "default", max_chars:
             "sur un avantage concret, et donne envie d'écrire à Daniel Giroux."
         )
 
-    system_prompt = f"""
+    header = f"""
 Tu es Daniel Giroux, vendeur automobile chez Kennebec à Saint-Georges (Beauce, Québec) depuis 2009.
 
 Ton style :
@@ -130,7 +149,20 @@ Données disponibles :
 - URL : {url}
 - Ancien prix : {old_price}
 - Nouveau prix : {new_price}
+"""
+    return title, header, angle
+
+
+def build_messages(vehicle: Dict[str, Any], kind: str = "default", max_chars: int = 220) -> List[Dict[str, str]]:
+    """
+    Messages (system + user) de l'intro AI; partagés par tous les chemins d'appel.
+    kind:
+      - default
+      - price_changed
+    """
+    title, header, angle = _prompt_header(vehicle, kind)
 
+    system_prompt = header + f"""
 Objectif :
 Écris UNE courte accroche Facebook qui sert directement Daniel Giroux.
 {angle}
@@ -146,24 +178,493 @@ Règles obligatoires :
 - termine avec un appel direct incluant Daniel Giroux 418-222-3939
 """
 
+    return [
+        {"role": "system", "content": system_prompt},
+        {
+            "role": "user",
+            "content": f"Génère une accroche courte et vendeuse pour {title}.",
+        },
+    ]
+
+
+def _cache_key(messages: List[Dict[str, str]]) -> str:
+    return llm_cache.cache_key(DEFAULT_MODEL, messages, SAMPLING)
+
+
+def generate_ad_text(
+    vehicle: Dict[str, Any],
+    kind: str = "default",
+    max_chars: int = 220,
+    force: bool = False,
+) -> str:
+    """
+    Génère une courte intro AI Facebook, centrée sur Daniel Giroux.
+    kind:
+      - default
+      - price_changed
+    Même prompt + modèle + paramètres -> intro reprise du cache disque (force=True: regénère).
+    """
+    client = get_client()
+    if not client:
+        return ""
+
+    messages = build_messages(vehicle, kind, max_chars)
+    key = _cache_key(messages)
+    with llm_metrics.track("intro", DEFAULT_MODEL) as m:
+        if not force:
+            cached = llm_cache.get(key)
+            if cached:
+                m["cache_hit"] = True
+                return cached
+
+        try:
+            response = client.chat.completions.create(
+                model=DEFAULT_MODEL,
+                messages=messages,
+                **SAMPLING,
+            )
+            llm_metrics.note_usage(m, response)
+
+            txt = (response.choices[0].message.content or "").strip()
+            out = _safe_trim(txt, max_chars)
+            if not out:
+                m["ok"], m["error"] = False, "empty"
+            llm_cache.put(key, out, DEFAULT_MODEL)
+            return out
+
+        except Exception as e:
+            llm_metrics.note_error(m, e)
+            print(f"[ERROR AI] {e}")
+            return ""
+
+
+# --------------------------
+# Variantes: un seul appel pour plusieurs formats
+# --------------------------
+
+# format -> longueur max (caractères)
+VARIANTS: Dict[str, int] = {"facebook": 220, "marketplace": 800}
+
+
+def build_variant_messages(
+    vehicle: Dict[str, Any],
+    kind: str = "default",
+    variants: Optional[Dict[str, int]] = None,
+) -> List[Dict[str, str]]:
+    """Même persona / données que build_messages; réponse JSON {format: texte}."""
+    variants = variants or VARIANTS
+    title, header, angle = _prompt_header(vehicle, kind)
+
+    formats = "\n".join(
+        f"- {name} : maximum {limit} caractères, "
+        + ("1 ou 2 petites phrases" if limit <= 300 else "3 à 5 phrases")
+        for name, limit in variants.items()
+    )
+    example = json.dumps({name: "..." for name in variants}, ensure_ascii=False)
+
+    system_prompt = header + f"""
+Objectif :
+Écris une accroche par format, chacune sert directement Daniel Giroux.
+{angle}
+
+Formats :
+{formats}
+
+Règles obligatoires (chaque format) :
+- respecte la longueur maximale du format
+- ton vendeur, naturel, humain
+- pas de hashtags
+- pas de liste
+- pas de jargon
+- au plus 1 emoji si ça aide vraiment
+- termine avec un appel direct incluant Daniel Giroux 418-222-3939
+
+Réponds uniquement en JSON : {example}
+"""
+
+    return [
+        {"role": "system", "content": system_prompt},
+        {
+            "role": "user",
+            "content": f"Génère les accroches ({', '.join(variants)}) pour {title}.",
+        },
+    ]
+
+
+def _variant_params(variants: Dict[str, int]) -> Dict[str, Any]:
+    # ~3 caractères / token en français + enveloppe JSON
+    return {
+        **SAMPLING,
+        "max_tokens": sum(variants.values()) // 3 + 60,
+        "response_format": {"type": "json_object"},
+    }
+
+
+def _parse_variants(raw: str, variants: Dict[str, int]) -> Dict[str, str]:
+    """Variantes valides seulement (texte non vide, ramené à sa limite par _safe_trim)."""
     try:
-        response = client.chat.completions.create(
-            model=DEFAULT_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {
-                    "role": "user",
-                    "content": f"Génère une accroche courte et vendeuse pour {title}.",
-                },
-            ],
-            max_tokens=90,
-            temperature=0.8,
-            top_p=0.9,
-        )
+        data = json.loads(raw or "")
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    out: Dict[str, str] = {}
+    for name, limit in variants.items():
+        txt = data.get(name)
+        if isinstance(txt, str) and txt.strip():
+            out[name] = _safe_trim(txt, limit)
+    return out
+
+
+def generate_ad_variants(
+    vehicle: Dict[str, Any],
+    kind: str = "default",
+    variants: Optional[Dict[str, int]] = None,
+    force: bool = False,
+) -> Dict[str, str]:
+    """
+    Toutes les intros (facebook 220, marketplace 800 par défaut) en UN appel, réponse JSON.
+    Variante absente / invalide -> repli sur generate_ad_text pour cette variante seulement.
+    """
+    variants = variants or VARIANTS
+    client = get_client()
+    if not client:
+        return {name: "" for name in variants}
+
+    messages = build_variant_messages(vehicle, kind, variants)
+    params = _variant_params(variants)
+    key = llm_cache.cache_key(DEFAULT_MODEL, messages, params)
+
+    with llm_metrics.track("variants", DEFAULT_MODEL) as m:
+        raw = None if force else llm_cache.get(key)
+        m["cache_hit"] = raw is not None
+        if raw is None:
+            try:
+                response = client.chat.completions.create(
+                    model=DEFAULT_MODEL,
+                    messages=messages,
+                    **params,
+                )
+                llm_metrics.note_usage(m, response)
+                raw = response.choices[0].message.content or ""
+            except Exception as e:
+                llm_metrics.note_error(m, e)
+                print(f"[ERROR AI] {e}")
+                raw = ""
+
+        out = _parse_variants(raw, variants)
+        if len(out) == len(variants):
+            llm_cache.put(key, json.dumps(out, ensure_ascii=False), DEFAULT_MODEL)
+        elif m["ok"]:
+            m["ok"] = False
+            m["error"] = "invalid_json" if not out else "missing_variants"
 
-        txt = (response.choices[0].message.content or "").strip()
-        return _safe_trim(txt, max_chars)
+    for name, limit in variants.items():
+        if name not in out:
+            out[name] = generate_ad_text(vehicle, kind, max_chars=limit, force=force)
+    return {name: out[name] for name in variants}
 
-    except Exception as e:
-        print(f"[ERROR AI] {e}")
+
+# --------------------------
+# Async: lots avec concurrence bornée
+# --------------------------
+
+def new_async_client() -> Optional["AsyncOpenAI"]:
+    """
+    Un client par boucle asyncio (le pool httpx y est lié); OPENAI_BASE_URL respecté.
+    Les réessais sont gérés ici (backoff + jitter), pas par le SDK.
+    """
+    api_key = os.getenv("OPENAI_API_KEY", "").strip()
+    if not api_key or not AsyncOpenAI:
+        return None
+    return AsyncOpenAI(api_key=api_key, max_retries=0, timeout=LLM_TIMEOUT)
+
+
+def _retry_delay(attempt: int, err: Exception) -> float:
+    # Retry-After du serveur si présent, sinon backoff exponentiel "full jitter"
+    response = getattr(err, "response", None)
+    if response is not None:
+        try:
+            return min(BACKOFF_MAX, float(response.headers.get("retry-after")))
+        except (TypeError, ValueError):
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+async def _acomplete(
+    client: "AsyncOpenAI",
+    messages: List[Dict[str, str]],
+    max_chars: int,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    force: bool = False,
+) -> str:
+    key = _cache_key(messages)
+    with llm_metrics.track("intro_async", DEFAULT_MODEL) as m:
+        if not force:
+            cached = llm_cache.get(key)
+            if cached:
+                m["cache_hit"] = True
+                return cached
+
+        m["queue_s"] = 0.0
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            m["retries"] = attempt
+            try:
+                # le slot n'est tenu que pendant la requête (pas pendant l'attente du backoff)
+                t_wait = time.perf_counter()
+                async with semaphore or nullcontext():
+                    m["queue_s"] = round(m["queue_s"] + time.perf_counter() - t_wait, 4)
+                    response = await client.chat.completions.create(
+                        model=DEFAULT_MODEL,
+                        messages=messages,
+                        **SAMPLING,
+                    )
+                llm_metrics.note_usage(m, response)
+                txt = (response.choices[0].message.content or "").strip()
+                out = _safe_trim(txt, max_chars)
+                if not out:
+                    m["ok"], m["error"] = False, "empty"
+                llm_cache.put(key, out, DEFAULT_MODEL)
+                return out
+            except _RETRYABLE as e:
+                if attempt >= LLM_MAX_RETRIES:
+                    llm_metrics.note_error(m, e)
+                    print(f"[ERROR AI] {e} (abandon après {attempt + 1} essais)")
+                    return ""
+                await asyncio.sleep(_retry_delay(attempt, e))
+            except Exception as e:
+                llm_metrics.note_error(m, e)
+                print(f"[ERROR AI] {e}")
+                return ""
         return ""
+
+
+async def agenerate_ad_text(
+    vehicle: Dict[str, Any],
+    kind: str = "default",
+    max_chars: int = 220,
+    *,
+    client: Optional["AsyncOpenAI"] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    force: bool = False,
+) -> str:
+    """Version async de generate_ad_text (même prompt, même cache, réessais sur 429)."""
+    own = client is None
+    if own:
+        client = new_async_client()
+        if client is None:
+            return ""
+    try:
+        return await _acomplete(client, build_messages(vehicle, kind, max_chars), max_chars, semaphore, force)
+    finally:
+        if own:
+            await client.close()
+
+
+async def agenerate_many(
+    vehicles: Sequence[Dict[str, Any]],
+    kind: str = "default",
+    max_chars: int = 220,
+    concurrency: Optional[int] = None,
+    force: bool = False,
+) -> List[str]:
+    """Intros AI pour un lot; au plus `concurrency` requêtes en vol. Ordre conservé, "" si échec."""
+    client = new_async_client()
+    if client is None:
+        return [""] * len(vehicles)
+    semaphore = asyncio.Semaphore(max(1, concurrency or LLM_CONCURRENCY))
+    try:
+        return list(await asyncio.gather(*(
+            agenerate_ad_text(v, kind, max_chars, client=client, semaphore=semaphore, force=force)
+            for v in vehicles
+        )))
+    finally:
+        await client.close()
+
+
+def generate_many(
+    vehicles: Sequence[Dict[str, Any]],
+    kind: str = "default",
+    max_chars: int = 220,
+    concurrency: Optional[int] = None,
+    force: bool = False,
+) -> List[str]:
+    """Point d'entrée synchrone de agenerate_many (CLI, scripts)."""
+    return asyncio.run(agenerate_many(vehicles, kind, max_chars, concurrency, force))
+
+
+# --------------------------
+# Streaming: budget de latence dur
+# --------------------------
+
+_SENTENCE_END = (".", "!", "?", "…")
+
+
+def _best_prefix(text: str, max_chars: int) -> str:
+    """
+    Meilleur préfixe utilisable d'une intro incomplète:
+    jusqu'au CTA téléphone si reçu, sinon jusqu'à la dernière phrase complète, sinon "".
+    """
+    txt = (text or "").strip()
+    i = txt.find(CTA_PHONE)
+    if i >= 0 and i + len(CTA_PHONE) <= max_chars:
+        return txt[: i + len(CTA_PHONE)].rstrip(" .,!?;:-")
+    head = txt[:max_chars]
+    cut = max(head.rfind(c) for c in _SENTENCE_END)
+    return head[: cut + 1].strip() if cut > 0 else ""
+
+
+async def astream_ad_text(
+    vehicle: Dict[str, Any],
+    kind: str = "default",
+    max_chars: int = 220,
+    deadline: Optional[float] = None,
+    *,
+    client: Optional["AsyncOpenAI"] = None,
+    force: bool = False,
+) -> str:
+    """
+    Intro en streaming, consommée au fil des tokens. Arrêt dès que:
+      - le CTA téléphone est reçu (texte complet),
+      - max_chars est dépassé (_safe_trim),
+      - le budget `deadline` (s) est écoulé -> meilleur préfixe valide (_best_prefix).
+    Seules les intros complètes vont au cache.
+    """
+    budget = LLM_STREAM_DEADLINE if deadline is None else deadline
+    messages = build_messages(vehicle, kind, max_chars)
+    key = _cache_key(messages)
+
+    with llm_metrics.track("intro_stream", DEFAULT_MODEL) as m:
+        if not force:
+            cached = llm_cache.get(key)
+            if cached:
+                m["cache_hit"] = True
+                return cached
+
+        own = client is None
+        if own:
+            client = new_async_client()
+            if client is None:
+                return ""
+
+        t0 = time.perf_counter()
+        end = t0 + budget
+        text = ""
+        stop = ""
+        stream = None
+        try:
+            stream = await asyncio.wait_for(
+                client.chat.completions.create(
+                    model=DEFAULT_MODEL,
+                    messages=messages,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **SAMPLING,
+                ),
+                timeout=budget,
+            )
+            chunks = stream.__aiter__()
+            while True:
+                remaining = end - time.perf_counter()
+                if remaining <= 0:
+                    stop = "deadline"
+                    break
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=remaining)
+                except StopAsyncIteration:
+                    stop = "finished"
+                    break
+                if getattr(chunk, "usage", None) is not None:
+                    llm_metrics.note_usage(m, chunk)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                if not delta:
+                    continue
+                if m["ttft_s"] is None:
+                    m["ttft_s"] = round(time.perf_counter() - t0, 4)
+                text += delta
+                # le CTA peut chevaucher deux morceaux: on cherche dans la fin du texte
+                if CTA_PHONE in text[-(len(delta) + len(CTA_PHONE)):]:
+                    stop = "cta"
+                    break
+                if len(text) > max_chars:
+                    stop = "max_chars"
+                    break
+        except asyncio.TimeoutError:
+            stop = "deadline"
+        except Exception as e:
+            llm_metrics.note_error(m, e)
+            print(f"[ERROR AI] {e}")
+            stop = "error"
+        finally:
+            if stream is not None:
+                try:
+                    await stream.close()
+                except Exception:
+                    pass
+            if own:
+                await client.close()
+
+        m["stop"] = stop
+        m["chars"] = len(text)
+        if not m["prompt_tokens"] and text:
+            # flux coupé avant le bloc usage: estimation (~4 caractères / token)
+            m["prompt_tokens"] = sum(len(x["content"]) for x in messages) // 4
+            m["completion_tokens"] = len(text) // 4
+            m["usage_estimated"] = True
+
+        if stop in ("cta", "finished", "max_chars"):
+            out = _safe_trim(text, max_chars)
+            llm_cache.put(key, out, DEFAULT_MODEL)
+        else:
+            out = _best_prefix(text, max_chars)
+            if stop == "deadline":
+                m["error"] = "deadline"
+        if not out and m["ok"]:
+            m["ok"] = False
+            m["error"] = m["error"] or "empty"
+        return out
+
+
+def stream_ad_text(
+    vehicle: Dict[str, Any],
+    kind: str = "default",
+    max_chars: int = 220,
+    deadline: Optional[float] = None,
+    force: bool = False,
+) -> str:
+    """Point d'entrée synchrone de astream_ad_text."""
+    return asyncio.run(astream_ad_text(vehicle, kind, max_chars, deadline, force=force))
+
+
+async def astream_ad_variants(
+    vehicle: Dict[str, Any],
+    kind: str = "default",
+    variants: Optional[Dict[str, int]] = None,
+    deadline: Optional[float] = None,
+    force: bool = False,
+) -> Dict[str, str]:
+    """Une intro streamée par format, en parallèle: latence = la plus lente, bornée par `deadline`."""
+    variants = variants or VARIANTS
+    client = new_async_client()
+    if client is None:
+        return {name: "" for name in variants}
+    try:
+        texts = await asyncio.gather(*(
+            astream_ad_text(vehicle, kind, limit, deadline, client=client, force=force)
+            for limit in variants.values()
+        ))
+    finally:
+        await client.close()
+    return dict(zip(variants, texts))
+
+
+def stream_ad_variants(
+    vehicle: Dict[str, Any],
+    kind: str = "default",
+    variants: Optional[Dict[str, int]] = None,
+    deadline: Optional[float] = None,
+    force: bool = False,
+) -> Dict[str, str]:
+    return asyncio.run(astream_ad_variants(vehicle, kind, variants, deadline, force))
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+llm_cache.py
+- Cache disque des intros AI, adressé par contenu:
+  clé = sha256(modèle + messages rendus (prompt système complet) + paramètres d'échantillonnage)
+- Un fichier JSON par entrée (écriture atomique), TTL, taille max (purge des plus anciens)
+- LLM_CACHE=0 désactive; force=True côté appelant pour regénérer (et écraser l'entrée)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+CACHE_DIR = Path(
+    os.getenv("LLM_CACHE_DIR", "").strip()
+    or (Path(tempfile.gettempdir()) / "llm_cache")
+)
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(30 * 24 * 3600)))  # secondes
+CACHE_MAX_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", "50")) * 1024 * 1024)
+ENABLED = os.getenv("LLM_CACHE", "1").strip() != "0"
+
+# purge (taille / TTL) toutes les N écritures
+PRUNE_EVERY = 50
+
+_puts = 0
+
+
+def cache_key(model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _path(key: str) -> Path:
+    return CACHE_DIR / key[:2] / f"{key}.json"
+
+
+def get(key: str) -> Optional[str]:
+    if not ENABLED:
+        return None
+    p = _path(key)
+    try:
+        entry = json.loads(p.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    if time.time() - float(entry.get("created") or 0) > CACHE_TTL:
+        try:
+            p.unlink()
+        except OSError:
+            pass
+        return None
+    return entry.get("text") or None
+
+
+def put(key: str, text: str, model: str = "") -> None:
+    global _puts
+    if not ENABLED or not text:
+        return
+    p = _path(key)
+    try:
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(f".{p.name}.{os.getpid()}.tmp")
+        tmp.write_text(
+            json.dumps({"created": time.time(), "model": model, "text": text}, ensure_ascii=False),
+            encoding="utf-8",
+        )
+        tmp.replace(p)
+    except Exception:
+        return
+    _puts += 1
+    if _puts % PRUNE_EVERY == 1:
+        prune()
+
+
+def _entries() -> List[Path]:
+    if not CACHE_DIR.exists():
+        return []
+    return [p for p in CACHE_DIR.glob("*/*.json") if p.is_file()]
+
+
+def prune(max_bytes: Optional[int] = None) -> int:
+    """Supprime les entrées expirées puis les plus anciennes au-delà de max_bytes. Retourne le nb supprimé."""
+    cap = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    now = time.time()
+    removed = 0
+    files = []
+    for p in _entries():
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        if now - st.st_mtime > CACHE_TTL:
+            try:
+                p.unlink()
+                removed += 1
+            except OSError:
+                pass
+            continue
+        files.append((st.st_mtime, st.st_size, p))
+
+    total = sum(size for _, size, _ in files)
+    for _, size, p in sorted(files):
+        if total <= cap:
+            break
+        try:
+            p.unlink()
+            removed += 1
+            total -= size
+        except OSError:
+            pass
+    return removed
+
+
+def clear() -> int:
+    removed = 0
+    for p in _entries():
+        try:
+            p.unlink()
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def stats() -> Dict[str, Any]:
+    files = _entries()
+    return {
+        "dir": str(CACHE_DIR),
+        "enabled": ENABLED,
+        "entries": len(files),
+        "bytes": sum(p.stat().st_size for p in files),
+        "ttl_s": CACHE_TTL,
+        "max_bytes": CACHE_MAX_BYTES,
+    }
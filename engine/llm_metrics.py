@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+llm_metrics.py
+- Mesures de chaque appel LLM: durée, temps jusqu'au 1er token (streaming), tokens prompt / complétion,
+  coût estimé, hit cache, réessais, raison d'échec
+- Puits JSONL local (une ligne par appel) + résumé en mémoire du process (summary())
+- LLM_METRICS=0 désactive le fichier (le résumé en mémoire reste)
+
+Usage:
+  python -m engine.llm_metrics [fichier.jsonl]   -> résumé JSON d'un fichier de mesures
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, Iterator, Optional
+
+METRICS_PATH = Path(
+    os.getenv("LLM_METRICS_PATH", "").strip()
+    or (Path(tempfile.gettempdir()) / "llm_metrics.jsonl")
+)
+FILE_ENABLED = os.getenv("LLM_METRICS", "1").strip() != "0"
+
+# $ US par million de tokens (prompt, complétion); LLM_PRICE_<MODELE>="in,out" pour surcharger
+PRICES: Dict[str, tuple] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+# latences gardées pour les percentiles du résumé
+WINDOW = 2000
+
+
+def _price(model: str) -> Optional[tuple]:
+    env = os.getenv("LLM_PRICE_" + model.upper().replace("-", "_").replace(".", "_"), "").strip()
+    if env:
+        try:
+            p_in, p_out = (float(x) for x in env.split(","))
+            return p_in, p_out
+        except ValueError:
+            pass
+    return PRICES.get(model)
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    p = _price(model)
+    if p is None:
+        return None
+    return round((prompt_tokens * p[0] + completion_tokens * p[1]) / 1_000_000, 6)
+
+
+def error_reason(e: BaseException) -> str:
+    """Nom d'exception + code HTTP si présent: "RateLimitError(429)"."""
+    code = getattr(e, "status_code", None)
+    return f"{type(e).__name__}({code})" if code else type(e).__name__
+
+
+# --------------------------
+# Résumé en mémoire
+# --------------------------
+
+class _Summary:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.ok = 0
+        self.cache_hits = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.errors: Counter = Counter()
+        self.by_op: Counter = Counter()
+        self.by_model: Counter = Counter()
+        self.wall: Deque[float] = deque(maxlen=WINDOW)
+        self.ttft: Deque[float] = deque(maxlen=WINDOW)
+
+    def add(self, rec: Dict[str, Any]) -> None:
+        with self._lock:
+            self.calls += 1
+            self.by_op[rec.get("op") or "?"] += 1
+            self.by_model[rec.get("model") or "?"] += 1
+            if rec.get("ok"):
+                self.ok += 1
+            else:
+                self.errors[rec.get("error") or "inconnue"] += 1
+            if rec.get("cache_hit"):
+                self.cache_hits += 1
+            else:
+                # les hits cache ne disent rien de la latence du fournisseur
+                if rec.get("wall_s") is not None:
+                    self.wall.append(float(rec["wall_s"]))
+                if rec.get("ttft_s") is not None:
+                    self.ttft.append(float(rec["ttft_s"]))
+            self.retries += int(rec.get("retries") or 0)
+            self.prompt_tokens += int(rec.get("prompt_tokens") or 0)
+            self.completion_tokens += int(rec.get("completion_tokens") or 0)
+            self.cost_usd += float(rec.get("cost_usd") or 0.0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "ok": self.ok,
+                "errors": dict(self.errors),
+                "cache_hits": self.cache_hits,
+                "cache_hit_rate": round(self.cache_hits / self.calls, 3) if self.calls else 0.0,
+                "retries": self.retries,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cost_usd": round(self.cost_usd, 6),
+                "by_op": dict(self.by_op),
+                "by_model": dict(self.by_model),
+                "wall_s": _percentiles(self.wall),
+                "ttft_s": _percentiles(self.ttft),
+            }
+
+
+def _percentiles(values: Iterable[float]) -> Dict[str, Optional[float]]:
+    xs = sorted(values)
+    if not xs:
+        return {"n": 0, "p50": None, "p95": None, "max": None}
+
+    def pct(q: float) -> float:
+        return round(xs[min(len(xs) - 1, int(q * len(xs)))], 4)
+
+    return {"n": len(xs), "p50": pct(0.50), "p95": pct(0.95), "max": round(xs[-1], 4)}
+
+
+_summary = _Summary()
+_file_lock = threading.Lock()
+
+
+# --------------------------
+# Enregistrement
+# --------------------------
+
+def record(rec: Dict[str, Any]) -> None:
+    rec.setdefault("ts", round(time.time(), 3))
+    if rec.get("cost_usd") is None and not rec.get("cache_hit"):
+        rec["cost_usd"] = estimate_cost(
+            rec.get("model") or "",
+            int(rec.get("prompt_tokens") or 0),
+            int(rec.get("completion_tokens") or 0),
+        )
+    _summary.add(rec)
+    if not FILE_ENABLED:
+        return
+    try:
+        line = json.dumps(rec, ensure_ascii=False) + "\n"
+        with _file_lock:
+            METRICS_PATH.parent.mkdir(parents=True, exist_ok=True)
+            with METRICS_PATH.open("a", encoding="utf-8") as fh:
+                fh.write(line)
+    except Exception:
+        pass
+
+
+@contextmanager
+def track(op: str, model: str = "") -> Iterator[Dict[str, Any]]:
+    """
+    with track("intro", model) as m: ...  -> l'appelant renseigne m (usage, cache_hit, ok/error, retries);
+    durée mesurée ici, exception non interceptée = échec.
+    """
+    rec: Dict[str, Any] = {
+        "op": op,
+        "model": model,
+        "ok": True,
+        "error": "",
+        "cache_hit": False,
+        "retries": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "ttft_s": None,
+        "cost_usd": None,
+    }
+    t0 = time.perf_counter()
+    try:
+        yield rec
+    except BaseException as e:
+        rec["ok"] = False
+        rec["error"] = rec["error"] or error_reason(e)
+        raise
+    finally:
+        rec["wall_s"] = round(time.perf_counter() - t0, 4)
+        record(rec)
+
+
+def note_usage(rec: Dict[str, Any], response: Any) -> None:
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        rec["prompt_tokens"] = int(getattr(usage, "prompt_tokens", 0) or 0)
+        rec["completion_tokens"] = int(getattr(usage, "completion_tokens", 0) or 0)
+
+
+def note_error(rec: Dict[str, Any], e: BaseException) -> None:
+    rec["ok"] = False
+    rec["error"] = error_reason(e)
+
+
+def summary() -> Dict[str, Any]:
+    return _summary.snapshot()
+
+
+def reset() -> None:
+    _summary.reset()
+
+
+def summarize_file(path: Optional[Path] = None) -> Dict[str, Any]:
+    """Résumé d'un fichier JSONL de mesures (même forme que summary())."""
+    s = _Summary()
+    p = Path(path or METRICS_PATH)
+    if p.exists():
+        with p.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    s.add(json.loads(line))
+                except ValueError:
+                    continue
+    out = s.snapshot()
+    out["path"] = str(p)
+    return out
+
+
+if __name__ == "__main__":
+    print(json.dumps(summarize_file(Path(sys.argv[1]) if len(sys.argv) > 1 else None), ensure_ascii=False, indent=2))
@@ -8,10 +8,14 @@ Marketplace Smart — générateur d'annonces Marketplace punchées (≤ 800 car
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 import re
 
+from engine.classifier import classify_title, marketplace_category
+from engine.hashtags import profile_hashtags
+
 
 # -----------------------------
 # Normalisation / helpers
@@ -59,116 +63,116 @@ def _first_word(title: str) -> str:
     return t[0] if t else ""
 
 def _detect_brand(title: str) -> str:
-    low = _norm(title).lower()
-    brands = [
-        "ferrari","lamborghini","mclaren","porsche","aston martin","maserati","bentley","rolls",
-        "mercedes","bmw","audi","lexus","cadillac","tesla",
-        "ram","dodge","jeep","chrysler","ford","chevrolet","gmc","toyota","honda","hyundai","kia","mazda","subaru","nissan","volkswagen","volvo"
-    ]
-    for b in brands:
-        if b in low:
-            return b.title()
-    return _first_word(title).title()
+    brand = classify_title(title).brand
+    return brand.title() if brand else _first_word(title).title()
 
 def _classify(title: str, price: Optional[float] = None) -> str:
-    low = _norm(title).lower()
-    brand = _detect_brand(title).lower()
-
-    # exotic / luxury (heuristique)
-    if any(x in low for x in ["ferrari","lamborghini","mclaren","huracan","aventador","720s","gt3","gt2","911 turbo","f8","roma"]):
-        return "exotic"
-    if brand in ["bentley","rolls","aston martin","maserati"] or (price is not None and price >= 120000):
-        return "luxury"
-    if any(x in low for x in ["ram","f-150","f150","silverado","sierra","tundra","tacoma","super duty","2500","3500"]):
-        return "truck"
-    if any(x in low for x in ["suv","cherokee","grand cherokee","wrangler","4runner","highlander","pilot","tiguan","q5","x5"]):
-        return "suv"
-    if any(x in low for x in ["mustang","camaro","corvette","supra","type r","sti","gti","srt","rt","r/t","scat pack"]):
-        return "sport"
-    return "daily"
+    # classifieur unique (mots entiers, cache): engine/classifier.py
+    return marketplace_category(title, price)
 
 
 # -----------------------------
 # Profils (messages + hashtags)
 # -----------------------------
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Profile:
+    """Profil partagé (interné) par catégorie: seul le headline dépend du titre (format_headline)."""
     category: str
-    headline: str
-    bullets: List[str]
+    headline_tpl: str
+    bullets: Tuple[str, ...]
     proof: str
-    hashtags: List[str]
+    hashtags: Tuple[str, ...]
+    hashtag_line: str
 
-def get_profile(title: str, price_val: Optional[float] = None) -> Profile:
-    brand = _detect_brand(title)
-    cat = _classify(title, price=price_val)
+    def format_headline(self, title: str) -> str:
+        return self.headline_tpl.format(title=title)
+
+
+@dataclass(frozen=True, slots=True)
+class TitledProfile(Profile):
+    """Compat get_profile(): profil + headline déjà formaté pour un titre."""
+    headline: str
 
-    base_hashtags = ["#DanielGiroux", "#Beauce", "#SaintGeorges", "#Quebec"]
-
-    # ❗ Aucun chiffre “générique” ici.
-    if cat == "exotic":
-        return Profile(
-            category="exotic",
-            headline=f"💎 {title} — Prestigieux & rare 💎",
-            bullets=[
-                "🎯 Prestige • performance • exclusivité",
-                "✨ Présence et finition haut de gamme",
-                "✅ Inspection complète — prêt à partir",
-            ],
-            proof="WITHOUT — texte basé sur infos disponibles, sans options inventées.",
-            hashtags=[f"#{brand}", "#Exotique", "#Supercar", "#AutoDePrestige"] + base_hashtags,
-        )
-
-    if cat == "truck":
-        return Profile(
-            category="truck",
-            headline=f"🔥 {title} — Prêt à travailler 🔥",
-            bullets=[
-                "💪 Solide, fiable, prêt à partir",
-                "🧰 Parfait pour chantier / remorquage / famille",
-                "✅ Inspection complète — prêt à partir",
-            ],
-            proof="WITHOUT — texte basé sur infos disponibles, sans options inventées.",
-            hashtags=["#Truck", "#Pickup", "#Camion"] + base_hashtags,
-        )
-
-    if cat == "luxury":
-        return Profile(
-            category="luxury",
-            headline=f"💎 {title} — Luxe & présence 💎",
-            bullets=[
-                "✨ Confort haut de gamme",
-                "🎯 Image premium, conduite douce",
-                "✅ Inspection complète — prêt à partir",
-            ],
-            proof="WITHOUT — clair et crédible, sans promesses inventées.",
-            hashtags=["#Luxe", "#Premium", "#AutoDeLuxe"] + base_hashtags,
-        )
-
-    if cat == "sport":
-        return Profile(
-            category="sport",
-            headline=f"⚡ {title} — Performance au quotidien ⚡",
-            bullets=[
-                "🔥 Look + sensations",
-                "🎯 Tenue de route & plaisir",
-                "✅ Inspection complète — prêt à partir",
-            ],
-            proof="WITHOUT — clair, net, vendeur.",
-            hashtags=["#Sport", "#Performance", "#PassionAuto"] + base_hashtags,
-        )
 
+# ❗ Aucun chiffre “générique” ici.
+# category -> (headline, bullets, proof); toute autre catégorie (daily / suv) -> None
+_PROFILE_SPECS: Dict[Optional[str], Tuple[str, Tuple[str, ...], str]] = {
+    "exotic": (
+        "💎 {title} — Prestigieux & rare 💎",
+        (
+            "🎯 Prestige • performance • exclusivité",
+            "✨ Présence et finition haut de gamme",
+            "✅ Inspection complète — prêt à partir",
+        ),
+        "WITHOUT — texte basé sur infos disponibles, sans options inventées.",
+    ),
+    "truck": (
+        "🔥 {title} — Prêt à travailler 🔥",
+        (
+            "💪 Solide, fiable, prêt à partir",
+            "🧰 Parfait pour chantier / remorquage / famille",
+            "✅ Inspection complète — prêt à partir",
+        ),
+        "WITHOUT — texte basé sur infos disponibles, sans options inventées.",
+    ),
+    "luxury": (
+        "💎 {title} — Luxe & présence 💎",
+        (
+            "✨ Confort haut de gamme",
+            "🎯 Image premium, conduite douce",
+            "✅ Inspection complète — prêt à partir",
+        ),
+        "WITHOUT — clair et crédible, sans promesses inventées.",
+    ),
+    "sport": (
+        "⚡ {title} — Performance au quotidien ⚡",
+        (
+            "🔥 Look + sensations",
+            "🎯 Tenue de route & plaisir",
+            "✅ Inspection complète — prêt à partir",
+        ),
+        "WITHOUT — clair, net, vendeur.",
+    ),
     # daily / suv fallback
-    return Profile(
-        category=cat,
-        headline=f"🔥 {title} — Bon rapport qualité/prix 🔥",
-        bullets=[
+    None: (
+        "🔥 {title} — Bon rapport qualité/prix 🔥",
+        (
             "✅ Inspection complète — prêt à partir",
             "🚗 Idéal au quotidien",
-        ],
-        proof="WITHOUT — infos disponibles, rien d’inventé.",
-        hashtags=["#Auto", "#VehiculeOccasion"] + base_hashtags,
+        ),
+        "WITHOUT — infos disponibles, rien d’inventé.",
+    ),
+}
+
+
+@lru_cache(maxsize=256)
+def _interned_profile(cat: str, brand: str) -> Profile:
+    headline, bullets, proof = _PROFILE_SPECS.get(cat) or _PROFILE_SPECS[None]
+    tags = profile_hashtags(cat, brand)
+    return Profile(
+        category=cat,
+        headline_tpl=headline,
+        bullets=tuple(_norm(b) for b in bullets if _norm(b)),
+        proof=proof,
+        hashtags=tags,
+        hashtag_line=" ".join(tags),
+    )
+
+
+def _profile(title: str, price_val: Optional[float] = None) -> Profile:
+    cat = _classify(title, price=price_val)
+    # seule la catégorie exotic met la marque en hashtag: une instance par marque
+    brand = _detect_brand(title) if cat == "exotic" else ""
+    return _interned_profile(cat, brand)
+
+
+def get_profile(title: str, price_val: Optional[float] = None) -> TitledProfile:
+    """Compat (API publique): alloue un TitledProfile; le moteur utilise _profile + format_headline."""
+    base = _profile(title, price_val)
+    return TitledProfile(
+        **{f.name: getattr(base, f.name) for f in fields(Profile)},
+        headline=base.format_headline(title),
     )
 
 
@@ -191,10 +195,10 @@ def generate_marketplace_text(
     stock = _norm(str(vehicle.get("stock") or "")).upper()
     location = _norm(str(vehicle.get("location") or "")).strip()
 
-    prof = get_profile(title, price_val=price_val)
+    prof = _profile(title, price_val=price_val)
 
     lines: List[str] = []
-    lines.append(prof.headline)
+    lines.append(prof.format_headline(title))
 
     # ✅ Pas de placeholders : on affiche seulement si présent
     if price:
@@ -206,9 +210,7 @@ def generate_marketplace_text(
 
     lines.append("")  # respiration
 
-    for b in prof.bullets:
-        if _norm(b):
-            lines.append(_norm(b))
+    lines.extend(prof.bullets)  # normalisés à la construction du profil
 
     lines.append(prof.proof)
 
@@ -220,10 +222,11 @@ def generate_marketplace_text(
         lines.append("📍 Saint-Georges (Beauce)")
 
     if include_hashtags and prof.hashtags:
-        lines.append(" ".join(prof.hashtags))
+        lines.append(prof.hashtag_line)
 
     text = "\n".join(lines).strip()
 
+    # _shorten re-normalise tout le texte: seulement si on dépasse
     if len(text) > char_limit:
         text = _shorten(text, char_limit)
 
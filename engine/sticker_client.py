@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+sticker_client.py
+- Client du daemon sticker_to_ad (--serve): un process Python résident, isolé,
+  qui garde pdfminer & co chargés entre deux stickers
+- Un job à la fois par daemon (verrou, attente comptée dans le timeout);
+  timeout -> le daemon est tué puis relancé au prochain job
+- Réponse "recycle" (le daemon a atteint ses jobs / sa RSS max et sort): fermé, relancé au prochain job
+- get_daemon(): pool de daemons, un par slot "cpu" d'engine.admission (STICKER_DAEMONS pour forcer),
+  sinon les slots admis attendraient tous le même process
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import select
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_SCRIPT = Path(__file__).resolve().parent / "sticker_to_ad.py"
+
+
+class StickerDaemonError(RuntimeError):
+    pass
+
+
+class StickerLimitError(StickerDaemonError):
+    """PDF refusé par le daemon avant parsing (STICKER_MAX_MB / _PAGES / _OBJECTS)."""
+
+
+class StickerDaemon:
+    def __init__(
+        self,
+        script: Optional[Path] = None,
+        python_bin: Optional[str] = None,
+        timeout: float = 25.0,
+    ) -> None:
+        self.script = Path(script or DEFAULT_SCRIPT)
+        self.python_bin = python_bin or sys.executable
+        self.timeout = timeout
+        self._proc: Optional[subprocess.Popen] = None
+        self._buf = b""
+        self._seq = 0
+        self._lock = threading.Lock()
+        self.recycled = 0
+
+    # --------------------------
+    # Process
+    # --------------------------
+
+    def _alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def _start(self) -> None:
+        self._proc = subprocess.Popen(
+            [self.python_bin, str(self.script), "--serve"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            bufsize=0,
+        )
+        self._buf = b""
+
+    def close(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=2)
+        except Exception:
+            proc.kill()
+            proc.wait()
+
+    def _readline(self, deadline: float) -> bytes:
+        fd = self._proc.stdout.fileno()
+        while b"\n" not in self._buf:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                raise TimeoutError
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise StickerDaemonError(f"daemon sticker_to_ad terminé (code={self._proc.poll()})")
+            self._buf += chunk
+        line, self._buf = self._buf.split(b"\n", 1)
+        return line
+
+    # --------------------------
+    # Jobs
+    # --------------------------
+
+    def parse(
+        self,
+        pdf_path: Path,
+        fields: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Même résultat que sticker_to_ad --json (groups, vin, title, ad, timings...).
+        Lève TimeoutError / StickerDaemonError. Le timeout couvre aussi l'attente du verrou.
+        """
+        deadline = time.monotonic() + (timeout if timeout is not None else self.timeout)
+        if not self._lock.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            raise TimeoutError("daemon sticker_to_ad occupé")
+        try:
+            if not self._alive():
+                self._start()
+
+            self._seq += 1
+            job = {"id": self._seq, "pdf": str(pdf_path), **(fields or {})}
+
+            try:
+                self._proc.stdin.write((json.dumps(job, ensure_ascii=False) + "\n").encode("utf-8"))
+                self._proc.stdin.flush()
+                while True:
+                    res = json.loads(self._readline(deadline))
+                    if res.get("id") == self._seq:
+                        break
+            except TimeoutError:
+                self._kill()
+                raise
+            except (OSError, ValueError) as e:
+                self._kill()
+                raise StickerDaemonError(f"daemon sticker_to_ad: {e}")
+            except StickerDaemonError:
+                self._kill()
+                raise
+
+            if res.get("recycle"):
+                # le daemon sort de lui-même (jobs / RSS max): on le ferme, relancé au prochain job
+                self.recycled += 1
+                self.close()
+        finally:
+            self._lock.release()
+
+        if not res.get("ok"):
+            if res.get("limit"):
+                raise StickerLimitError(res.get("error") or "PDF hors limites")
+            raise StickerDaemonError(res.get("error") or "erreur inconnue")
+        return res
+
+    def _kill(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is not None:
+            proc.kill()
+            proc.wait()
+
+
+class StickerDaemonPool:
+    """
+    N daemons, un job chacun: le premier daemon libre prend le job.
+    Même interface que StickerDaemon (parse / close / recycled); démarrage paresseux par daemon.
+    """
+
+    def __init__(self, size: int, **kwargs: Any) -> None:
+        self.daemons: List[StickerDaemon] = [StickerDaemon(**kwargs) for _ in range(max(1, size))]
+        self._idle: "queue.Queue[StickerDaemon]" = queue.Queue()
+        for d in self.daemons:
+            self._idle.put(d)
+
+    @property
+    def size(self) -> int:
+        return len(self.daemons)
+
+    @property
+    def recycled(self) -> int:
+        return sum(d.recycled for d in self.daemons)
+
+    def parse(
+        self,
+        pdf_path: Path,
+        fields: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Comme StickerDaemon.parse; l'attente d'un daemon libre compte dans le timeout."""
+        limit = timeout if timeout is not None else self.daemons[0].timeout
+        deadline = time.monotonic() + limit
+        try:
+            d = self._idle.get(timeout=max(0.0, limit))
+        except queue.Empty:
+            raise TimeoutError(f"aucun daemon sticker_to_ad libre ({self.size})")
+        try:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("daemon sticker_to_ad: délai écoulé en attente")
+            return d.parse(pdf_path, fields, timeout=remaining)
+        finally:
+            self._idle.put(d)
+
+    def warm(self, pdf_path: Path, fields: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Démarre chaque daemon avec un parse (warm-up): un résultat par daemon."""
+        return [d.parse(pdf_path, fields) for d in self.daemons]
+
+    def close(self) -> None:
+        for d in self.daemons:
+            d.close()
+
+
+def pool_size() -> int:
+    """STICKER_DAEMONS, sinon le nb de slots "cpu" de l'admission (ADMIT_CPU_SLOTS / nb de cœurs)."""
+    raw = os.getenv("STICKER_DAEMONS", "").strip()
+    if raw:
+        try:
+            return max(1, int(raw))
+        except ValueError:
+            pass
+    from engine.admission import POOLS
+
+    return POOLS["cpu"].slots
+
+
+_daemon: Optional[StickerDaemonPool] = None
+_daemon_lock = threading.Lock()
+
+
+def get_daemon() -> StickerDaemonPool:
+    global _daemon
+    with _daemon_lock:
+        if _daemon is None:
+            _daemon = StickerDaemonPool(pool_size())
+        return _daemon
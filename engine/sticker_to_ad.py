@@ -17,38 +17,63 @@ sticker_to_ad.py
 from __future__ import annotations
 
 import argparse
+import hashlib
+import importlib
+import json
+import os
 import re
 import sys
 import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from array import array
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional, Tuple, Dict, Any
+from typing import Iterator, List, Optional, Tuple, Dict, Any, Sequence, Union
 
-# ---------- PDF text extraction (pdfminer) ----------
-from pdfminer.high_level import extract_pages
-from pdfminer.high_level import extract_text as pdfminer_extract_text
-from pdfminer.layout import LTTextContainer, LTChar, LTAnno
-
-# ---------- Optional: decrypt PDFs ----------
 try:
-    import pikepdf  # type: ignore
-except Exception:
-    pikepdf = None
+    from engine.hashtags import hashtag_line
+except ImportError:  # lancé en script: python engine/sticker_to_ad.py
+    from hashtags import hashtag_line  # type: ignore
+
+# ---------- Dépendances lourdes: importées au premier usage ----------
+# pdfminer, pikepdf, pytesseract/PIL et numpy coûtent ~300 ms à l'import; --help, le parsing
+# des arguments et les imports du module (cli, main) n'en ont pas besoin.
+# Optionnelles: None si absentes (décryptage / OCR / filtres vectorisés désactivés).
+_UNSET: Any = object()
+_optional: Dict[str, Any] = {}
+
+
+def _optional_module(name: str) -> Any:
+    mod = _optional.get(name, _UNSET)
+    if mod is _UNSET:
+        try:
+            mod = importlib.import_module(name)
+        except Exception:
+            mod = None
+        _optional[name] = mod
+    return mod
+
+
+def numpy_backend() -> Any:
+    """numpy si installé (filtres vectorisés de SpanTable), sinon None -> array('d')."""
+    return _optional_module("numpy")
 
-# ---------- OCR fallback ----------
-try:
-    import pytesseract  # type: ignore
-    from PIL import Image  # type: ignore
-except Exception:
-    pytesseract = None
-    Image = None
 
+def preload() -> None:
+    """Importe tout de suite les dépendances lourdes (daemon --serve: le 1er job ne paie pas l'import)."""
+    import pdfminer.high_level  # noqa: F401
+    import pdfminer.layout  # noqa: F401
+
+    for name in ("numpy", "pikepdf", "pytesseract", "PIL.Image"):
+        _optional_module(name)
 
 # ------------------------------
 # Data structures
 # ------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class Span:
     text: str
     x0: float
@@ -58,6 +83,121 @@ class Span:
     bold_ratio: float  # 0..1
 
 
+class SpanTable:
+    """
+    Spans en colonnes: x0/y0/x1/y1/bold_ratio (numpy float64 si dispo, sinon array('d'))
+    + liste de textes parallèle. Les filtres de colonne/ancre/haut de page deviennent
+    des masques (select) au lieu de boucles Python sur des objets Span.
+    """
+
+    __slots__ = ("text", "x0", "y0", "x1", "y1", "bold_ratio")
+
+    def __init__(self, spans: Sequence[Span] = ()) -> None:
+        self.text: List[str] = [sp.text for sp in spans]
+        cols = (
+            [sp.x0 for sp in spans],
+            [sp.y0 for sp in spans],
+            [sp.x1 for sp in spans],
+            [sp.y1 for sp in spans],
+            [sp.bold_ratio for sp in spans],
+        )
+        np = numpy_backend()
+        if np is not None:
+            self.x0, self.y0, self.x1, self.y1, self.bold_ratio = (np.asarray(c, dtype=np.float64) for c in cols)
+        else:
+            self.x0, self.y0, self.x1, self.y1, self.bold_ratio = (array("d", c) for c in cols)
+
+    @classmethod
+    def of(cls, spans: Union["SpanTable", Sequence[Span], None]) -> "SpanTable":
+        return spans if isinstance(spans, SpanTable) else cls(spans or ())
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def span(self, i: int) -> Span:
+        return Span(
+            text=self.text[i],
+            x0=float(self.x0[i]),
+            y0=float(self.y0[i]),
+            x1=float(self.x1[i]),
+            y1=float(self.y1[i]),
+            bold_ratio=float(self.bold_ratio[i]),
+        )
+
+    def select(
+        self,
+        *,
+        x0_min: Optional[float] = None,
+        x0_max: Optional[float] = None,
+        y0_min: Optional[float] = None,
+        y0_max: Optional[float] = None,
+        y1_min: Optional[float] = None,
+    ) -> List[int]:
+        """Indices des spans dans les bornes (inclusives)."""
+        n = len(self.text)
+        np = numpy_backend()
+        if np is not None:
+            mask = np.ones(n, dtype=bool)
+            if x0_min is not None:
+                mask &= self.x0 >= x0_min
+            if x0_max is not None:
+                mask &= self.x0 <= x0_max
+            if y0_min is not None:
+                mask &= self.y0 >= y0_min
+            if y0_max is not None:
+                mask &= self.y0 <= y0_max
+            if y1_min is not None:
+                mask &= self.y1 >= y1_min
+            return np.flatnonzero(mask).tolist()
+
+        out: List[int] = []
+        x0, y0, y1 = self.x0, self.y0, self.y1
+        for i in range(n):
+            if x0_min is not None and x0[i] < x0_min:
+                continue
+            if x0_max is not None and x0[i] > x0_max:
+                continue
+            if y0_min is not None and y0[i] < y0_min:
+                continue
+            if y0_max is not None and y0[i] > y0_max:
+                continue
+            if y1_min is not None and y1[i] < y1_min:
+                continue
+            out.append(i)
+        return out
+
+    def max_y1(self) -> float:
+        return float(max(self.y1)) if len(self.text) else 0.0
+
+
+Spans = Union[SpanTable, Sequence[Span]]
+
+
+@dataclass(frozen=True)
+class LayoutTemplate:
+    """
+    Colonnes (en points PDF) de la zone ACCESSOIRES OPTIONNELS d'un format de sticker.
+    """
+    name: str
+    right_text_min_x: float
+    right_text_max_x: float
+    price_min_x: float
+    detail_indent_x: float
+
+
+# Format Stellantis Canada (historique, valeurs calibrées à la main)
+DEFAULT_LAYOUT = LayoutTemplate(
+    name="stellantis-ca",
+    right_text_min_x=250,
+    right_text_max_x=445,
+    price_min_x=445,
+    detail_indent_x=315,
+)
+
+# Anchor FR + EN
+ANCHORS = ("ACCESSOIRES OPTIONNELS", "OPTIONAL EQUIPMENT")
+
+
 # ------------------------------
 # Helpers
 # ------------------------------
@@ -256,88 +396,147 @@ def clean_option_line(s: str) -> str:
 
 
 def choose_hashtags(title: str) -> str:
-    t = (title or "").lower()
+    # Tables marque / modèle / variantes: engine/hashtags.py (construites une fois, cache LRU)
+    return hashtag_line(title, style="sticker")
 
-    # Toujours présents
-    BASE_TAGS = [
-        "#Beauce", "#SaintGeorges", "#Quebec",
-        "#AutoUsagée", "#VehiculeOccasion",
-        "#DanielGiroux"
-    ]
 
-    # Marque -> intention
-    BRAND_TAGS = {
-        "ram": ["#RAM", "#Truck", "#Pickup"],
-        "jeep": ["#Jeep", "#4x4", "#SUV"],
-        "dodge": ["#Dodge", "#Performance"],
-        "chrysler": ["#Chrysler", "#Familiale"],
-        "alfa": ["#AlfaRomeo", "#Performance"],
-    }
+# ------------------------------
+# Limites avant parsing + mémoire par sticker
+# ------------------------------
 
-    # Modèle -> précision marketing
-    MODEL_TAGS = {
-        # Dodge
-        "hornet": ["#Hornet", "#SUV", "#Performance"],
-        "challenger": ["#Challenger", "#MuscleCar"],
-        "charger": ["#Charger", "#MuscleCar"],
-        "durango": ["#Durango", "#SUV"],
-
-        # RAM
-        "promaster": ["#ProMaster", "#Cargo", "#Van"],
-        "1500": ["#RAM1500", "#Pickup"],
-        "2500": ["#RAM2500", "#HeavyDuty"],
-
-        # Jeep
-        "wagoneer": ["#Wagoneer", "#SUV", "#4x4"],
-        "wrangler": ["#Wrangler", "#OffRoad", "#4x4"],
-        "grand cherokee": ["#GrandCherokee", "#LuxurySUV", "#4x4"],
-        "gladiator": ["#Gladiator", "#Pickup4x4"],
-    }
+def _env_num(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
 
-    # Variantes / mots-clés
-    VARIANT_TAGS = {
-        "r/t": ["#RT"],
-        " rt ": ["#RT"],  # aide quand "RT" est séparé
-        "plus": ["#Plus"],
-        "hybrid": ["#Hybride"],
-        "plug-in": ["#HybrideRechargeable"],
-        "phev": ["#HybrideRechargeable"],
-        "awd": ["#AWD"],
-        "4x4": ["#4x4"],
-        "4wd": ["#4x4"],
-        "v8": ["#V8"],
-    }
 
-    tags = []
+# Un sticker fait 1-2 pages et quelques centaines d'objets: au-delà, PDF malformé ou hors sujet
+# qui ferait exploser pdfminer en mémoire. 0 = pas de limite.
+MAX_PDF_BYTES = int(_env_num("STICKER_MAX_MB", 15) * 1024 * 1024)
+MAX_PDF_PAGES = int(_env_num("STICKER_MAX_PAGES", 8))
+MAX_PDF_OBJECTS = int(_env_num("STICKER_MAX_OBJECTS", 5000))
 
-    # 1) Marque (première qui match)
-    for brand, btags in BRAND_TAGS.items():
-        if brand in t:
-            tags.extend(btags)
-            break
+# échantillonnage RSS pendant le parse (ms); STICKER_TRACEMALLOC=1 ajoute le pic Python (plus lent)
+RSS_SAMPLE_MS = _env_num("STICKER_RSS_SAMPLE_MS", 20)
+TRACEMALLOC = os.getenv("STICKER_TRACEMALLOC", "").strip() == "1"
 
-    # 2) Modèle (peut en matcher plusieurs)
-    for model, mtags in MODEL_TAGS.items():
-        if model in t:
-            tags.extend(mtags)
+# code de sortie CLI (--json) quand un sticker dépasse une limite
+EXIT_LIMIT = 3
 
-    # 3) Variantes
-    for key, vtags in VARIANT_TAGS.items():
-        if key in t:
-            tags.extend(vtags)
+# recyclage des process: pool --batch (par worker) et daemon --serve (0 = jamais)
+WORKER_MAX_TASKS = int(_env_num("STICKER_WORKER_MAX_TASKS", 50))
+WORKER_MAX_RSS_MB = _env_num("STICKER_WORKER_MAX_RSS_MB", 600)
+DAEMON_MAX_JOBS = int(_env_num("STICKER_DAEMON_MAX_JOBS", 500))
+DAEMON_MAX_RSS_MB = _env_num("STICKER_DAEMON_MAX_RSS_MB", 600)
 
-    # 4) Base
-    tags.extend(BASE_TAGS)
 
-    # 5) Dédoublonnage + limite
-    out, seen = [], set()
-    for x in tags:
-        k = x.lower()
-        if k not in seen:
-            seen.add(k)
-            out.append(x)
+class PdfLimitError(ValueError):
+    """PDF refusé avant parsing: limit = "bytes" | "pages" | "objects"."""
 
-    return " ".join(out[:18])
+    def __init__(self, limit: str, value: int, cap: int) -> None:
+        super().__init__(f"PDF hors limites: {limit}={value} > {cap}")
+        self.limit = limit
+        self.value = value
+        self.cap = cap
+
+
+def check_pdf_limits(pdf_path: Path) -> Dict[str, int]:
+    """
+    Taille, nb de pages et nb d'objets (table xref) sans extraire le contenu.
+    Lève PdfLimitError au premier dépassement; retourne les mesures sinon.
+    PDF illisible ici (chiffré, xref cassée): seule la taille est vérifiée, le parse tranchera.
+    """
+    stats = {"bytes": Path(pdf_path).stat().st_size}
+    if MAX_PDF_BYTES and stats["bytes"] > MAX_PDF_BYTES:
+        raise PdfLimitError("bytes", stats["bytes"], MAX_PDF_BYTES)
+
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+
+    with open(pdf_path, "rb") as fh:
+        try:
+            doc = PDFDocument(PDFParser(fh))
+            objids = set()
+            for xref in doc.xrefs:
+                objids.update(xref.get_objids())
+            stats["objects"] = len(objids)
+        except Exception:
+            return stats
+        if MAX_PDF_OBJECTS and stats["objects"] > MAX_PDF_OBJECTS:
+            raise PdfLimitError("objects", stats["objects"], MAX_PDF_OBJECTS)
+
+        pages = 0
+        try:
+            for _ in PDFPage.create_pages(doc):
+                pages += 1
+                if MAX_PDF_PAGES and pages > MAX_PDF_PAGES:
+                    break
+        except Exception:
+            pass
+        stats["pages"] = pages
+        if MAX_PDF_PAGES and pages > MAX_PDF_PAGES:
+            raise PdfLimitError("pages", pages, MAX_PDF_PAGES)
+    return stats
+
+
+def rss_mb() -> float:
+    """RSS courant du process (Mo); repli: pic du process (getrusage) hors Linux."""
+    try:
+        with open("/proc/self/statm", "rb") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1048576.0
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1048576.0 if sys.platform == "darwin" else 1024.0)
+
+
+class MemorySampler:
+    """
+    with MemorySampler() as mem: ...  -> mem.result: rss_start/peak/end_mb (+ py_peak_mb si tracemalloc).
+    Thread d'échantillonnage RSS (toutes les RSS_SAMPLE_MS ms): le pic du parse, pas celui du process.
+    """
+
+    def __init__(self, interval_ms: float = RSS_SAMPLE_MS, trace: bool = TRACEMALLOC) -> None:
+        self.interval = max(0.001, interval_ms / 1000.0)
+        self.trace = trace
+        self.result: Dict[str, float] = {}
+        self._peak = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._own_tracemalloc = False
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._peak = max(self._peak, rss_mb())
+
+    def __enter__(self) -> "MemorySampler":
+        if self.trace:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._own_tracemalloc = True
+            tracemalloc.reset_peak()
+        self.result["rss_start_mb"] = self._peak = rss_mb()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+        end = rss_mb()
+        self.result["rss_peak_mb"] = round(max(self._peak, end), 1)
+        self.result["rss_end_mb"] = round(end, 1)
+        self.result["rss_start_mb"] = round(self.result["rss_start_mb"], 1)
+        if self.trace:
+            import tracemalloc
+            _, peak = tracemalloc.get_traced_memory()
+            self.result["py_peak_mb"] = round(peak / 1048576.0, 1)
+            if self._own_tracemalloc:
+                tracemalloc.stop()
 
 
 # ------------------------------
@@ -345,14 +544,22 @@ def choose_hashtags(title: str) -> str:
 # ------------------------------
 
 def maybe_decrypt_pdf(in_pdf: Path) -> Path:
+    """
+    Copie déverrouillée dans un fichier temporaire unique (mkstemp: deux stickers de même nom
+    en parallèle ne s'écrasent pas). Si le chemin retourné != in_pdf, l'appelant le supprime.
+    """
+    pikepdf = _optional_module("pikepdf")
     if not pikepdf:
         return in_pdf
+    fd, name = tempfile.mkstemp(prefix="sticker_unlocked_", suffix=".pdf")
+    os.close(fd)
+    out = Path(name)
     try:
         with pikepdf.open(str(in_pdf), allow_overwriting_input=False) as pdf:
-            out = Path(tempfile.gettempdir()) / (in_pdf.stem + "_unlocked.pdf")
             pdf.save(str(out))
             return out
     except Exception:
+        out.unlink(missing_ok=True)
         return in_pdf
 
 
@@ -360,9 +567,21 @@ def maybe_decrypt_pdf(in_pdf: Path) -> Path:
 # PDF miner spans extraction
 # ------------------------------
 
-def extract_spans_pdfminer(pdf_path: Path, max_pages: int = 2) -> List[Span]:
+def extract_spans_pdfminer(
+    pdf_path: Path,
+    max_pages: int = 2,
+    meta: Optional[Dict[str, Any]] = None,
+) -> List[Span]:
+    """
+    meta (optionnel) est rempli avec page_size (1re page) + fonts (noms de polices),
+    utilisés pour l'empreinte du format (layout_fingerprint).
+    """
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTAnno, LTChar, LTTextContainer
+
     spans: List[Span] = []
     pages = 0
+    fonts: set = set()
 
     def iter_objs(obj):
         if isinstance(obj, (LTChar, LTAnno)):
@@ -376,6 +595,8 @@ def extract_spans_pdfminer(pdf_path: Path, max_pages: int = 2) -> List[Span]:
 
     for page_layout in extract_pages(str(pdf_path)):
         pages += 1
+        if meta is not None and "page_size" not in meta:
+            meta["page_size"] = (float(page_layout.width), float(page_layout.height))
 
         for element in page_layout:
             if not isinstance(element, LTTextContainer):
@@ -405,6 +626,8 @@ def extract_spans_pdfminer(pdf_path: Path, max_pages: int = 2) -> List[Span]:
                 bold = 0
                 for c in chars:
                     fname = (getattr(c, "fontname", "") or "").lower()
+                    if fname:
+                        fonts.add(fname)
                     if any(k in fname for k in ("bold", "black", "demi", "heavy", "semibold")):
                         bold += 1
                 bold_ratio = (bold / len(chars)) if chars else 0.0
@@ -423,6 +646,9 @@ def extract_spans_pdfminer(pdf_path: Path, max_pages: int = 2) -> List[Span]:
         if pages >= max_pages:
             break
 
+    if meta is not None:
+        meta["fonts"] = sorted(fonts)
+
     return spans
 
 
@@ -430,17 +656,31 @@ def extract_spans_pdfminer(pdf_path: Path, max_pages: int = 2) -> List[Span]:
 # Big title extraction (best effort)
 # ------------------------------
 
-def extract_big_title(spans: List[Span]) -> Optional[str]:
+def extract_big_title(spans: Spans) -> Optional[str]:
     """
     Titre = plus gros texte (hauteur bbox) en haut du sticker.
     Regroupe d'abord les spans par ligne (Y proche), puis prend la ligne
     la plus "grosse" (y1-y0) dans le haut de page, en filtrant MSRP/prix/etc.
     """
-    if not spans:
+    table = SpanTable.of(spans)
+    if not len(table):
         return None
 
     Y_LINE_TOL = 3.0
-    sps = sorted(spans, key=lambda sp: (-sp.y0, sp.x0))
+
+    max_y = table.max_y1()
+    top_cut = max_y * 0.70
+
+    # Seules les lignes qui touchent le haut de page (y1 >= top_cut) comptent; une ligne
+    # ne regroupe que des spans à Y_LINE_TOL près -> on ne groupe que les spans assez hauts.
+    top = table.select(y1_min=top_cut)
+    if not top:
+        return None
+    y_floor = min(float(table.y0[i]) for i in top) - Y_LINE_TOL
+    sps = sorted(
+        (table.span(i) for i in table.select(y0_min=y_floor)),
+        key=lambda sp: (-sp.y0, sp.x0),
+    )
 
     lines: List[Dict[str, Any]] = []
     for sp in sps:
@@ -472,9 +712,6 @@ def extract_big_title(spans: List[Span]) -> Optional[str]:
             return 0.0
         return sum(p.bold_ratio for p in parts) / len(parts)
 
-    max_y = max(sp.y1 for sp in spans)
-    top_cut = max_y * 0.70
-
     BAD = (
         "année modèle", "annee modele",
         "manufacturer's suggested retail price", "suggested retail price", "msrp",
@@ -515,6 +752,8 @@ def extract_big_title(spans: List[Span]) -> Optional[str]:
 # ------------------------------
 
 def ocr_extract_text(pdf_path: Path) -> str:
+    pytesseract = _optional_module("pytesseract")
+    Image = _optional_module("PIL.Image")
     if not pytesseract or not Image:
         return ""
 
@@ -763,14 +1002,186 @@ def build_ad(
     return "\n".join(lines).strip() + "\n"
 
 
+# ------------------------------
+# Layout fingerprint -> template de colonnes
+# ------------------------------
+
+def _find_anchor_index(table: SpanTable) -> Optional[int]:
+    idx = [i for i, t in enumerate(table.text) if any(a in (t or "").upper() for a in ANCHORS)]
+    if not idx:
+        return None
+    return max(idx, key=lambda i: table.y0[i])
+
+
+def find_options_anchor(spans: Spans) -> Optional[Span]:
+    table = SpanTable.of(spans)
+    i = _find_anchor_index(table)
+    return table.span(i) if i is not None else None
+
+
+def _is_price_only(t: str) -> bool:
+    return bool(extract_price(t)) and len(re.sub(r"[^A-Za-zÀ-ÿ]", "", t or "")) < 2
+
+
+def _base_font(fontname: str) -> str:
+    # "ABCDEF+Helvetica-Bold" -> "helvetica-bold" (préfixe de sous-ensemble aléatoire)
+    f = (fontname or "").lower()
+    return f.split("+", 1)[1] if "+" in f else f
+
+
+def layout_fingerprint(spans: Spans, meta: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Empreinte du format: taille de page + position de l'ancre (arrondie) + polices.
+    Deux stickers du même gabarit donnent la même empreinte.
+    """
+    meta = meta or {}
+    w, h = meta.get("page_size") or (0.0, 0.0)
+    anchor = find_options_anchor(spans)
+    if anchor is not None:
+        ax, ay = int(round(anchor.x0 / 10.0)) * 10, int(round(anchor.y0 / 10.0)) * 10
+    else:
+        ax = ay = -1
+    fonts = sorted({_base_font(f) for f in (meta.get("fonts") or []) if f})
+    raw = f"{int(round(w))}x{int(round(h))}|{ax},{ay}|{','.join(fonts)}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def detect_layout(spans: Spans) -> Optional[LayoutTemplate]:
+    """
+    Format inconnu: déduit les colonnes depuis les spans sous l'ancre.
+    - colonne prix = spans "prix seulement" à droite de l'ancre
+    - colonne texte = de l'ancre jusqu'à la colonne prix
+    - indentation détails = entre le x des titres (alignés sur un prix) et le x des détails
+    """
+    table = SpanTable.of(spans)
+    a = _find_anchor_index(table)
+    if a is None:
+        return None
+    anchor_x, anchor_y = float(table.x0[a]), float(table.y0[a])
+
+    below = [i for i in table.select(y0_max=anchor_y) if i != a and normalize(table.text[i])]
+
+    price_idx = [i for i in below if table.x0[i] > anchor_x and _is_price_only(table.text[i])]
+    if not price_idx:
+        return None
+
+    price_min_x = min(float(table.x0[i]) for i in price_idx) - 5.0
+    text_min_x = anchor_x - 5.0
+
+    text_idx = [
+        i for i in below
+        if text_min_x <= table.x0[i] < price_min_x and not _is_price_only(table.text[i])
+    ]
+    if not text_idx:
+        return None
+
+    price_ys = [float(table.y0[i]) for i in price_idx]
+    titles = {i for i in text_idx if any(abs(py - table.y0[i]) <= 6.0 for py in price_ys)}
+    title_x = min((float(table.x0[i]) for i in titles), default=min(float(table.x0[i]) for i in text_idx))
+
+    detail_xs = [float(table.x0[i]) for i in text_idx if i not in titles and table.x0[i] > title_x + 8.0]
+    if detail_xs:
+        detail_indent_x = (title_x + min(detail_xs)) / 2.0
+    else:
+        detail_indent_x = title_x + (DEFAULT_LAYOUT.detail_indent_x - DEFAULT_LAYOUT.right_text_min_x)
+
+    return LayoutTemplate(
+        name="auto",
+        right_text_min_x=round(text_min_x, 1),
+        right_text_max_x=round(price_min_x, 1),
+        price_min_x=round(price_min_x, 1),
+        detail_indent_x=round(detail_indent_x, 1),
+    )
+
+
+# Gabarits appris: {fingerprint: LayoutTemplate}, persistés en JSON
+LAYOUTS_PATH = Path(
+    os.getenv("STICKER_LAYOUTS_PATH", "").strip()
+    or (Path(tempfile.gettempdir()) / "sticker_layouts.json")
+)
+
+_layouts: Optional[Dict[str, LayoutTemplate]] = None
+
+
+def known_layouts() -> Dict[str, LayoutTemplate]:
+    global _layouts
+    if _layouts is None:
+        _layouts = {}
+        try:
+            raw = json.loads(LAYOUTS_PATH.read_text(encoding="utf-8"))
+            for fp, d in (raw or {}).items():
+                _layouts[fp] = LayoutTemplate(**d)
+        except Exception:
+            pass
+    return _layouts
+
+
+def remember_layout(fp: str, layout: LayoutTemplate) -> None:
+    layouts = known_layouts()
+    if layouts.get(fp) == layout:
+        return
+    layouts[fp] = layout
+    # tmp par process: les workers du mode --batch écrivent en parallèle
+    tmp = LAYOUTS_PATH.with_name(f".{LAYOUTS_PATH.name}.{os.getpid()}.tmp")
+    try:
+        LAYOUTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(
+            json.dumps({k: v.__dict__ for k, v in layouts.items()}, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+        tmp.replace(LAYOUTS_PATH)
+    except Exception:
+        try:
+            tmp.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+def extract_option_groups_auto(
+    spans: Spans,
+    meta: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[LayoutTemplate]]:
+    """
+    1) gabarit connu pour cette empreinte -> direct
+    2) sinon gabarit par défaut, puis auto-détection
+    Le gabarit qui donne des groupes est mémorisé pour les prochains stickers du même format.
+    """
+    spans = SpanTable.of(spans)
+    if not len(spans):
+        return [], None
+
+    fp = layout_fingerprint(spans, meta)
+    known = known_layouts().get(fp)
+    if known is not None:
+        groups = extract_option_groups_from_spans(spans, known)
+        if groups:
+            return groups, known
+
+    for layout in (DEFAULT_LAYOUT, detect_layout(spans)):
+        if layout is None or layout == known:
+            continue
+        groups = extract_option_groups_from_spans(spans, layout)
+        if groups:
+            remember_layout(fp, layout)
+            return groups, layout
+
+    return [], known
+
+
 # ------------------------------
 # Options extraction (groups from spans) — FR+EN anchors, price-driven grouping
 # ------------------------------
 
-def extract_option_groups_from_spans(spans: List[Span]) -> List[Dict[str, Any]]:
-    if not spans:
+def extract_option_groups_from_spans(
+    spans: Spans,
+    layout: Optional[LayoutTemplate] = None,
+) -> List[Dict[str, Any]]:
+    table = SpanTable.of(spans)
+    if not len(table):
         return []
 
+    layout = layout or DEFAULT_LAYOUT
+
     def is_junk_detail(t: str) -> bool:
         low = (t or "").lower().strip()
         if looks_like_junk(t):
@@ -781,40 +1192,33 @@ def extract_option_groups_from_spans(spans: List[Span]) -> List[Dict[str, Any]]:
             return True
         return False
 
-    # Anchor FR + EN
-    ANCHORS = ("ACCESSOIRES OPTIONNELS", "OPTIONAL EQUIPMENT")
-    anchors = [sp for sp in spans if any(a in (sp.text or "").upper() for a in ANCHORS)]
-    if not anchors:
+    a = _find_anchor_index(table)
+    if a is None:
         return []
 
-    anchor = max(anchors, key=lambda sp: sp.y0)
-    anchor_y = anchor.y0
+    anchor_y = float(table.y0[a])
 
-    RIGHT_TEXT_MIN_X = 250
-    RIGHT_TEXT_MAX_X = 445
-    PRICE_MIN_X = 445
+    RIGHT_TEXT_MIN_X = layout.right_text_min_x
+    RIGHT_TEXT_MAX_X = layout.right_text_max_x
+    PRICE_MIN_X = layout.price_min_x
 
-    DETAIL_INDENT_X = 315
+    DETAIL_INDENT_X = layout.detail_indent_x
 
     right_text: List[Span] = []
     prices: List[Tuple[float, str]] = []
 
-    for sp in spans:
-        if sp.y0 > anchor_y:
-            continue
+    # masques colonnes (sous l'ancre seulement)
+    for i in table.select(y0_max=anchor_y, x0_min=RIGHT_TEXT_MIN_X, x0_max=RIGHT_TEXT_MAX_X):
+        t = clean_option_line(table.text[i])
+        if t and not looks_like_junk(t):
+            right_text.append(table.span(i))
 
-        t = clean_option_line(sp.text)
-        if not t:
-            continue
-
-        if RIGHT_TEXT_MIN_X <= sp.x0 <= RIGHT_TEXT_MAX_X:
-            if not looks_like_junk(t):
-                right_text.append(sp)
-
-        if sp.x0 >= PRICE_MIN_X and is_price_token(sp.text):
-            p = extract_price(sp.text)
+    for i in table.select(y0_max=anchor_y, x0_min=PRICE_MIN_X):
+        raw = table.text[i]
+        if clean_option_line(raw) and is_price_token(raw):
+            p = extract_price(raw)
             if p:
-                prices.append((sp.y0, p))
+                prices.append((float(table.y0[i]), p))
 
     right_text.sort(key=lambda s: s.y0, reverse=True)
 
@@ -998,92 +1402,604 @@ def extract_paid_options_from_text(txt: str) -> List[str]:
 
 
 # ------------------------------
-# Main
+# Parse complet (sans écriture) — réutilisé par main() et le mode batch
 # ------------------------------
 
-def main() -> int:
-    ap = argparse.ArgumentParser()
-    ap.add_argument("pdf", help="Chemin vers le window sticker PDF")
-    ap.add_argument("--out", default="/tmp/output_stickers", help="Dossier de sortie OU chemin .txt")
-    ap.add_argument("--title", default="", help="Titre affiché de l'annonce (idéalement du site Kennebec)")
-    ap.add_argument("--price", default="", help="Prix (vient du site Kennebec)")
-    ap.add_argument("--mileage", default="", help="Kilométrage (vient du site Kennebec)")
-    ap.add_argument("--stock", default="", help="Numéro d'inventaire (ex: 06213)")
-    ap.add_argument("--vin", default="", help="VIN (optionnel, sinon auto-extrait)")
-    ap.add_argument("--url", default="", help="(Optionnel) URL fiche - ignorée volontairement")
+DEFAULT_DEALER = "Kennebec Dodge Chrysler — Saint-Georges (Beauce)"
 
-    # ✅ NOUVEAUX CHAMPS (viennent de KenBot)
-    ap.add_argument("--dealer", default="Kennebec Dodge Chrysler — Saint-Georges (Beauce)", help="Concession (Kennebec)")
-    ap.add_argument("--year", default="", help="Année (vient de Kennebec)")
-    ap.add_argument("--transmission", default="", help="Transmission (vient de Kennebec)")
-    ap.add_argument("--drivetrain", default="", help="Entraînement (vient de Kennebec)")
 
-    args = ap.parse_args()
+class StageTimer:
+    """
+    Chrono par étape du parse (secondes, cumulées si une étape revient).
+    profile=True: ajoute temps CPU + pic mémoire (tracemalloc) par étape dans .profile.
+    """
 
-    if not args.price.strip() or not args.mileage.strip():
-        print("⛔ Prix/KM manquants: ils doivent venir du site Kennebec (passes --price et --mileage).", file=sys.stderr)
-        # return 2
+    def __init__(self, profile: bool = False) -> None:
+        self.timings: Dict[str, float] = {}
+        self.profile: Dict[str, Dict[str, float]] = {}
+        self.enabled = profile
+        self._own_tracemalloc = False
+
+    def start(self) -> None:
+        if not self.enabled:
+            return
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._own_tracemalloc = True
+
+    def stop(self) -> None:
+        if self._own_tracemalloc:
+            import tracemalloc
+            tracemalloc.stop()
+            self._own_tracemalloc = False
+
+    @contextmanager
+    def stage(self, name: str):
+        tracing = False
+        if self.enabled:
+            import tracemalloc
+            tracing = tracemalloc.is_tracing()
+            if tracing:
+                tracemalloc.reset_peak()
+                base, _ = tracemalloc.get_traced_memory()
+            c0 = time.process_time()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            dt = time.perf_counter() - t0
+            self.timings[name] = round(self.timings.get(name, 0.0) + dt, 4)
+            if self.enabled:
+                rec = self.profile.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "peak_kb": 0.0})
+                rec["wall_s"] = round(rec["wall_s"] + dt, 4)
+                rec["cpu_s"] = round(rec["cpu_s"] + (time.process_time() - c0), 4)
+                if tracing:
+                    _, peak = tracemalloc.get_traced_memory()
+                    rec["peak_kb"] = max(rec["peak_kb"], round((peak - base) / 1024.0, 1))
+
+    def report(self) -> str:
+        return self.report_of(self.profile)
+
+    @staticmethod
+    def report_of(profile: Dict[str, Dict[str, float]]) -> str:
+        rows = [f"{'étape':<34} {'wall_s':>8} {'cpu_s':>8} {'peak_kb':>10}"]
+        for name, r in profile.items():
+            rows.append(f"{name:<34} {r['wall_s']:>8.4f} {r['cpu_s']:>8.4f} {r['peak_kb']:>10.1f}")
+        return "\n".join(rows)
+
+
+def process_sticker(
+    pdf_path: Path,
+    fields: Optional[Dict[str, Any]] = None,
+    *,
+    profile: bool = False,
+    pstats_out: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """
+    Sticker PDF + champs Kennebec (title/price/mileage/stock/vin/dealer/year/transmission/drivetrain)
+    -> dict: groups, vin, is_hybrid, title, stock, source, ad, timings (s par étape),
+    memory (RSS début/pic/fin du parse, MemorySampler), pdf_stats (octets/pages/objets).
+    skipped = "brand" si marque hors Stellantis (ad vide).
+    PdfLimitError si le PDF dépasse STICKER_MAX_MB / STICKER_MAX_PAGES / STICKER_MAX_OBJECTS.
+    profile=True: ajoute "profile" (wall/cpu/pic mémoire par étape).
+    pstats_out: dump cProfile (lisible avec python -m pstats).
+    """
+    timer = StageTimer(profile=profile)
+    prof = None
+    if pstats_out:
+        import cProfile
+        prof = cProfile.Profile()
+
+    timer.start()
+    if prof:
+        prof.enable()
+    try:
+        with MemorySampler() as mem:
+            res = _process_sticker(Path(pdf_path).expanduser(), fields or {}, timer)
+        res["memory"] = mem.result
+    finally:
+        if prof:
+            prof.disable()
+            prof.dump_stats(str(pstats_out))
+        timer.stop()
 
+    if profile:
+        res["profile"] = timer.profile
+    return res
 
-    pdf_path = Path(args.pdf).expanduser()
-    if not pdf_path.exists():
-        print(f"PDF introuvable: {pdf_path}", file=sys.stderr)
-        return 2
 
-    unlocked = maybe_decrypt_pdf(pdf_path)
+def _process_sticker(pdf_path: Path, fields: Dict[str, Any], timer: StageTimer) -> Dict[str, Any]:
+    f = {k: str(v if v is not None else "").strip() for k, v in fields.items()}
+
+    with timer.stage("check_pdf_limits"):
+        pdf_stats = check_pdf_limits(pdf_path)
 
+    with timer.stage("maybe_decrypt_pdf"):
+        unlocked = maybe_decrypt_pdf(pdf_path)
+    try:
+        return _parse_unlocked(pdf_path, unlocked, f, pdf_stats, timer)
+    finally:
+        if unlocked != pdf_path:
+            unlocked.unlink(missing_ok=True)
+
+
+def _parse_unlocked(
+    pdf_path: Path,
+    unlocked: Path,
+    f: Dict[str, str],
+    pdf_stats: Dict[str, Any],
+    timer: StageTimer,
+) -> Dict[str, Any]:
     # spans (coords) -> 2 pages
-    spans = extract_spans_pdfminer(unlocked, max_pages=2)
+    layout_meta: Dict[str, Any] = {}
+    with timer.stage("extract_spans_pdfminer"):
+        spans = SpanTable(extract_spans_pdfminer(unlocked, max_pages=2, meta=layout_meta))
 
     # texte brut fallback -> 2 pages
-    page_txt = pdfminer_extract_text(str(unlocked), maxpages=2) or ""
+    from pdfminer.high_level import extract_text as pdfminer_extract_text
+
+    with timer.stage("pdfminer_extract_text"):
+        page_txt = pdfminer_extract_text(str(unlocked), maxpages=2) or ""
     is_hybrid = detect_hybrid_from_text(page_txt)
 
+    result: Dict[str, Any] = {
+        "pdf": str(pdf_path),
+        "skipped": "",
+        "stock": "",
+        "vin": "",
+        "title": "",
+        "is_hybrid": is_hybrid,
+        "source": "",
+        "layout": "",
+        "groups": [],
+        "ad": "",
+        "timings": timer.timings,
+        "pdf_stats": pdf_stats,
+    }
+
     # filtre marque (Stellantis)
     if page_txt.strip() and not is_allowed_stellantis_brand(page_txt):
-        print("⛔ Sticker ignoré: marque hors RAM/Dodge/Jeep/Chrysler/Alfa Romeo.")
-        return 0
+        result["skipped"] = "brand"
+        return result
 
     # VIN (auto si pas fourni)
     auto_vin = extract_vin_from_text(page_txt)
-    vin = args.vin.strip() or auto_vin
+    vin = f.get("vin", "") or auto_vin
 
     # Stock (sert aussi à fallback titre si besoin)
     auto_stock = pdf_path.parent.name or pdf_path.stem
-    stock = re.sub(r"\s+", "", (args.stock.strip() or auto_stock).strip()) or pdf_path.stem
+    stock = re.sub(r"\s+", "", (f.get("stock", "") or auto_stock).strip()) or pdf_path.stem
 
     # Titre: priorité au site, sinon "gros titre" pdf, sinon stock
     auto_title = extract_big_title(spans) or ""
-    title = args.title.strip() or auto_title or stock or pdf_path.stem
+    title = f.get("title", "") or auto_title or stock or pdf_path.stem
 
-    # options groups via spans
-    groups = extract_option_groups_from_spans(spans)
+    # options groups via spans (gabarit de colonnes selon l'empreinte du format)
+    with timer.stage("extract_option_groups_from_spans"):
+        groups, layout = extract_option_groups_auto(spans, layout_meta)
+    source = "spans" if groups else ""
 
     # fallback texte (si groups vide)
     if not groups and page_txt.strip():
-        flat = extract_paid_options_from_text(page_txt)
+        with timer.stage("extract_paid_options_from_text"):
+            flat = extract_paid_options_from_text(page_txt)
         groups = [{"title": x, "price": None, "details": []} for x in flat]
+        source = "text" if groups else ""
 
     # fallback OCR (dernier recours)
     if not groups:
-        ocr_txt = ocr_extract_text(unlocked)
-        if ocr_txt:
-            groups = extract_option_groups_from_ocr(ocr_txt)
+        with timer.stage("ocr_extract_text"):
+            ocr_txt = ocr_extract_text(unlocked)
+            if ocr_txt:
+                groups = extract_option_groups_from_ocr(ocr_txt)
+        source = "ocr" if groups else ""
 
     # Annonce
-    ad = build_ad(
-    title=title,
-    price=args.price.strip(),
-    mileage=args.mileage.strip(),
-    stock=stock,
-    vin=vin,
-    options=groups,
-    is_hybrid=is_hybrid,
-    dealer=args.dealer.strip(),
-    year=args.year.strip(),
-    transmission=args.transmission.strip(),
-    drivetrain=args.drivetrain.strip(),
-)
+    with timer.stage("build_ad"):
+        ad = build_ad(
+            title=title,
+            price=f.get("price", ""),
+            mileage=f.get("mileage", ""),
+            stock=stock,
+            vin=vin,
+            options=groups,
+            is_hybrid=is_hybrid,
+            dealer=f.get("dealer", DEFAULT_DEALER),
+            year=f.get("year", ""),
+            transmission=f.get("transmission", ""),
+            drivetrain=f.get("drivetrain", ""),
+        )
+
+    result.update(
+        stock=stock,
+        vin=vin,
+        title=title,
+        source=source or "none",
+        layout=layout.name if (layout and source == "spans") else "",
+        groups=groups,
+        ad=ad,
+    )
+    return result
+
+
+# ------------------------------
+# Batch (dossier de PDFs ou manifeste JSONL) — pool de processus, reprise
+# ------------------------------
+
+def iter_batch_jobs(source: Path) -> Iterator[Dict[str, Any]]:
+    """
+    - dossier: tous les *.pdf (récursif), champs véhicule vides
+    - .jsonl: une ligne = {"pdf": "...", "title": ..., "price": ..., ...}
+      (chemins relatifs résolus depuis le dossier du manifeste)
+    - ligne JSON invalide -> job {"pdf": "<manifeste>:<ligne>", "error": ...} (pas d'exception)
+    """
+    source = Path(source).expanduser()
+    if source.is_dir():
+        for pdf in sorted(source.rglob("*.pdf")):
+            yield {"pdf": str(pdf)}
+        return
+
+    with source.open("r", encoding="utf-8") as fh:
+        for lineno, line in enumerate(fh, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                job = json.loads(line)
+                if not isinstance(job, dict):
+                    raise ValueError("objet JSON attendu")
+            except ValueError as e:
+                # ligne illisible: rapportée en erreur, le reste du manifeste continue
+                yield {"pdf": f"{source}:{lineno}", "error": f"manifeste invalide: {e}"}
+                continue
+            pdf = Path(str(job.get("pdf") or "")).expanduser()
+            if not str(job.get("pdf") or "").strip():
+                continue
+            if not pdf.is_absolute():
+                pdf = source.parent / pdf
+            job["pdf"] = str(pdf)
+            yield job
+
+
+def _batch_done(out_path: Path) -> set:
+    done = set()
+    if not out_path.exists():
+        return done
+    with out_path.open("r", encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                rec = json.loads(line)
+            except Exception:
+                continue  # ligne tronquée (run interrompu) -> on refait
+            if not rec.get("error") or rec.get("limit"):
+                done.add(rec.get("pdf"))  # erreurs: retentées au prochain run (sauf PDF hors limites)
+    return done
+
+
+def _batch_worker(job: Dict[str, Any]) -> Dict[str, Any]:
+    pdf = job["pdf"]
+    fields = {k: v for k, v in job.items() if k != "pdf"}
+    try:
+        if not Path(pdf).exists():
+            return {"pdf": pdf, "error": "PDF introuvable"}
+        res = process_sticker(Path(pdf), fields)
+    except PdfLimitError as e:
+        res = {"pdf": pdf, "error": f"PdfLimitError: {e}", "limit": e.limit}
+    except Exception as e:
+        res = {"pdf": pdf, "error": f"{type(e).__name__}: {e}"}
+    res["worker_pid"] = os.getpid()
+    res["worker_rss_mb"] = round(rss_mb(), 1)
+    return res
+
+
+def run_batch(source: Path, out_path: Path, jobs: int = 0) -> int:
+    """
+    Parse tous les stickers en parallèle (1 process par coeur par défaut) et ajoute
+    une ligne JSON par sticker dans out_path. Relancer reprend là où ça s'est arrêté.
+    Recyclage: un worker qui a fait WORKER_MAX_TASKS stickers ou dépasse WORKER_MAX_RSS_MB
+    fait recréer le pool (on vide la fenêtre en cours puis on repart avec des process neufs).
+    max_tasks_per_child n'est pas utilisé: il peut bloquer le pool (CPython < 3.13).
+    Worker tué (OOM, segfault): les stickers en vol sont notés en erreur (retentés au
+    prochain run) et le lot continue avec un pool neuf.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    from concurrent.futures.process import BrokenProcessPool
+
+    out_path = Path(out_path).expanduser()
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    done = _batch_done(out_path)
+    workers = jobs or os.cpu_count() or 1
+
+    todo = (j for j in iter_batch_jobs(source) if j["pdf"] not in done)
+    n_ok = n_err = n_recycled = 0
+    per_worker: Dict[int, int] = {}
+
+    exhausted = False
+    with out_path.open("a", encoding="utf-8") as out:
+        while not exhausted:
+            recycle = ""
+            per_worker.clear()
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                pending: Dict[Any, Dict[str, Any]] = {}  # future -> job
+                while True:
+                    while not exhausted and not recycle and len(pending) < workers * 4:
+                        job = next(todo, None)
+                        if job is None:
+                            exhausted = True
+                            break
+                        if job.get("error"):  # ligne de manifeste invalide: notée telle quelle
+                            n_err += 1
+                            out.write(json.dumps(job, ensure_ascii=False) + "\n")
+                            out.flush()
+                            continue
+                        pending[ex.submit(_batch_worker, job)] = job
+                    if not pending:
+                        break
+
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    broken = False
+                    for fut in finished:
+                        job = pending.pop(fut)
+                        try:
+                            res = fut.result()
+                        except BrokenProcessPool as e:
+                            broken = True
+                            res = {"pdf": job["pdf"], "error": f"BrokenProcessPool: {e}"}
+                        if res.get("error"):
+                            n_err += 1
+                        else:
+                            n_ok += 1
+                        pid = res.get("worker_pid") or 0
+                        per_worker[pid] = per_worker.get(pid, 0) + 1
+                        if WORKER_MAX_RSS_MB and (res.get("worker_rss_mb") or 0) > WORKER_MAX_RSS_MB:
+                            recycle = f"worker > {WORKER_MAX_RSS_MB:.0f} Mo RSS"
+                        elif WORKER_MAX_TASKS and per_worker[pid] >= WORKER_MAX_TASKS:
+                            recycle = f"worker à {WORKER_MAX_TASKS} stickers"
+                        out.write(json.dumps(res, ensure_ascii=False) + "\n")
+                        out.flush()
+                    if broken:
+                        # toutes les futures du pool échouent: on note les jobs en vol et on repart
+                        for job in pending.values():
+                            n_err += 1
+                            rec = {"pdf": job["pdf"], "error": "BrokenProcessPool: worker mort pendant le lot"}
+                            out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                        out.flush()
+                        pending.clear()
+                        recycle = "worker mort (BrokenProcessPool)"
+                        break
+            if recycle:
+                n_recycled += 1
+                print(f"Batch: pool recyclé ({recycle})", file=sys.stderr)
+
+    print(
+        f"Batch: {n_ok} ok, {n_err} erreurs, {len(done)} déjà faits, {n_recycled} recyclages -> {out_path}",
+        file=sys.stderr,
+    )
+    return 0 if n_err == 0 else 1
+
+
+# ------------------------------
+# Daemon (JSON-lines sur stdin/stdout ou socket Unix)
+# ------------------------------
+
+def handle_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Job: {"id": ..., "pdf": "/chemin.pdf"} ou {"id": ..., "pdf_b64": "..."} + champs véhicule
+    (+ "profile": true). Réponse: résultat de process_sticker + id + ok/error.
+    """
+    import base64
+
+    job_id = job.get("id")
+    fields = {k: v for k, v in job.items() if k not in ("id", "pdf", "pdf_b64", "profile")}
+    tmp: Optional[Path] = None
+    try:
+        if job.get("pdf_b64"):
+            fd, name = tempfile.mkstemp(prefix="sticker_job_", suffix=".pdf")
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(base64.b64decode(job["pdf_b64"]))
+            tmp = Path(name)
+            pdf = tmp
+        else:
+            pdf = Path(str(job.get("pdf") or "")).expanduser()
+            if not str(job.get("pdf") or "").strip() or not pdf.exists():
+                return {"id": job_id, "ok": False, "error": f"PDF introuvable: {pdf}"}
+
+        res = process_sticker(pdf, fields, profile=bool(job.get("profile")))
+        res.update(id=job_id, ok=True)
+        return res
+    except PdfLimitError as e:
+        return {"id": job_id, "ok": False, "error": f"PdfLimitError: {e}", "limit": e.limit}
+    except Exception as e:
+        return {"id": job_id, "ok": False, "error": f"{type(e).__name__}: {e}"}
+    finally:
+        if tmp is not None:
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+
+
+class _Recycler:
+    """
+    Daemon: sortie propre après DAEMON_MAX_JOBS jobs ou au-dessus de DAEMON_MAX_RSS_MB
+    (pdfminer ne rend pas toujours la mémoire). La dernière réponse porte "recycle": raison,
+    le client (sticker_client) ferme alors le process et en relance un au job suivant.
+    """
+
+    def __init__(self) -> None:
+        self.jobs = 0
+        self.reason = ""
+
+    def after_job(self, res: Dict[str, Any]) -> None:
+        self.jobs += 1
+        rss = rss_mb()
+        if DAEMON_MAX_JOBS and self.jobs >= DAEMON_MAX_JOBS:
+            self.reason = f"jobs={self.jobs}"
+        elif DAEMON_MAX_RSS_MB and rss > DAEMON_MAX_RSS_MB:
+            self.reason = f"rss={rss:.0f}Mo"
+        if self.reason:
+            res["recycle"] = self.reason
+
+
+def _handle_line(line: str, recycler: Optional[_Recycler] = None) -> Optional[str]:
+    line = (line or "").strip()
+    if not line:
+        return None
+    try:
+        job = json.loads(line)
+    except ValueError as e:
+        return json.dumps({"id": None, "ok": False, "error": f"JSON invalide: {e}"})
+    res = handle_job(job)
+    if recycler is not None:
+        recycler.after_job(res)
+    return json.dumps(res, ensure_ascii=False)
+
+
+def serve_stdio() -> int:
+    """Un job JSON par ligne sur stdin -> une réponse JSON par ligne sur stdout."""
+    recycler = _Recycler()
+    for line in sys.stdin:
+        out = _handle_line(line, recycler)
+        if out is None:
+            continue
+        sys.stdout.write(out + "\n")
+        sys.stdout.flush()
+        if recycler.reason:
+            print(f"sticker_to_ad: daemon recyclé ({recycler.reason})", file=sys.stderr)
+            break
+    return 0
+
+
+def serve_socket(path: Path) -> int:
+    """Même protocole sur un socket Unix (un job à la fois, plusieurs par connexion)."""
+    import socketserver
+
+    path = Path(path).expanduser()
+    if path.exists():
+        path.unlink()
+    recycler = _Recycler()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            for raw in self.rfile:
+                out = _handle_line(raw.decode("utf-8", errors="replace"), recycler)
+                if out is None:
+                    continue
+                self.wfile.write((out + "\n").encode("utf-8"))
+                self.wfile.flush()
+                if recycler.reason:
+                    return
+
+    with socketserver.UnixStreamServer(str(path), Handler) as srv:
+        print(f"sticker_to_ad: écoute sur {path}", file=sys.stderr)
+        try:
+            while not recycler.reason:
+                srv.handle_request()
+            print(f"sticker_to_ad: daemon recyclé ({recycler.reason})", file=sys.stderr)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+    return 0
+
+
+# ------------------------------
+# Main
+# ------------------------------
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("pdf", nargs="?", default="", help="Chemin vers le window sticker PDF")
+    ap.add_argument("--out", default="/tmp/output_stickers", help="Dossier de sortie OU chemin .txt (.jsonl en --batch)")
+    ap.add_argument("--title", default="", help="Titre affiché de l'annonce (idéalement du site Kennebec)")
+    ap.add_argument("--price", default="", help="Prix (vient du site Kennebec)")
+    ap.add_argument("--mileage", default="", help="Kilométrage (vient du site Kennebec)")
+    ap.add_argument("--stock", default="", help="Numéro d'inventaire (ex: 06213)")
+    ap.add_argument("--vin", default="", help="VIN (optionnel, sinon auto-extrait)")
+    ap.add_argument("--url", default="", help="(Optionnel) URL fiche - ignorée volontairement")
+
+    # ✅ NOUVEAUX CHAMPS (viennent de KenBot)
+    ap.add_argument("--dealer", default=DEFAULT_DEALER, help="Concession (Kennebec)")
+    ap.add_argument("--year", default="", help="Année (vient de Kennebec)")
+    ap.add_argument("--transmission", default="", help="Transmission (vient de Kennebec)")
+    ap.add_argument("--drivetrain", default="", help="Entraînement (vient de Kennebec)")
+
+    # Batch: re-parse d'archive
+    ap.add_argument("--batch", default="", help="Dossier de PDFs ou manifeste .jsonl (pdf + champs véhicule)")
+    ap.add_argument("--jobs", type=int, default=0, help="Process en parallèle pour --batch (défaut: nb de coeurs)")
+
+    # Sortie structurée: 1 document JSON sur stdout, aucun fichier écrit
+    ap.add_argument("--json", action="store_true", help="Écrit le résultat (groups, vin, titre, annonce, timings) en JSON sur stdout")
+
+    # Profilage par étape (wall / CPU / pic mémoire) + dump cProfile optionnel
+    ap.add_argument("--profile", action="store_true", help="Mesure wall/CPU/pic mémoire par étape (stderr, ou clé profile en --json)")
+    ap.add_argument("--profile-out", default="", help="Fichier .pstats (cProfile) à écrire")
+
+    # Daemon résident (évite le démarrage Python + imports à chaque sticker)
+    ap.add_argument("--serve", action="store_true", help="Daemon: jobs JSON-lines sur stdin, résultats sur stdout")
+    ap.add_argument("--socket", default="", help="Daemon sur un socket Unix (chemin) au lieu de stdin/stdout")
+
+    args = ap.parse_args()
+
+    if args.socket or args.serve:
+        preload()
+    if args.socket:
+        return serve_socket(Path(args.socket))
+    if args.serve:
+        return serve_stdio()
+
+    if args.batch:
+        out_target = Path(args.out).expanduser()
+        out_jsonl = out_target if out_target.suffix.lower() == ".jsonl" else out_target / "stickers.jsonl"
+        return run_batch(Path(args.batch), out_jsonl, jobs=args.jobs)
+
+    if not args.pdf:
+        ap.error("pdf requis (ou --batch)")
+
+    if not args.price.strip() or not args.mileage.strip():
+        print("⛔ Prix/KM manquants: ils doivent venir du site Kennebec (passes --price et --mileage).", file=sys.stderr)
+        # return 2
+
+
+    pdf_path = Path(args.pdf).expanduser()
+    if not pdf_path.exists():
+        print(f"PDF introuvable: {pdf_path}", file=sys.stderr)
+        return 2
+
+    try:
+        res = process_sticker(pdf_path, {
+            "title": args.title,
+            "price": args.price,
+            "mileage": args.mileage,
+            "stock": args.stock,
+            "vin": args.vin,
+            "dealer": args.dealer,
+            "year": args.year,
+            "transmission": args.transmission,
+            "drivetrain": args.drivetrain,
+        }, profile=args.profile, pstats_out=Path(args.profile_out).expanduser() if args.profile_out else None)
+    except PdfLimitError as e:
+        print(f"⛔ {e}", file=sys.stderr)
+        return EXIT_LIMIT
+
+    if args.profile:
+        print(StageTimer.report_of(res.get("profile") or {}), file=sys.stderr)
+
+    if args.json:
+        print(json.dumps(res, ensure_ascii=False))
+        return 0
+
+    if res["skipped"] == "brand":
+        print("⛔ Sticker ignoré: marque hors RAM/Dodge/Jeep/Chrysler/Alfa Romeo.")
+        return 0
+
+    stock = res["stock"]
+    groups = res["groups"]
+    ad = res["ad"]
 
     out_target = Path(args.out).expanduser()
     if out_target.suffix.lower() == ".txt":
@@ -1,18 +1,18 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import json
+import os
 import re
-import sys
 import subprocess
+import sys
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
 # Dépendances: build_ad + is_allowed_stellantis_brand doivent exister dans engine/ad_builder.py
 from engine.ad_builder import build_ad, is_allowed_stellantis_brand
 
-# pdfminer imports doivent être disponibles côté KenBot (requirements)
-from pdfminer.high_level import extract_pages
-from pdfminer.layout import LTTextContainer, LTTextLine, LTChar
+# pdfminer doit être disponible côté KenBot (requirements); importé au premier PDF (démarrage plus rapide)
 
 
 # --------------------------
@@ -28,6 +28,9 @@ def extract_lines_with_bold_from_pdf(pdf_path: Path) -> List[Tuple[str, bool]]:
     Retourne [(ligne, is_bold)] basé sur la police.
     Marche seulement si le PDF contient du texte (pas juste une image).
     """
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTChar, LTTextContainer, LTTextLine
+
     out: List[Tuple[str, bool]] = []
     for page_layout in extract_pages(str(pdf_path)):
         for element in page_layout:
@@ -142,14 +145,113 @@ def parse_sticker_lines_to_options(lines: List[str]) -> List[Dict[str, Any]]:
     return out[:40]
 
 
+# --------------------------
+# Sticker PDF -> parse dans un process isolé (1 seul parse pour FB + Marketplace)
+# --------------------------
+
+STICKER_PARSE_TIMEOUT = 25.0
+STICKER_SCRIPT = Path(__file__).resolve().parent / "sticker_to_ad.py"
+USE_STICKER_DAEMON = os.getenv("STICKER_DAEMON", "").strip() == "1"
+
+
+def _parse_out_of_process(pdf: Path, fields: Dict[str, str], timeout: float) -> Dict[str, Any]:
+    """
+    Comme main._run_sticker_to_ad: daemon résident (STICKER_DAEMON=1) ou subprocess --json.
+    Au timeout le process est tué: un PDF qui bloque pdfminer ne garde ni thread ni mémoire ici.
+    """
+    if USE_STICKER_DAEMON:
+        from engine.sticker_client import get_daemon
+        return get_daemon().parse(pdf, fields, timeout=timeout)
+
+    cmd = [sys.executable, str(STICKER_SCRIPT), str(pdf), "--json"]
+    for k in ("title", "price", "mileage", "stock", "vin"):
+        cmd += [f"--{k}", fields.get(k, "")]
+    # subprocess.run tue l'enfant sur TimeoutExpired
+    p = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    if p.returncode != 0:
+        raise RuntimeError(f"code={p.returncode} {(p.stderr or '').strip()[-300:]}")
+    return json.loads(p.stdout)
+
+
+def parse_sticker_pdf(
+    sticker_pdf: Optional[Path],
+    vehicle: Dict[str, Any],
+    timeout: float = STICKER_PARSE_TIMEOUT,
+) -> Optional[Dict[str, Any]]:
+    """
+    Parse le sticker hors process (sticker_to_ad --json / daemon), borné par timeout.
+    None si pas de PDF / échec / timeout / marque hors Stellantis -> l'appelant prend le fallback.
+    Le résultat sert à build_publish_text ET build_marketplace_text (parsed=...).
+    """
+    if not sticker_pdf or not Path(sticker_pdf).exists():
+        return None
+    title = (vehicle.get("title") or "").strip()
+    if title and not is_allowed_stellantis_brand(title):
+        return None
+
+    fields = {
+        "title": (vehicle.get("title") or "").strip(),
+        "price": (vehicle.get("price") or "").strip(),
+        "mileage": (vehicle.get("mileage") or "").strip(),
+        "stock": (vehicle.get("stock") or "").strip().upper(),
+        "vin": (vehicle.get("vin") or "").strip().upper(),
+    }
+
+    try:
+        parsed = _parse_out_of_process(Path(sticker_pdf), fields, timeout)
+    except (subprocess.TimeoutExpired, TimeoutError):
+        print(f"[sticker] parse timeout ({timeout}s): {sticker_pdf}")
+        return None
+    except Exception as e:
+        print(f"[sticker] parse failed: {sticker_pdf} err={e}")
+        return None
+
+    if parsed.get("skipped") or not parsed.get("ad"):
+        return None
+    return parsed
+
+
+def _marketplace_groups(groups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Groupes d'options du sticker sans aucun prix (prix du groupe vidé, montants retirés des libellés)."""
+    out: List[Dict[str, Any]] = []
+    for g in groups or []:
+        title = strip_option_prices([g.get("title") or ""])
+        if not title:
+            continue
+        details = [d for d in strip_option_prices(g.get("details") or []) if re.search(r"[A-Za-zÀ-ÿ]", d)]
+        out.append({"title": title[0], "price": None, "details": details})
+    return out
+
+
+def build_texts(
+    vehicle: Dict[str, Any],
+    sticker_lines: List[str],
+    sticker_pdf: Optional[Path] = None,
+    timeout: float = STICKER_PARSE_TIMEOUT,
+) -> Dict[str, str]:
+    """
+    Facebook + Marketplace à partir d'UN seul parse du sticker.
+    """
+    parsed = parse_sticker_pdf(sticker_pdf, vehicle, timeout=timeout)
+    return {
+        "facebook": build_publish_text(vehicle, sticker_lines, parsed=parsed),
+        "marketplace": build_marketplace_text(vehicle=vehicle, sticker_lines=sticker_lines, parsed=parsed),
+    }
+
+
 # --------------------------
 # FB text (DG) — stable format
 # --------------------------
 
-def build_publish_text(vehicle: Dict[str, Any], sticker_lines: List[str]) -> str:
+def build_publish_text(
+    vehicle: Dict[str, Any],
+    sticker_lines: List[str],
+    parsed: Optional[Dict[str, Any]] = None,
+) -> str:
     """
     Texte DG (Facebook) en format build_ad().
-    - options = sticker_lines (si Stellantis + sticker), sinon fallback comfort/features
+    - options = groupes du sticker parsé (parsed), sinon sticker_lines (si Stellantis + sticker),
+      sinon fallback comfort/features
     """
     title = (vehicle.get("title") or "").strip()
     price = (vehicle.get("price") or "").strip()
@@ -158,7 +260,10 @@ def build_publish_text(vehicle: Dict[str, Any], sticker_lines: List[str]) -> str
     vin = (vehicle.get("vin") or "").strip().upper()
     url = (vehicle.get("url") or "").strip()
 
-    options = parse_sticker_lines_to_options(sticker_lines or [])
+    if parsed and parsed.get("groups"):
+        options = [dict(g) for g in parsed["groups"]]
+    else:
+        options = parse_sticker_lines_to_options(sticker_lines or [])
 
     if not is_allowed_stellantis_brand(title):
         options = []
@@ -185,17 +290,21 @@ def build_publish_text(vehicle: Dict[str, Any], sticker_lines: List[str]) -> str
 
 def build_marketplace_text(
     *,
-    base_dir: Path,
-    runtime_root: Path,
-    slug: str,
+    base_dir: Optional[Path] = None,
+    runtime_root: Optional[Path] = None,
+    slug: str = "",
     vehicle: Dict[str, Any],
     sticker_lines: List[str],
     sticker_pdf: Optional[Path] = None,
+    parsed: Optional[Dict[str, Any]] = None,
+    timeout: float = STICKER_PARSE_TIMEOUT,
 ) -> str:
     """
     Marketplace = court + lisible.
-    - Si sticker_pdf dispo : on passe par sticker_to_ad.py (format stable), puis on nettoie les prix
-    - Sinon : fallback compact + points forts (strip prices)
+    - Si sticker parsé (parsed, ou sticker_pdf parsé ici hors process via parse_sticker_pdf):
+      annonce rendue par build_ad depuis parsed["groups"], prix des options vidés
+    - Sinon (pas de PDF / timeout / échec) : fallback compact + points forts (strip prices)
+    base_dir / runtime_root / slug: gardés pour compat (plus de sous-process ni fichier temporaire).
     """
     title = (vehicle.get("title") or "").strip()
     price = (vehicle.get("price") or "").strip()
@@ -207,57 +316,31 @@ def build_marketplace_text(
     if title and not is_allowed_stellantis_brand(title):
         vin = ""
         sticker_lines = []
-
-    # 1) PDF dispo -> sticker_to_ad
-    if sticker_pdf and Path(sticker_pdf).exists():
-        script = (base_dir / "sticker_to_ad.py")
-        if script.exists():
-            out_dir = (runtime_root / "_tmp_marketplace_text")
-            out_dir.mkdir(parents=True, exist_ok=True)
-            out_path = out_dir / f"{slug}_marketplace_from_sticker.txt"
-
-            py_venv = base_dir / ".venv" / "bin" / "python3"
-            python_bin = str(py_venv) if py_venv.exists() else sys.executable
-
-            r = subprocess.run(
-                [
-                    python_bin, str(script), str(sticker_pdf),
-                    "--out", str(out_path),
-                    "--title", title,
-                    "--price", price,
-                    "--mileage", mileage,
-                    "--stock", stock,
-                    "--vin", vin,
-                    "--url", url,
-                ],
-                capture_output=True,
-                text=True,
+        parsed = None
+        sticker_pdf = None
+
+    # 1) sticker parsé -> annonce rendue depuis les groupes d'options, sans leurs prix
+    if parsed is None and sticker_pdf:
+        parsed = parse_sticker_pdf(sticker_pdf, vehicle, timeout=timeout)
+
+    if parsed and parsed.get("ad"):
+        text = build_ad(
+            title=title or parsed.get("title") or "",
+            price=price,
+            mileage=mileage,
+            stock=stock or parsed.get("stock") or "",
+            vin=vin or parsed.get("vin") or "",
+            options=_marketplace_groups(parsed.get("groups") or []),
+            vehicle_url=url,
+        )
+
+        if vin and ("getWindowStickerPdf.do?vin=" not in text):
+            text += (
+                "\n\n📄 Window Sticker :\n"
+                f"https://www.chrysler.com/hostd/windowsticker/getWindowStickerPdf.do?vin={vin}"
             )
 
-            if r.returncode == 0 and out_path.exists():
-                text = out_path.read_text(encoding="utf-8", errors="ignore").strip()
-
-                fixed: List[str] = []
-                for line in text.splitlines():
-                    s = (line or "").rstrip()
-
-                    # drop lignes "prix seulement"
-                    if re.match(r"^\s*(✅|▫️|■|•)?\s*\d[\d\s]*\s*\$\b", s):
-                        continue
-
-                    s = re.sub(r"\s+\d[\d\s]*\s*\$\s*$", "", s)
-                    s = re.sub(r"\(\s*\d[\d\s]*\s*\$\s*\)\s*$", "", s)
-                    fixed.append(s)
-
-                text = "\n".join([x for x in fixed if x.strip()]).strip()
-
-                if vin and ("getWindowStickerPdf.do?vin=" not in text):
-                    text += (
-                        "\n\n📄 Window Sticker :\n"
-                        f"https://www.chrysler.com/hostd/windowsticker/getWindowStickerPdf.do?vin={vin}"
-                    )
-
-                return text.strip() + "\n"
+        return text.strip() + "\n"
 
     # 2) fallback compact
     lines: List[str] = []
@@ -1,18 +1,35 @@
+import json
 import os
 import re
 import sys
 import tempfile
 import subprocess
+import threading
+import time
 import traceback
+from collections import deque
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import BackgroundTasks, FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from supabase import create_client
-from engine.dg_text import build_facebook_dg, build_marketplace_dg
 
-app = FastAPI(title="kenbot-text-engine", version="1.0")
+from engine import admission
+
+# supabase (~350 ms) et la pile dg_text sont importés au premier usage (sb(), /generate):
+# démarrage à froid plus court pour les pods autoscalés; le warm-up (plus bas) les charge
+# en arrière-plan avant que /health annonce le pod prêt
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    start_warmup()
+    yield
+
+
+app = FastAPI(title="kenbot-text-engine", version="1.0", lifespan=lifespan)
 
 
 # ==========================
@@ -22,6 +39,17 @@ class Job(BaseModel):
     slug: str
     event: str = "NEW"
     vehicle: Dict[str, Any]
+    # opt-in: intro AI ajoutée en arrière-plan (la réponse reste le texte DG immédiat)
+    ai: bool = False
+
+
+class InventorySync(BaseModel):
+    # snapshot COMPLET: un stock absent depuis la dernière synchro = retiré
+    vehicles: List[Dict[str, Any]]
+    ai: bool = False
+    dry_run: bool = False
+    # confirme un snapshot qui retire beaucoup de stocks (garde-fou inventory_diff.removal_guard)
+    force: bool = False
 
 
 # ==========================
@@ -57,6 +85,8 @@ def sb():
     if _sb is None:
         if not SUPABASE_URL or not SUPABASE_KEY:
             raise RuntimeError("Supabase env missing: SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY")
+        from supabase import create_client
+
         _sb = create_client(SUPABASE_URL, SUPABASE_KEY)
     return _sb
 
@@ -64,10 +94,29 @@ def sb():
 # ==========================
 # Sticker helpers
 # ==========================
+# Copie locale des stickers validés (partagée par les requêtes + préchargée au warm-up)
+STICKER_LOCAL_DIR = Path(
+    os.getenv("STICKER_LOCAL_DIR", "").strip()
+    or (Path(tempfile.gettempdir()) / "kb_stickers")
+)
+STICKER_LOCAL_TTL = float(os.getenv("STICKER_LOCAL_TTL", "3600"))  # secondes
+
+
 def _sticker_obj_path(vin: str) -> str:
     return f"pdf_ok/{vin.upper()}.pdf"
 
 
+def _sticker_local_path(vin: str) -> Optional[Path]:
+    """Copie locale encore fraîche (< STICKER_LOCAL_TTL), sinon None."""
+    p = STICKER_LOCAL_DIR / Path(_sticker_obj_path(vin)).name
+    try:
+        if time.time() - p.stat().st_mtime <= STICKER_LOCAL_TTL:
+            return p
+    except OSError:
+        pass
+    return None
+
+
 def is_pdf_ok(b: bytes) -> bool:
     # Règle officielle: <10KB = mauvais, et doit commencer par %PDF
     return bool(b) and len(b) >= 10_240 and b[:4] == b"%PDF"
@@ -81,6 +130,8 @@ def has_sticker_cached(vin: str) -> bool:
     vin = (vin or "").strip().upper()
     if not _looks_like_vin(vin):
         return False
+    if _sticker_local_path(vin):
+        return True
     obj_path = _sticker_obj_path(vin)
     try:
         data = sb().storage.from_(STICKER_BUCKET).download(obj_path)
@@ -93,14 +144,18 @@ def get_or_fetch_sticker_pdf(vin: str) -> Path:
     """
     Cache-only: retourne un PDF local (tmp) UNIQUEMENT depuis Supabase Storage.
     Aucun appel Chrysler / aucun lookup ici.
+    Copie locale réutilisée tant qu'elle a moins de STICKER_LOCAL_TTL secondes.
     """
     vin = (vin or "").strip().upper()
     if not _looks_like_vin(vin):
         raise RuntimeError("VIN invalide")
 
+    local = _sticker_local_path(vin)
+    if local:
+        return local
+
     obj_path = _sticker_obj_path(vin)
-    tmp_dir = Path(tempfile.mkdtemp(prefix="kb_pdf_"))
-    local_pdf = tmp_dir / Path(obj_path).name
+    local_pdf = STICKER_LOCAL_DIR / Path(obj_path).name
 
     try:
         data = sb().storage.from_(STICKER_BUCKET).download(obj_path)
@@ -110,10 +165,22 @@ def get_or_fetch_sticker_pdf(vin: str) -> Path:
     if not is_pdf_ok(data):
         raise RuntimeError("Sticker présent mais invalide")
 
-    local_pdf.write_bytes(data)
+    local_pdf.parent.mkdir(parents=True, exist_ok=True)
+    tmp = local_pdf.with_name(f".{local_pdf.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    tmp.replace(local_pdf)
     return local_pdf
 
 
+def recent_sticker_vins(n: int) -> List[str]:
+    """Les n VIN dont le sticker validé (pdf_ok/) a été mis à jour le plus récemment."""
+    page = sb().storage.from_(STICKER_BUCKET).list(
+        "pdf_ok", {"limit": n, "offset": 0, "sortBy": {"column": "updated_at", "order": "desc"}}
+    ) or []
+    vins = [(obj.get("name") or "")[:-4].upper() for obj in page if (obj.get("name") or "").lower().endswith(".pdf")]
+    return [v for v in vins if _looks_like_vin(v)]
+
+
 # ==========================
 # Outputs (Storage + DB)
 # ==========================
@@ -146,12 +213,525 @@ def outputs_remove(path: str) -> None:
         pass
 
 
+def outputs_delete(stock: str) -> None:
+    try:
+        sb().table("outputs").delete().eq("stock", stock).execute()
+    except Exception:
+        pass
+
+
+def sticker_hashes() -> Optional[Dict[str, str]]:
+    """
+    VIN -> ETag des stickers validés (pdf_ok/), en une passe de listing (rien n'est téléchargé).
+    None si le listing échoue: le diff garde alors les empreintes sticker précédentes.
+    """
+    out: Dict[str, str] = {}
+    offset = 0
+    try:
+        while True:
+            page = sb().storage.from_(STICKER_BUCKET).list(
+                "pdf_ok", {"limit": 1000, "offset": offset, "sortBy": {"column": "name", "order": "asc"}}
+            ) or []
+            for obj in page:
+                name = obj.get("name") or ""
+                if not name.lower().endswith(".pdf"):
+                    continue
+                meta = obj.get("metadata") or {}
+                out[name[:-4].upper()] = str(meta.get("eTag") or obj.get("updated_at") or meta.get("size") or "")
+            if len(page) < 1000:
+                return out
+            offset += len(page)
+    except Exception as e:
+        print(f"STICKER_LIST_FAIL err={e}")
+        return None
+
+
+# ==========================
+# sticker_to_ad (process isolé: subprocess ou daemon résident)
+# ==========================
+STICKER_TIMEOUT = 25
+USE_STICKER_DAEMON = os.getenv("STICKER_DAEMON", "").strip() == "1"
+STICKER_EXIT_LIMIT = 3  # sticker_to_ad.EXIT_LIMIT (PDF hors limites, refusé avant parsing)
+
+
+class StickerRejected(RuntimeError):
+    """PDF hors limites (taille / pages / objets): /generate retombe sur le texte DG."""
+
+    def __init__(self, detail: str) -> None:
+        super().__init__(detail)
+        m = re.search(r"hors limites: (\w+)=", detail)
+        self.limit = m.group(1) if m else "limit"
+
+
+# Mémoire par parsing (résultat "memory" de sticker_to_ad), exposée par /metrics/stickers
+_sticker_mem_lock = threading.Lock()
+_sticker_mem: Dict[str, Any] = {"parses": 0, "rejected": {}, "rss_peak_mb": deque(maxlen=500), "py_peak_mb": deque(maxlen=500)}
+
+
+def _record_sticker_memory(parsed: Optional[Dict[str, Any]] = None, rejected: str = "") -> None:
+    with _sticker_mem_lock:
+        if rejected:
+            _sticker_mem["rejected"][rejected] = _sticker_mem["rejected"].get(rejected, 0) + 1
+            return
+        _sticker_mem["parses"] += 1
+        mem = (parsed or {}).get("memory") or {}
+        for k in ("rss_peak_mb", "py_peak_mb"):
+            if mem.get(k) is not None:
+                _sticker_mem[k].append(float(mem[k]))
+
+
+def run_sticker_to_ad(pdf_path: Path, fields: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Retourne le résultat structuré de sticker_to_ad (--json).
+    STICKER_DAEMON=1: pool de daemons résidents, un par slot "cpu" (pas de démarrage Python par sticker).
+    Un slot "cpu" (engine.admission) par parsing: admission.Overloaded si saturé.
+    StickerRejected si le PDF dépasse les limites de sticker_to_ad (STICKER_MAX_*).
+    """
+    with admission.slot("cpu") as waited:
+        if waited > 0.5:
+            print(f"STICKER_QUEUED wait={waited:.2f}s")
+        parsed = _run_sticker_to_ad(pdf_path, fields)
+    _record_sticker_memory(parsed)
+    return parsed
+
+
+def _run_sticker_to_ad(pdf_path: Path, fields: Dict[str, str]) -> Dict[str, Any]:
+    if USE_STICKER_DAEMON:
+        from engine.sticker_client import StickerDaemonError, StickerLimitError, get_daemon
+        try:
+            return get_daemon().parse(pdf_path, fields, timeout=STICKER_TIMEOUT)
+        except StickerLimitError as e:
+            raise StickerRejected(str(e))
+        except TimeoutError:
+            raise HTTPException(500, f"sticker_to_ad timeout ({STICKER_TIMEOUT}s)")
+        except StickerDaemonError as e:
+            raise HTTPException(500, f"sticker_to_ad failed (daemon)\n{str(e)[-1200:]}")
+
+    script = Path(__file__).resolve().parent / "engine" / "sticker_to_ad.py"
+    if not script.exists():
+        raise HTTPException(500, f"sticker_to_ad.py introuvable: {script}")
+
+    cmd = [sys.executable, str(script), str(pdf_path), "--json"]
+    for k in ("title", "price", "mileage", "stock", "vin"):
+        cmd += [f"--{k}", fields.get(k, "")]
+
+    try:
+        p = subprocess.run(cmd, capture_output=True, text=True, timeout=STICKER_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        raise HTTPException(500, f"sticker_to_ad timeout ({STICKER_TIMEOUT}s)")
+
+    if p.returncode == STICKER_EXIT_LIMIT:
+        raise StickerRejected((p.stderr or "").strip()[-300:])
+    if p.returncode != 0:
+        raise HTTPException(
+            status_code=500,
+            detail=(
+                f"sticker_to_ad failed (code={p.returncode})\n"
+                f"STDERR:\n{(p.stderr or '')[-1200:]}\n"
+                f"STDOUT:\n{(p.stdout or '')[-1200:]}"
+            ),
+        )
+
+    try:
+        return json.loads(p.stdout)
+    except ValueError:
+        raise HTTPException(
+            status_code=500,
+            detail=(
+                "sticker_to_ad: sortie JSON invalide\n"
+                f"STDERR:\n{(p.stderr or '')[-800:]}\n"
+                f"STDOUT:\n{(p.stdout or '')[-800:]}"
+            ),
+        )
+
+
+# ==========================
+# Enrichissement AI (arrière-plan)
+# ==========================
+# stock -> {"status": pending|running|ready|failed|disabled|superseded, "seq", "updated", "paths", "error"}
+# Statut final aussi écrit dans OUTPUTS_BUCKET (ai/<STOCK>.json) pour les autres workers.
+_ai_jobs: Dict[str, Dict[str, Any]] = {}
+MARKETPLACE_MAX_CHARS = 800
+AI_MP_INTRO_MIN = 60  # en dessous: pas d'intro marketplace (place restante après le texte DG)
+_ai_lock = threading.Lock()
+_ai_seq = 0
+
+
+def _ai_status_path(stock: str) -> str:
+    return f"ai/{stock}.json"
+
+
+def _ai_put_status(stock: str, snapshot: Dict[str, Any]) -> None:
+    try:
+        outputs_put(_ai_status_path(stock), json.dumps(snapshot, ensure_ascii=False))
+    except Exception as e:
+        print(f"AI_STATUS_PUT_FAIL stock={stock} err={e}")
+
+
+def _ai_current(stock: str, seq: int) -> bool:
+    with _ai_lock:
+        return _ai_jobs.get(stock, {}).get("seq") == seq
+
+
+def _ai_set(stock: str, seq: int, **fields: Any) -> bool:
+    """Met à jour le statut si `seq` est toujours le dernier job du stock (sinon: job périmé)."""
+    with _ai_lock:
+        cur = _ai_jobs.get(stock)
+        if cur is None or cur["seq"] != seq:
+            return False
+        cur.update(fields, updated=time.time())
+        snapshot = dict(cur)
+    if snapshot["status"] in ("ready", "failed", "disabled"):
+        _ai_put_status(stock, snapshot)
+    return True
+
+
+def supersede_ai_enrichment(stock: str) -> None:
+    """
+    À appeler AVANT de republier les textes DG d'un stock: le job AI en cours (s'il existe)
+    devient périmé et n'écrira plus son intro par-dessus les nouveaux textes.
+    """
+    global _ai_seq
+    with _ai_lock:
+        cur = _ai_jobs.get(stock)
+        if cur is None:
+            return
+        _ai_seq += 1
+        was = cur["status"]
+        cur.update(seq=_ai_seq, status="superseded", updated=time.time(), error="")
+        snapshot = dict(cur)
+    if was in ("pending", "running"):
+        print(f"AI_SUPERSEDED stock={stock}")
+    _ai_put_status(stock, snapshot)
+
+
+def schedule_ai_enrichment(
+    background_tasks: BackgroundTasks,
+    stock: str,
+    vehicle: Dict[str, Any],
+    paths: Dict[str, str],
+    texts: Dict[str, str],
+) -> str:
+    global _ai_seq
+    with _ai_lock:
+        _ai_seq += 1
+        seq = _ai_seq
+        _ai_jobs[stock] = {"status": "pending", "seq": seq, "updated": time.time(), "paths": paths, "error": ""}
+    background_tasks.add_task(enrich_with_ai, stock, seq, vehicle, paths, texts)
+    return "pending"
+
+
+def enrich_with_ai(
+    stock: str,
+    seq: int,
+    vehicle: Dict[str, Any],
+    paths: Dict[str, str],
+    texts: Dict[str, str],
+) -> None:
+    """
+    Intro AI (facebook + marketplace, un seul appel) puis patch des sorties déjà publiées:
+    intro + texte DG. Marketplace reste <= 800 caractères: l'intro est demandée à la taille
+    qui reste après le texte DG (jamais coupé), et omise s'il ne reste pas de place.
+    """
+    if not _ai_set(stock, seq, status="running"):
+        return
+    if not os.getenv("OPENAI_API_KEY", "").strip():
+        _ai_set(stock, seq, status="disabled", error="OPENAI_API_KEY manquant")
+        return
+    try:
+        from engine.classifier import classify
+        from engine.llm import generate_ad_variants
+
+        variants = {"facebook": 220}
+        mp_room = MARKETPLACE_MAX_CHARS - len(texts["marketplace"]) - 2  # "\n\n" entre intro et DG
+        if mp_room >= AI_MP_INTRO_MIN:
+            variants["marketplace"] = mp_room
+        else:
+            print(f"AI_MP_SKIP stock={stock} room={mp_room}")
+
+        intros = generate_ad_variants(vehicle, classify(vehicle), variants=variants)
+        if not any(intros.values()):
+            _ai_set(stock, seq, status="failed", error="intro AI vide")
+            return
+
+        for fmt, path in paths.items():
+            intro = (intros.get(fmt) or "").strip()
+            if not intro:
+                continue
+            patched = f"{intro}\n\n{texts[fmt]}"
+            if fmt == "marketplace" and len(patched) > MARKETPLACE_MAX_CHARS:
+                continue  # ne jamais couper le texte DG (prix, km, stock, CTA)
+            # re-vérifié avant CHAQUE écriture: une requête plus récente a pu republier entre-temps
+            if not _ai_current(stock, seq):
+                print(f"AI_STALE stock={stock} seq={seq}")
+                return
+            outputs_put(path, patched)
+        print(f"AI_ENRICHED stock={stock}")
+        _ai_set(stock, seq, status="ready")
+    except Exception as e:
+        print(f"AI_ENRICH_FAIL stock={stock} err={e}")
+        _ai_set(stock, seq, status="failed", error=str(e)[:500])
+
+
+def ai_status(stock: str) -> Optional[Dict[str, Any]]:
+    with _ai_lock:
+        cur = _ai_jobs.get(stock)
+        if cur is not None:
+            return dict(cur)
+    try:
+        return json.loads(sb().storage.from_(OUTPUTS_BUCKET).download(_ai_status_path(stock)))
+    except Exception:
+        return None
+
+
+# ==========================
+# Warm-up au démarrage (thread d'arrière-plan; /health = 503 tant que pas prêt)
+# ==========================
+WARMUP = os.getenv("WARMUP", "1").strip() != "0"
+WARMUP_PREFETCH_VINS = int(os.getenv("WARMUP_PREFETCH_VINS", "0") or 0)
+WARMUP_STICKER = Path(__file__).resolve().parent / "engine" / "assets" / "warmup_sticker.pdf"
+WARMUP_FIELDS = {
+    "title": "2024 RAM 1500 BIG HORN CREW CAB 4X4",
+    "price": "57 995 $",
+    "mileage": "10 km",
+    "stock": "WARMUP",
+    "vin": "3HX9DCUK6C9RV02BS",
+}
+
+# status: disabled | pending | starting | running | ready | degraded (une étape a échoué: prêt quand même)
+_warmup: Dict[str, Any] = {"status": "disabled" if not WARMUP else "pending", "ready": not WARMUP, "steps": {}}
+_warmup_lock = threading.Lock()
+
+
+def _warm_supabase() -> str:
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        return "skipped (env Supabase absente)"
+    sb()
+    return "client prêt"
+
+
+def _warm_parser() -> str:
+    # daemon: démarre chaque process résident du pool (imports + preload); subprocess: .pyc + cache disque
+    if USE_STICKER_DAEMON:
+        from engine.sticker_client import get_daemon
+
+        results = get_daemon().warm(WARMUP_STICKER, WARMUP_FIELDS)
+    else:
+        results = [_run_sticker_to_ad(WARMUP_STICKER, WARMUP_FIELDS)]
+    for parsed in results:
+        if not parsed.get("groups"):
+            raise RuntimeError(f"sticker de warm-up: aucun groupe (source={parsed.get('source')})")
+    mode = f"{len(results)} daemon(s)" if USE_STICKER_DAEMON else "subprocess"
+    return f"{len(results[0]['groups'])} groupes ({mode})"
+
+
+def _warm_text() -> str:
+    from engine.classifier import classify
+    from engine.dg_text import render_dg
+    from engine.hashtags import STYLES, hashtags
+
+    vehicle = dict(WARMUP_FIELDS)
+    texts = render_dg(vehicle, formats=("facebook", "marketplace"))
+    for style in STYLES:
+        hashtags(vehicle["title"], "RAM", style)
+    return f"{classify(vehicle)}, {sum(len(t or '') for t in texts.values())} car."
+
+
+def _warm_prefetch() -> str:
+    if WARMUP_PREFETCH_VINS <= 0 or not SUPABASE_URL or not SUPABASE_KEY:
+        return "skipped"
+    ok = 0
+    for vin in recent_sticker_vins(WARMUP_PREFETCH_VINS):
+        try:
+            get_or_fetch_sticker_pdf(vin)
+            ok += 1
+        except Exception:
+            pass
+    return f"{ok} stickers en local"
+
+
+WARMUP_STEPS = (
+    ("supabase", _warm_supabase),
+    ("parser", _warm_parser),
+    ("text", _warm_text),
+    ("prefetch", _warm_prefetch),
+)
+
+
+def run_warmup() -> Dict[str, Any]:
+    _warmup.update(status="running")
+    t_all = time.perf_counter()
+    failed = False
+    for name, step in WARMUP_STEPS:
+        t0 = time.perf_counter()
+        try:
+            detail, ok = step(), True
+        except Exception as e:
+            detail, ok = f"{type(e).__name__}: {str(e)[-300:]}", False
+            failed = True
+        _warmup["steps"][name] = {"ok": ok, "s": round(time.perf_counter() - t0, 3), "detail": detail}
+    _warmup.update(
+        status="degraded" if failed else "ready",
+        ready=True,
+        s=round(time.perf_counter() - t_all, 3),
+    )
+    print(f"WARMUP {_warmup['status']} s={_warmup['s']} steps={_warmup['steps']}")
+    return _warmup
+
+
+def start_warmup() -> None:
+    """Lancé au démarrage de l'app (lifespan); WARMUP=0 désactive (prêt tout de suite)."""
+    if not WARMUP:
+        return
+    with _warmup_lock:
+        if _warmup["status"] != "pending":
+            return
+        _warmup["status"] = "starting"
+    threading.Thread(target=run_warmup, name="warmup", daemon=True).start()
+
+
 # ==========================
 # Routes
 # ==========================
 @app.get("/health")
 def health():
-    return {"ok": True}
+    """Readiness: 503 tant que le warm-up n'est pas terminé."""
+    if not _warmup["ready"]:
+        return JSONResponse({"ok": False, "ready": False, "warmup": _warmup}, status_code=503)
+    return {"ok": True, "ready": True, "warmup": _warmup["status"]}
+
+
+@app.get("/warmup")
+def warmup_status():
+    return _warmup
+
+
+@app.get("/generate/{stock}/ai")
+def generate_ai_status(stock: str):
+    """Statut de l'intro AI d'un stock: pending | running | ready | failed | disabled."""
+    stock = (stock or "").strip().upper()
+    st = ai_status(stock)
+    if st is None:
+        raise HTTPException(404, f"aucun enrichissement AI pour {stock}")
+    return {"stock": stock, "ready": st.get("status") == "ready", **st}
+
+
+@app.get("/metrics/llm")
+def metrics_llm(source: str = "process"):
+    """
+    Mesures des appels LLM: source=process (ce worker, depuis le démarrage)
+    ou source=file (fichier JSONL LLM_METRICS_PATH, tous process confondus).
+    """
+    from engine import llm_metrics
+
+    if source == "file":
+        return llm_metrics.summarize_file()
+    if source != "process":
+        raise HTTPException(400, "source: process | file")
+    return llm_metrics.summary()
+
+
+# ==========================
+# Synchro inventaire (diff -> seulement les stocks touchés)
+# ==========================
+_sync_lock = threading.Lock()
+SYNC_COMMIT_EVERY = int(os.getenv("INVENTORY_COMMIT_EVERY", "20"))  # stocks traités entre deux sauvegardes de l'état
+
+
+@app.post("/inventory/sync")
+def inventory_sync(req: InventorySync, background_tasks: BackgroundTasks):
+    """
+    Diff du snapshot contre le dernier snapshot traité (engine.inventory_diff):
+    ajoutés / modifiés -> generate(), retirés -> sorties supprimées (outputs_remove).
+    Seuls les stocks traités avec succès avancent l'état local (les échecs sont retentés).
+    Refus (409) si le snapshot retire trop de stocks (vide / tronqué), sauf force=true.
+    """
+    from engine import inventory_diff
+
+    if not _sync_lock.acquire(blocking=False):
+        raise HTTPException(409, "synchro inventaire déjà en cours")
+    try:
+        res, previous = inventory_diff.diff_snapshot(req.vehicles, sticker_hashes())
+        report: Dict[str, Any] = {"summary": res.summary(), "dry_run": req.dry_run, "changes": []}
+        guard = inventory_diff.removal_guard(res, previous)
+        if req.dry_run:
+            report["changes"] = [c.as_dict() for c in res.changes]
+            report["guard"] = guard
+            return report
+        if guard and not req.force:
+            raise HTTPException(409, guard)
+
+        # l'état avance par lots: un crash en cours de synchro ne refait que le dernier lot
+        state = previous
+        batch: List[str] = []
+        done = 0
+        try:
+            for c in res.changes:
+                item = c.as_dict()
+                try:
+                    if c.status == "removed":
+                        supersede_ai_enrichment(c.stock)
+                        for path in (
+                            f"without/{c.stock}_facebook.txt",
+                            f"without/{c.stock}_marketplace.txt",
+                            f"with/{c.stock}_facebook.txt",
+                            f"with/{c.stock}_marketplace.txt",
+                            _ai_status_path(c.stock),
+                        ):
+                            outputs_remove(path)
+                        outputs_delete(c.stock)
+                    else:
+                        vehicle = dict(c.vehicle or {})
+                        vehicle["stock"] = c.stock
+                        # _generate publie les sorties (with/ ou without/) avant de répondre:
+                        # une erreur d'écriture -> HTTPException -> stock non commité, retenté
+                        out = generate(Job(slug=c.stock, vehicle=vehicle, ai=req.ai), background_tasks)
+                        item["kind"] = out.get("kind", "")
+                    batch.append(c.stock)
+                    done += 1
+                    item["ok"] = True
+                except HTTPException as e:
+                    item["ok"] = False
+                    item["error"] = str(e.detail)[-300:]
+                report["changes"].append(item)
+                if len(batch) >= SYNC_COMMIT_EVERY:
+                    state = inventory_diff.commit(state, res, done=batch)
+                    batch = []
+        finally:
+            if batch:
+                inventory_diff.commit(state, res, done=batch)
+
+        report["failed"] = len(res.changes) - done
+        print(f"INVENTORY_SYNC {res.summary()} failed={report['failed']}")
+        return report
+    finally:
+        _sync_lock.release()
+
+
+@app.get("/metrics/stickers")
+def metrics_stickers():
+    """Pic mémoire par parsing (RSS échantillonnée; py = tracemalloc si STICKER_TRACEMALLOC=1) + refus par limite."""
+    with _sticker_mem_lock:
+        out: Dict[str, Any] = {"parses": _sticker_mem["parses"], "rejected": dict(_sticker_mem["rejected"])}
+        for k in ("rss_peak_mb", "py_peak_mb"):
+            xs = sorted(_sticker_mem[k])
+            out[k] = {
+                "n": len(xs),
+                "p50": xs[len(xs) // 2] if xs else None,
+                "p95": xs[min(len(xs) - 1, int(0.95 * len(xs)))] if xs else None,
+                "max": xs[-1] if xs else None,
+            }
+    if USE_STICKER_DAEMON:
+        from engine.sticker_client import get_daemon
+
+        out["daemon_recycled"] = get_daemon().recycled
+    return out
+
+
+@app.get("/metrics/admission")
+def metrics_admission():
+    """Slots occupés, profondeur de file, attente p50/p95 et rejets par pool (cpu / io)."""
+    return admission.stats()
 
 
 @app.get("/version")
@@ -165,13 +745,29 @@ def version():
         "build": "tryexcept-2026-01-18-1",
     }
     
+def _overloaded(e: admission.Overloaded) -> HTTPException:
+    return HTTPException(429, str(e), headers={"Retry-After": str(e.retry_after)})
+
+
 @app.post("/generate")
-def generate(job: Job):
+def generate(job: Job, background_tasks: BackgroundTasks):
+    """Admission (slot "io", engine.admission) puis _generate(); saturé -> 429 + Retry-After."""
+    try:
+        with admission.slot("io"):
+            return _generate(job, background_tasks)
+    except admission.Overloaded as e:
+        print(f"ADMISSION_REJECT pool={e.pool} reason={e.reason} retry_after={e.retry_after}")
+        raise _overloaded(e)
+
+
+def _generate(job: Job, background_tasks: BackgroundTasks):
     """
-    Génère le texte Facebook.
+    Génère le texte Facebook et publie les sorties (OUTPUTS_BUCKET + table outputs, "kind").
     Priorité:
-      1) WITH sticker_to_ad si vin + price + mileage + stock et PDF ok en cache
-      2) WITHOUT fallback DG text (match parfait)
+      1) WITH sticker_to_ad si vin + price + mileage + stock et PDF ok en cache -> with/<STOCK>_*.txt
+      2) WITHOUT fallback DG text (match parfait) -> without/<STOCK>_*.txt
+    job.ai=True (WITHOUT): réponse immédiate avec le texte DG, intro AI ajoutée
+    en arrière-plan aux sorties publiées (statut: GET /generate/{stock}/ai).
     """
     try:
         v = job.vehicle or {}
@@ -195,59 +791,38 @@ def generate(job: Job):
                 pdf_path = None
                 print(f"WITH_SKIP vin={vin} stock={stock} err={e}")
 
+            parsed = None
             if pdf_path:
-                with tempfile.TemporaryDirectory(prefix="kb_sticker_") as td:
-                    out_dir = Path(td)
-
-                    script = Path(__file__).resolve().parent / "engine" / "sticker_to_ad.py"
-                    if not script.exists():
-                        raise HTTPException(500, f"sticker_to_ad.py introuvable: {script}")
-
-                    cmd = [
-                        sys.executable, str(script), str(pdf_path),
-                        "--out", str(out_dir),
-                        "--title", title,
-                        "--price", price,
-                        "--mileage", mileage,
-                        "--stock", stock,
-                        "--vin", vin,
-                    ]
-
-                    try:
-                        p = subprocess.run(cmd, capture_output=True, text=True, timeout=25)
-                    except subprocess.TimeoutExpired:
-                        raise HTTPException(500, "sticker_to_ad timeout (25s)")
-
-                    if p.returncode != 0:
-                        raise HTTPException(
-                            status_code=500,
-                            detail=(
-                                f"sticker_to_ad failed (code={p.returncode})\n"
-                                f"STDERR:\n{(p.stderr or '')[-1200:]}\n"
-                                f"STDOUT:\n{(p.stdout or '')[-1200:]}"
-                            ),
-                        )
-
-                    candidates = sorted(
-                        out_dir.glob("*_facebook.txt"),
-                        key=lambda x: x.stat().st_mtime,
-                        reverse=True,
-                    )
-                    if not candidates:
-                        generated = [x.name for x in out_dir.glob("*")]
-                        raise HTTPException(
-                            status_code=500,
-                            detail=(
-                                "sticker_to_ad: aucun *_facebook.txt généré\n"
-                                f"generated={generated}\n"
-                                f"STDERR:\n{(p.stderr or '')[-800:]}\n"
-                                f"STDOUT:\n{(p.stdout or '')[-800:]}"
-                            ),
-                        )
-
-                    sticker_text = candidates[0].read_text(encoding="utf-8", errors="ignore").strip()
-                    if sticker_text:
-                        return {"slug": job.slug, "facebook_text": sticker_text}
+                try:
+                    parsed = run_sticker_to_ad(pdf_path, {
+                        "title": title,
+                        "price": price,
+                        "mileage": mileage,
+                        "stock": stock,
+                        "vin": vin,
+                    })
+                except StickerRejected as e:
+                    _record_sticker_memory(rejected=e.limit)
+                    print(f"WITH_REJECTED vin={vin} stock={stock} err={e}")
+
+            if parsed:
+                print(f"WITH_PARSED vin={vin} stock={stock} source={parsed.get('source')} timings={parsed.get('timings')} memory={parsed.get('memory')}")
+                sticker_text = (parsed.get("ad") or "").strip()
+                if sticker_text:
+                    from engine.text_pipeline import build_marketplace_text
+
+                    fields = {"title": title, "price": price, "mileage": mileage, "stock": stock, "vin": vin}
+                    mp_text = build_marketplace_text(vehicle=fields, sticker_lines=[], parsed=parsed).strip()
+                    fb_path = f"with/{stock}_facebook.txt"
+                    mp_path = f"with/{stock}_marketplace.txt"
+                    supersede_ai_enrichment(stock)
+                    outputs_put(fb_path, sticker_text)
+                    outputs_put(mp_path, mp_text)
+                    outputs_upsert(stock, "with", fb_path, mp_path)
+                    if job.ai:
+                        # intro AI: seulement sur les sorties WITHOUT (texte DG)
+                        return {"slug": job.slug, "kind": "with", "facebook_text": sticker_text, "ai": "skipped"}
+                    return {"slug": job.slug, "kind": "with", "facebook_text": sticker_text}
 
         # ==========================
         # WITHOUT (fallback) => DG TEXT LONG
@@ -262,11 +837,15 @@ def generate(job: Job):
         vehicle["stock"] = stock
         vehicle["vin"] = vin
 
-        fb_text = (build_facebook_dg(vehicle) or "").strip()
-        mp_text = (build_marketplace_dg(vehicle) or "").strip()
+        from engine.dg_text import render_dg
+
+        texts = render_dg(vehicle, formats=("facebook", "marketplace"))
+        fb_text = (texts["facebook"] or "").strip()
+        mp_text = (texts["marketplace"] or "").strip()
 
         fb_path = f"without/{stock}_facebook.txt"
         mp_path = f"without/{stock}_marketplace.txt"
+        supersede_ai_enrichment(stock)
         outputs_put(fb_path, fb_text)
         outputs_put(mp_path, mp_text)
         outputs_upsert(stock, "without", fb_path, mp_path)
@@ -274,9 +853,19 @@ def generate(job: Job):
         if not fb_text:
             raise HTTPException(500, "generate: empty facebook_text")
 
-        return {"slug": job.slug, "facebook_text": fb_text}
+        if job.ai:
+            status = schedule_ai_enrichment(
+                background_tasks,
+                stock,
+                vehicle,
+                {"facebook": fb_path, "marketplace": mp_path},
+                {"facebook": fb_text, "marketplace": mp_text},
+            )
+            return {"slug": job.slug, "kind": "without", "facebook_text": fb_text, "ai": status}
+
+        return {"slug": job.slug, "kind": "without", "facebook_text": fb_text}
 
-    except HTTPException:
+    except (HTTPException, admission.Overloaded):
         raise
     except Exception:
         tb = traceback.format_exc()